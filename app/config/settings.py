@@ -14,6 +14,17 @@ class Settings(BaseSettings):
     azure_openai_embedding_deployment: str = Field(..., alias="AZURE_OPENAI_EMBED_MODEL")
     azure_openai_chat_deployment: str = Field(..., alias="AZURE_OPENAI_CHAT_MODEL")
 
+    # Embedding cache (empty path = memory-only); both tiers evict least recently used entries first
+    embedding_cache_path: str = Field("./data/cache/embeddings.sqlite", alias="EMBEDDING_CACHE_PATH")
+    embedding_cache_max_items: int = Field(10000, alias="EMBEDDING_CACHE_MAX_ITEMS")
+    embedding_cache_max_disk_items: int = Field(200000, alias="EMBEDDING_CACHE_MAX_DISK_ITEMS")  # 0 = unbounded
+
+    # Embedding micro-batching
+    embed_max_tokens_per_batch: int = Field(16000, alias="EMBED_MAX_TOKENS_PER_BATCH")
+    embed_max_items_per_batch: int = Field(64, alias="EMBED_MAX_ITEMS_PER_BATCH")
+    embed_max_concurrency: int = Field(4, alias="EMBED_MAX_CONCURRENCY")
+    embed_max_retries: int = Field(5, alias="EMBED_MAX_RETRIES")
+
     # Azure Cognitive Search
     azure_search_endpoint: str = Field(..., alias="AZURE_SEARCH_ENDPOINT")
     azure_search_api_key: str = Field(..., alias="AZURE_SEARCH_API_KEY")
@@ -21,10 +32,91 @@ class Settings(BaseSettings):
 
     # SQLite
     sqlite_path: str = Field("sqlite:///./db.sqlite3", alias="SQLITE_PATH")
+    sqlite_synchronous: str = Field("NORMAL", alias="SQLITE_SYNCHRONOUS")  # OFF | NORMAL | FULL
+    sqlite_busy_timeout_ms: int = Field(5000, alias="SQLITE_BUSY_TIMEOUT_MS")
+
+    # Retrieval for /chat: "vector", "lexical" (BM25) or "hybrid" (rank fusion of both)
+    retrieval_mode: str = Field("hybrid", alias="RETRIEVAL_MODE")
+    retrieval_candidates: int = Field(20, alias="RETRIEVAL_CANDIDATES")
+    retrieval_rrf_k: int = Field(60, alias="RETRIEVAL_RRF_K")
+    # The BM25 index is rebuilt in the background; other workers' ingests are picked up within this interval
+    lexical_refresh_seconds: float = Field(5.0, alias="LEXICAL_REFRESH_SECONDS")
+    azure_keyword_search: bool = Field(False, alias="AZURE_KEYWORD_SEARCH")
+    # MMR re-ranking: fetch top_k * multiplier candidates, trade relevance (lambda) against redundancy
+    mmr_enabled: bool = Field(True, alias="MMR_ENABLED")
+    mmr_lambda: float = Field(0.5, alias="MMR_LAMBDA")
+    mmr_candidate_multiplier: int = Field(4, alias="MMR_CANDIDATE_MULTIPLIER")
+
+    # Prompt context: token budget for retrieved chunks, capped by the model's context window
+    context_token_budget: int = Field(3000, alias="CONTEXT_TOKEN_BUDGET")
+    chat_context_window: int = Field(8192, alias="CHAT_CONTEXT_WINDOW")
+    chat_max_answer_tokens: int = Field(1024, alias="CHAT_MAX_ANSWER_TOKENS")
+
+    # /chat/batch fan-out
+    chat_batch_max_items: int = Field(500, alias="CHAT_BATCH_MAX_ITEMS")
+    chat_batch_search_concurrency: int = Field(16, alias="CHAT_BATCH_SEARCH_CONCURRENCY")
+    chat_batch_llm_concurrency: int = Field(8, alias="CHAT_BATCH_LLM_CONCURRENCY")
+
+    # Semantic answer cache for /chat
+    answer_cache_enabled: bool = Field(True, alias="ANSWER_CACHE_ENABLED")
+    answer_cache_threshold: float = Field(0.97, alias="ANSWER_CACHE_THRESHOLD")
+    answer_cache_ttl_seconds: float = Field(3600, alias="ANSWER_CACHE_TTL_SECONDS")
+    answer_cache_max_entries: int = Field(1000, alias="ANSWER_CACHE_MAX_ENTRIES")
+
+    # Per-session conversation memory: recent turns within a token window, older ones summarised
+    session_memory_tokens: int = Field(1500, alias="SESSION_MEMORY_TOKENS")
+    session_summary_tokens: int = Field(300, alias="SESSION_SUMMARY_TOKENS")
+
+    # Shared HTTP connection pools (all Azure / OpenAI clients)
+    http_max_connections: int = Field(100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive: int = Field(20, alias="HTTP_MAX_KEEPALIVE")
+    http_keepalive_expiry: float = Field(30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    http_timeout: float = Field(60.0, alias="HTTP_TIMEOUT")
+    http_connect_timeout: float = Field(10.0, alias="HTTP_CONNECT_TIMEOUT")
+
+    # Blob transfers: larger blobs use parallel ranged GETs / staged block uploads
+    blob_chunk_size: int = Field(4 * 1024 * 1024, alias="BLOB_CHUNK_SIZE")
+    blob_single_shot_size: int = Field(8 * 1024 * 1024, alias="BLOB_SINGLE_SHOT_SIZE")
+    blob_max_concurrency: int = Field(4, alias="BLOB_MAX_CONCURRENCY")
+
+    # Text extraction (0 workers = one per CPU)
+    extract_workers: int = Field(0, alias="EXTRACT_WORKERS")
+    extract_pages_per_task: int = Field(16, alias="EXTRACT_PAGES_PER_TASK")
+    extract_parallel_min_pages: int = Field(48, alias="EXTRACT_PARALLEL_MIN_PAGES")
+
+    # Background ingestion
+    ingest_workers: int = Field(2, alias="INGEST_WORKERS")
+    ingest_poll_interval: float = Field(2.0, alias="INGEST_POLL_INTERVAL")
+    # Running jobs heartbeat every INGEST_HEARTBEAT_SECONDS; any worker re-queues jobs silent for longer
+    # than INGEST_STALE_AFTER_SECONDS (their process died), so keep it a few heartbeats long
+    ingest_heartbeat_seconds: float = Field(15.0, alias="INGEST_HEARTBEAT_SECONDS")
+    ingest_stale_after_seconds: float = Field(60.0, alias="INGEST_STALE_AFTER_SECONDS")
 
     # FAISS
     faiss_index_dir: str = Field("./faiss_index", alias="FAISS_INDEX_DIR")
 
+    # Vector store backend: "azure" (Cognitive Search) or "local" (mmap index in faiss_index_dir)
+    vector_store_backend: str = Field("azure", alias="VECTOR_STORE_BACKEND")
+    # Chunk embeddings kept in SQLite: BLOB dtype, and whether the local index is rebuilt from them at startup
+    chunk_embedding_dtype: str = Field("float32", alias="CHUNK_EMBEDDING_DTYPE")  # float32 | float16
+    vector_store_load_from_db: bool = Field(False, alias="VECTOR_STORE_LOAD_FROM_DB")
+    # Local index compression: "none" (exact float32 scan), "int8" (4x smaller) or "pq" (product
+    # quantization, dim*4/subspaces x smaller). Searches scan the codes and rerank top_k * factor
+    # rows with the float32 vectors read through mmap; indexes below the min row count stay exact.
+    local_vector_quantization: str = Field("none", alias="LOCAL_VECTOR_QUANTIZATION")
+    local_vector_pq_subspaces: int = Field(0, alias="LOCAL_VECTOR_PQ_SUBSPACES")  # 0 = dim / 8
+    local_vector_rerank_factor: int = Field(10, alias="LOCAL_VECTOR_RERANK_FACTOR")
+    local_vector_quantize_min_rows: int = Field(10000, alias="LOCAL_VECTOR_QUANTIZE_MIN_ROWS")
+
+    # Prometheus /metrics endpoint and Server-Timing headers
+    # (set PROMETHEUS_MULTIPROC_DIR to aggregate metrics across uvicorn workers)
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+
+    # Start-up: services are built lazily; the optional background warm-up checks the search
+    # index and loads tokenizers / SDKs, and /health/ready reports 503 until it has finished
+    warmup_enabled: bool = Field(True, alias="WARMUP_ENABLED")
+    warmup_timeout_seconds: float = Field(30.0, alias="WARMUP_TIMEOUT_SECONDS")
+
     class Config:
         env_file = ".env"
         populate_by_name = True
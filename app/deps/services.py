@@ -0,0 +1,110 @@
+# app/deps/services.py
+from functools import lru_cache
+from pathlib import Path
+
+from app.config.settings import settings
+from app.services.answer_cache import AnswerCache
+from app.services.chunker import Chunker
+from app.services.context_packer import ContextPacker
+from app.services.conversation_memory import ConversationMemory
+from app.services.embedder import Embedder
+from app.services.extractor import Extractor
+from app.services.ingest_queue import IngestWorkerPool
+from app.services.ingestion import IngestionPipeline
+from app.services.llm import AzureChatLLM
+from app.services.retriever import HybridRetriever
+from app.services.storage_manager import StorageManager
+from app.services.vector_store.factory import build_vector_store
+
+
+# One instance of each service per process, all sharing the client registry.
+# Nothing is built at import time: the first request (or the app lifespan /
+# warm-up) constructs a service, so importing a router costs no I/O.
+@lru_cache
+def get_storage() -> StorageManager:
+    return StorageManager()
+
+
+@lru_cache
+def get_embedder() -> Embedder:
+    return Embedder()
+
+
+@lru_cache
+def get_vector_store():
+    return build_vector_store(index_name="documents")
+
+
+@lru_cache
+def get_retriever() -> HybridRetriever:
+    return HybridRetriever(
+        get_vector_store(),
+        candidates=settings.retrieval_candidates,
+        rrf_k=settings.retrieval_rrf_k,
+        azure_keyword=settings.azure_keyword_search,
+        mmr_lambda=settings.mmr_lambda,
+        mmr_multiplier=settings.mmr_candidate_multiplier,
+        lexical_refresh_interval=settings.lexical_refresh_seconds,
+    )
+
+
+@lru_cache
+def get_llm() -> AzureChatLLM:
+    return AzureChatLLM()
+
+
+@lru_cache
+def get_answer_cache() -> AnswerCache:
+    return AnswerCache(
+        threshold=settings.answer_cache_threshold,
+        ttl_seconds=settings.answer_cache_ttl_seconds,
+        max_entries=settings.answer_cache_max_entries,
+    )
+
+
+@lru_cache
+def get_context_packer() -> ContextPacker:
+    return ContextPacker(
+        budget_tokens=settings.context_token_budget,
+        model=settings.azure_openai_chat_deployment,
+    )
+
+
+@lru_cache
+def get_conversation_memory() -> ConversationMemory:
+    return ConversationMemory(
+        get_llm(),
+        window_tokens=settings.session_memory_tokens,
+        summary_tokens=settings.session_summary_tokens,
+        model=settings.azure_openai_chat_deployment,
+    )
+
+
+@lru_cache
+def get_extractor() -> Extractor:
+    return Extractor(storage=get_storage())
+
+
+@lru_cache
+def get_chunker() -> Chunker:
+    # Boundary-snapped windows realign after an edit, so unchanged chunks keep their ids
+    return Chunker(chunk_size=1000, overlap=200, model="gpt-4", boundary="sentence")
+
+
+@lru_cache
+def get_ingestion_pipeline() -> IngestionPipeline:
+    tmp_dir = Path("./data/tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    return IngestionPipeline(get_storage(), get_extractor(), get_chunker(), get_embedder(), get_vector_store(), tmp_dir)
+
+
+@lru_cache
+def get_worker_pool() -> IngestWorkerPool:
+    return IngestWorkerPool(
+        get_ingestion_pipeline(),
+        concurrency=settings.ingest_workers,
+        poll_interval=settings.ingest_poll_interval,
+        heartbeat_interval=settings.ingest_heartbeat_seconds,
+        on_indexed=get_retriever().notify,
+        stale_after_seconds=settings.ingest_stale_after_seconds,
+    )
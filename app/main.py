@@ -1,12 +1,119 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
 from loguru import logger
 
 from app.config.settings import settings
-from app.state.db import Base, engine, get_db
+from app.state import repos
+from app.state.db import async_engine, db_call, init_db
+from app.deps.services import (
+    get_chunker,
+    get_conversation_memory,
+    get_embedder,
+    get_extractor,
+    get_retriever,
+    get_vector_store,
+    get_worker_pool,
+)
 from app.routers import sessions, upload, process, chat
+from app.services.clients import registry
+from app.services.warmup import Warmup
+from app.utils import metrics
+from app.utils.tokens import get_tokenizer
+
+# -------------------------
+# Startup / Shutdown (lifespan)
+# -------------------------
+async def load_vector_store_from_db():
+    """Rebuild the local index from the embeddings stored in the chunks table when they disagree."""
+    vector_store = get_vector_store()
+    if not hasattr(vector_store, "arebuild"):
+        logger.warning("⚠️ VECTOR_STORE_LOAD_FROM_DB only applies to the local vector store; skipping")
+        return
+    stored = await db_call(repos.count_chunk_embeddings)
+    if stored == len(vector_store):
+        logger.info(f"✅ Local vector store already holds the {stored} stored embeddings")
+        return
+    chunks_with_meta, matrix = await db_call(repos.load_chunk_embeddings)
+    await vector_store.arebuild(chunks_with_meta, matrix)
+
+
+async def warm_search_index():
+    """Create or migrate the Azure Search index (the local store needs nothing)."""
+    vector_store = get_vector_store()
+    if hasattr(vector_store, "aensure_index"):
+        await vector_store.aensure_index()
+
+
+async def warm_tokenizers():
+    """Load the tiktoken encodings used by chunking, embedding batches and prompt budgets."""
+    await asyncio.to_thread(
+        lambda: (get_chunker().tokenizer, get_embedder().batcher.tokenizer,
+                 get_tokenizer(settings.azure_openai_chat_deployment))
+    )
+
+
+async def warm_lexical_index():
+    """Build the BM25 index over the indexed chunks (hybrid / lexical retrieval)."""
+    await get_retriever().alexical_ready()
+
+
+async def warm_clients():
+    """Import the SDKs and build the shared clients; no request is sent."""
+    def build_sync():
+        import langchain.schema  # noqa: F401 (used for every prompt)
+
+        registry.chat_model(0.0, settings.chat_max_answer_tokens)
+        registry.openai_client
+        registry.blob_service_client
+
+    await asyncio.to_thread(build_sync)
+    # aio clients bind to the running loop, so they are built here rather than in the thread
+    registry.async_openai_client
+    registry.async_blob_service_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Services are built lazily by the providers in app/deps/services.py; only the
+    # DB schema is required before serving, everything else warms up in the background
+    warmup = app.state.warmup = Warmup(timeout=settings.warmup_timeout_seconds)
+
+    logger.info("🔧 Creating database tables if not exist...")
+    if await warmup.run("database", lambda: asyncio.to_thread(init_db), required=True):
+        logger.info("✅ Database tables ready")
+
+    if settings.vector_store_load_from_db:
+        await warmup.run("vector_store_from_db", load_vector_store_from_db)
+
+    # Shared Azure clients + connection pools live for the whole app lifetime
+    app.state.clients = registry
+
+    # Start background ingestion workers
+    await get_worker_pool().start()
+
+    if settings.warmup_enabled:
+        warmup.add("search_index", warm_search_index)
+        warmup.add("tokenizers", warm_tokenizers)
+        warmup.add("clients", warm_clients)
+        if settings.retrieval_mode != "vector":
+            warmup.add("lexical_index", warm_lexical_index)
+        warmup.start()
+
+    yield
+
+    logger.info("👋 Shutting down RAG Azure API...")
+    await warmup.aclose()
+    await get_worker_pool().stop()
+    await get_retriever().aclose()
+    await get_conversation_memory().aclose()
+    get_extractor().close()
+    await registry.aclose()
+    await async_engine.dispose()
+
 
 # -------------------------
 # App Initialization
@@ -14,7 +121,8 @@ from app.routers import sessions, upload, process, chat
 app = FastAPI(
     title="RAG Azure API",
     description="Document ingestion and retrieval API using Azure OpenAI, Blob Storage, and FAISS",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # -------------------------
@@ -26,7 +134,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 # -------------------------
 # Include Routers
@@ -37,26 +148,34 @@ app.include_router(process.router, prefix="/process", tags=["process"])
 app.include_router(chat.router)
 
 
-# -------------------------
-# Startup / Shutdown Events
-# -------------------------
-@app.on_event("startup")
-def startup_event():
-    try:
-        # Initialize DB tables
-        logger.info("🔧 Creating database tables if not exist...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables ready")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize DB: {e}")
-
-@app.on_event("shutdown")
-def shutdown_event():
-    logger.info("👋 Shutting down RAG Azure API...")
-
 # -------------------------
 # Optional root endpoint
 # -------------------------
 @app.get("/")
 def root():
     return {"message": "RAG Azure API is running!"}
+
+
+@app.get("/health/live", include_in_schema=False)
+def liveness():
+    """Process is up and serving; says nothing about dependencies."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready", include_in_schema=False)
+def readiness(request: Request):
+    """200 once start-up and warm-up have finished without a required step failing, else 503."""
+    warmup = getattr(request.app.state, "warmup", None)
+    if warmup is None:
+        return JSONResponse({"status": "starting", "checks": {}}, status_code=503)
+    status = "ready" if warmup.ready else ("unavailable" if warmup.finished else "starting")
+    return JSONResponse({"status": status, "checks": warmup.checks}, status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latencies, payload sizes, cache and upstream error counters."""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
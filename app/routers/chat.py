@@ -1,13 +1,28 @@
 # app/routers/chat.py
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from loguru import logger
 from pydantic import BaseModel
-from typing import Optional, List
-from app.services.embedder import Embedder
-from app.services.vector_store.azure_vector_store import AzureVectorStore
-from app.services.llm import AzureChatLLM
-from langchain.schema import SystemMessage, HumanMessage
-from app.config.settings import settings 
+from typing import Literal, Optional, List
+from app.deps.services import (
+    get_answer_cache,
+    get_context_packer,
+    get_conversation_memory,
+    get_embedder,
+    get_llm,
+    get_retriever,
+)
+from app.services.context_packer import ContextPacker, PackedContext
+from app.services.conversation_memory import MemoryWindow
+from app.config.settings import settings
+from app.state import repos
+from app.state.db import db_call
+from app.utils.metrics import PAYLOAD_CHUNKS, PAYLOAD_TOKENS, count_cache, observe_payload, observe_stages
+from app.utils.tokens import count_tokens
 router = APIRouter(
     prefix="/chat",
     tags=["chat"]
@@ -17,51 +32,319 @@ router = APIRouter(
 class ChatRequest(BaseModel):
     query: str
     doc_id: Optional[int] = None  # Optional: restrict search to a specific document
+    session_id: Optional[int] = None  # Optional: keep conversation memory and search only the session's documents
     top_k: int = 5  # Number of chunks to fetch
+    mode: Optional[Literal["vector", "lexical", "hybrid"]] = None  # retrieval mode; defaults to RETRIEVAL_MODE
+    mmr: Optional[bool] = None  # drop near-duplicate chunks with MMR; defaults to MMR_ENABLED
 
 class ChatResponse(BaseModel):
     answer: str
     context_chunks: List[str]
+    cached: bool = False  # True when served from the semantic answer cache
+    context_tokens: int = 0  # prompt tokens spent on context_chunks
+    history_tokens: int = 0  # prompt tokens spent on the session summary and recent turns
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatRequest]
+    stream: bool = False  # stream results as Server-Sent Events in completion order
+
+class ChatBatchResult(BaseModel):
+    index: int  # position in ChatBatchRequest.items
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchResult]
+
+SYSTEM_PROMPT = "You are a helpful assistant providing answers based on provided document context."
+
+
+def _context_budget(query: str, history_tokens: int = 0) -> int:
+    """Context tokens allowed: the configured budget, capped by what the model window leaves free."""
+    overhead = count_tokens(SYSTEM_PROMPT + query, settings.azure_openai_chat_deployment) + 32  # template + message framing
+    available = settings.chat_context_window - settings.chat_max_answer_tokens - overhead - history_tokens
+    return max(0, min(settings.context_token_budget, available))
+
+
+async def _load_memory(request: ChatRequest) -> Optional[MemoryWindow]:
+    """The session's summary and recent turns, or None without a session. Unknown sessions are a 404."""
+    if request.session_id is None:
+        return None
+    window = await get_conversation_memory().aload(request.session_id)
+    if window is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return window
+
+
+async def _retrieve(
+    request: ChatRequest, timings: dict, history_tokens: int = 0
+) -> tuple[List[float], PackedContext]:
+    """Embed the query, fetch the top-k chunks and pack them into the token budget, recording stage timings."""
+    # Step 1: Embed the query
+    started = time.perf_counter()
+    query_embedding = await get_embedder().aembed_text(request.query)
+    timings["embed"] = time.perf_counter() - started
+    return query_embedding, await _search_and_pack(request, query_embedding, timings, history_tokens)
+
+
+async def _search_and_pack(
+    request: ChatRequest, query_embedding: List[float], timings: dict, history_tokens: int = 0
+) -> PackedContext:
+    # Step 2: Retrieve top-k relevant chunks (vector, BM25 or fused), filtered in the index
+    started = time.perf_counter()
+    doc_ids = await db_call(repos.resolve_index_document_ids, request.doc_id, request.session_id)
+    hits = await get_retriever().aretrieve(
+        request.query,
+        query_embedding,
+        k=request.top_k,
+        mode=request.mode or settings.retrieval_mode,
+        doc_ids=doc_ids,
+        mmr=settings.mmr_enabled if request.mmr is None else request.mmr,
+    )
+    timings["search"] = time.perf_counter() - started
+
+    # Step 3: Merge neighbouring chunks and fill the token budget in relevance order
+    started = time.perf_counter()
+    positions = await db_call(repos.get_chunk_positions, [hit["id"] for hit in hits])
+    for hit in hits:
+        if hit["id"] in positions:
+            hit["doc_id"], hit["position"] = positions[hit["id"]]
+    packed = get_context_packer().pack(hits, budget_tokens=_context_budget(request.query, history_tokens))
+    timings["pack"] = time.perf_counter() - started
+    observe_payload(PAYLOAD_CHUNKS, retrieved=len(hits), packed=len(packed.chunks))
+    observe_payload(PAYLOAD_TOKENS, context=packed.tokens, history=history_tokens)
+    return packed
+
+
+async def _index_version() -> Optional[int]:
+    """Shared index version, read before retrieval so an ingest landing mid-request invalidates the answer."""
+    if not settings.answer_cache_enabled:
+        return None
+    return await db_call(repos.get_index_version)
+
+
+def _cache_lookup(query_embedding: List[float], context_chunks: List[str], index_version: Optional[int]) -> Optional[dict]:
+    if not settings.answer_cache_enabled:
+        return None
+    cached = get_answer_cache().lookup(query_embedding, context_chunks, index_version=index_version)
+    count_cache("answer", hits=int(cached is not None), misses=int(cached is None))
+    return cached
+
+
+async def _answer(messages: list, timings: dict) -> str:
+    started = time.perf_counter()
+    answer = await get_llm().achat(messages, max_tokens=settings.chat_max_answer_tokens)
+    timings["llm"] = time.perf_counter() - started
+    observe_payload(PAYLOAD_TOKENS, answer=count_tokens(answer, settings.azure_openai_chat_deployment))
+    return answer
+
+
+def _cache_store(query_embedding: List[float], packed: PackedContext, answer: str, index_version: Optional[int]):
+    if settings.answer_cache_enabled:
+        get_answer_cache().store(
+            query_embedding,
+            packed.chunks,
+            {"answer": answer, "context_chunks": packed.chunks, "context_tokens": packed.tokens},
+            index_version=index_version,
+        )
+
+
+def _build_messages(query: str, context_chunks: List[str], window: Optional[MemoryWindow] = None) -> list:
+    from langchain.schema import SystemMessage, HumanMessage  # slow import, deferred to first use
+
+    context_text = ContextPacker.SEPARATOR.join(context_chunks)
+    user_prompt = f"Context:\n{context_text}\n\nQuestion: {query}"
+
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
+        *(window.messages() if window is not None else []),
+        HumanMessage(content=user_prompt)
+    ]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-# Initialize services
-embedder = Embedder()
-vector_store = AzureVectorStore(
-    endpoint=settings.azure_search_endpoint,
-    key=settings.azure_search_api_key,
-    index_name="documents" 
-)
-llm = AzureChatLLM()
 
 @router.post("/", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest):
     try:
-        # Step 1: Embed the query
-        query_embedding = embedder.embed_text(request.query)
+        timings: dict = {}
+        window = await _load_memory(request)
+        history_tokens = window.tokens if window is not None else 0
+        index_version = await _index_version()
+        query_embedding, packed = await _retrieve(request, timings, history_tokens=history_tokens)
 
-        # Step 2: Search Azure Vector Store for top-k relevant chunks
-        results = vector_store.search(
-            query_embedding,
-            k=request.top_k,
-            #doc_id=request.doc_id  # pass doc_id for optional filtering at search level
+        # Same question (semantically) over the same chunks: reuse the answer.
+        # Follow-ups depend on the conversation, so only fresh conversations use the cache.
+        use_cache = window is None or window.empty
+        cached = _cache_lookup(query_embedding, packed.chunks, index_version) if use_cache else None
+        if cached is not None:
+            if request.session_id is not None:
+                await get_conversation_memory().aappend(request.session_id, request.query, cached["answer"])
+            observe_stages("chat", timings)
+            return ChatResponse(**cached, cached=True)
+
+        # Step 4: Construct messages for LLM
+        messages = _build_messages(request.query, packed.chunks, window)
+
+        # Step 5: Get response from LLM
+        answer = await _answer(messages, timings)
+        observe_stages("chat", timings)
+        if use_cache:
+            _cache_store(query_embedding, packed, answer, index_version)
+        if request.session_id is not None:
+            await get_conversation_memory().aappend(request.session_id, request.query, answer)
+
+        return ChatResponse(
+            answer=answer, context_chunks=packed.chunks, context_tokens=packed.tokens, history_tokens=history_tokens
         )
 
-        # Extract content for context
-        context_chunks = results
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat processing failed: {e}")
+
+
+@router.post("/batch", response_model=ChatBatchResponse)
+async def chat_batch_endpoint(batch: ChatBatchRequest):
+    """
+    Answer many questions in one call.
+
+    All queries are embedded in one batched request, searches run concurrently
+    and LLM calls fan out with at most CHAT_BATCH_LLM_CONCURRENCY in flight.
+    Items are independent questions: ``session_id`` only scopes the search,
+    conversation memory is neither read nor written.
+    Results come back in input order, or with ``stream=true`` as ``result``
+    events in completion order followed by ``done``. A failing item reports
+    its own ``error`` without failing the batch.
+    """
+    if len(batch.items) > settings.chat_batch_max_items:
+        raise HTTPException(status_code=413, detail=f"At most {settings.chat_batch_max_items} items per batch")
+
+    try:
+        started = time.perf_counter()
+        index_version = await _index_version()
+        query_embeddings = await get_embedder().aembed_batch([item.query for item in batch.items])
+        observe_stages("chat_batch", {"embed": time.perf_counter() - started})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat processing failed: {e}")
+
+    search_slots = asyncio.Semaphore(settings.chat_batch_search_concurrency)
+    llm_slots = asyncio.Semaphore(settings.chat_batch_llm_concurrency)
+
+    async def answer(index: int) -> ChatBatchResult:
+        item, query_embedding = batch.items[index], query_embeddings[index]
+        timings: dict = {}
+        try:
+            async with search_slots:
+                packed = await _search_and_pack(item, query_embedding, timings)
+            cached = _cache_lookup(query_embedding, packed.chunks, index_version)
+            if cached is not None:
+                observe_stages("chat_batch", timings)
+                return ChatBatchResult(index=index, response=ChatResponse(**cached, cached=True))
 
-        # Step 3: Construct messages for LLM
-        system_prompt = "You are a helpful assistant providing answers based on provided document context."
-        context_text = "\n\n".join(context_chunks)
-        user_prompt = f"Context:\n{context_text}\n\nQuestion: {request.query}"
+            async with llm_slots:
+                text = await _answer(_build_messages(item.query, packed.chunks), timings)
+            observe_stages("chat_batch", timings)
+            _cache_store(query_embedding, packed, text, index_version)
+            response = ChatResponse(answer=text, context_chunks=packed.chunks, context_tokens=packed.tokens)
+            return ChatBatchResult(index=index, response=response)
+        except Exception as e:
+            logger.error(f"❌ Batch item {index} failed: {e}")
+            return ChatBatchResult(index=index, error=f"Chat processing failed: {e}")
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+    if not batch.stream:
+        return ChatBatchResponse(results=await asyncio.gather(*(answer(i) for i in range(len(batch.items)))))
 
-        # Step 4: Get response from LLM
-        answer = llm.chat(messages)
+    async def event_stream():
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(batch.items))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                yield _sse("result", result.model_dump())
+            yield _sse("done", {"count": len(tasks)})
+        finally:
+            # Client went away: stop the remaining searches / LLM calls
+            for task in tasks:
+                task.cancel()
 
-        return ChatResponse(answer=answer, context_chunks=context_chunks)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
+
+@router.post("/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Server-Sent Events variant of /chat.
+
+    Events: ``context`` (packed chunks, their token count and the history token count),
+    then one ``token`` per answer delta, then ``done`` with token usage, per-stage timings
+    and the cache flag (or ``error``). A cache hit is sent as a single ``token`` event.
+    If the client disconnects the LLM stream is closed, cancelling the upstream call,
+    and the unfinished turn is not added to the session's memory.
+    """
+    timings: dict = {}
+    window = await _load_memory(request)
+    history_tokens = window.tokens if window is not None else 0
+    try:
+        index_version = await _index_version()
+        query_embedding, packed = await _retrieve(request, timings, history_tokens)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {e}")
+    observe_stages("chat", timings)  # before the response starts, so they reach Server-Timing
+
+    messages = _build_messages(request.query, packed.chunks, window)
+    use_cache = window is None or window.empty
+    cached = _cache_lookup(query_embedding, packed.chunks, index_version) if use_cache else None
+
+    async def event_stream():
+        yield _sse(
+            "context",
+            {"context_chunks": packed.chunks, "context_tokens": packed.tokens, "history_tokens": history_tokens},
+        )
+
+        if cached is not None:
+            if request.session_id is not None:
+                await get_conversation_memory().aappend(request.session_id, request.query, cached["answer"])
+            yield _sse("token", {"delta": cached["answer"]})
+            yield _sse("done", {"usage": {}, "timings": timings, "cached": True})
+            return
+
+        usage: dict = {}
+        completion = []
+        started = time.perf_counter()
+        stream = get_llm().astream(messages, max_tokens=settings.chat_max_answer_tokens, usage=usage)
+        try:
+            async for delta in stream:
+                if "first_token" not in timings:
+                    timings["first_token"] = time.perf_counter() - started
+                if await http_request.is_disconnected():
+                    logger.info("🔌 Chat stream client disconnected; cancelling LLM call")
+                    return
+                completion.append(delta)
+                yield _sse("token", {"delta": delta})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Chat processing failed: {e}"})
+            return
+        finally:
+            await stream.aclose()
+
+        timings["llm"] = time.perf_counter() - started
+        observe_stages("chat", {stage: timings[stage] for stage in ("first_token", "llm") if stage in timings})
+        observe_payload(PAYLOAD_TOKENS, answer=usage.get("completion_tokens", 0))
+        answer = "".join(completion)
+        if use_cache:
+            _cache_store(query_embedding, packed, answer, index_version)
+        if request.session_id is not None:
+            await get_conversation_memory().aappend(request.session_id, request.query, answer)
+        yield _sse("done", {"usage": usage, "timings": timings, "cached": False})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
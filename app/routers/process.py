@@ -1,68 +1,84 @@
 # app/routers/process.py
 
+import json
 from fastapi import APIRouter, HTTPException, Depends
-from loguru import logger
-from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.config.settings import settings 
-from app.services.storage_manager import StorageManager
-from app.services.extractor import Extractor
-from app.services.chunker import Chunker
-from app.services.embedder import Embedder
-from app.services.vector_store.azure_vector_store import AzureVectorStore
-from app.state.repos import get_document_by_id
-from app.state.db import get_db
+from app.deps.services import get_worker_pool
+from app.services.ingest_queue import IngestWorkerPool
+from app.state.repos import get_document_by_id, get_ingest_job, get_latest_ingest_job
+from app.state.db import get_async_db, get_db
 router = APIRouter()
 
-storage = StorageManager()
-extractor = Extractor()
-chunker = Chunker(chunk_size=1000, overlap=200, model="gpt-4")
-embedder = Embedder()
-vector_store = AzureVectorStore(
-    endpoint=settings.azure_search_endpoint,
-    key=settings.azure_search_api_key,
-    index_name="documents" 
-)
 
-tmp_dir = Path("./data/tmp")
-tmp_dir.mkdir(parents=True, exist_ok=True)
+def _job_to_dict(job) -> dict:
+    return {
+        "jobId": job.id,
+        "documentId": job.document_id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": {"chunksEmbedded": job.chunks_embedded, "chunksTotal": job.chunks_total},
+        "timings": json.loads(job.timings) if job.timings else {},
+        "chunks": json.loads(job.chunk_changes) if job.chunk_changes else None,
+        "attempts": job.attempts,
+        "error": job.error,
+        "createdAt": job.created_at.isoformat() if job.created_at else None,
+        "startedAt": job.started_at.isoformat() if job.started_at else None,
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
+    }
 
 
-@router.post("/{doc_id}")
-async def process_document(doc_id: int, db: Session = Depends(get_db)):
-    try:
-        doc = get_document_by_id(db, doc_id)
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
+@router.post("/{doc_id}", status_code=202)
+async def process_document(
+    doc_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    worker_pool: IngestWorkerPool = Depends(get_worker_pool),
+):
+    """
+    Queue a document for download → extract → chunk → embed → index.
+    Returns the job id immediately; poll GET /process/jobs/{job_id} for progress.
+    """
+    doc = await db.run_sync(get_document_by_id, doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
 
-        local_path = tmp_dir / doc.name
-        storage.download_file(blob_name=doc.blob_url, file_path=str(local_path))
-
-        text = extractor.extract_text(str(local_path))
-        if not text:
-            raise HTTPException(status_code=400, detail="Failed to extract text")
-
-        chunks = chunker.chunk_text(text)
-        embeddings = embedder.embed_batch(chunks)
-
-        # chunks + metadata for indexing
-        chunks_with_meta = [
-            {"content": chunk, "doc_id": str(doc_id), "chunk_id": str(idx)}
-            for idx, chunk in enumerate(chunks)
-        ]
-
-        ok = vector_store.add_embeddings(chunks_with_meta, embeddings)
-        if not ok:
-            raise HTTPException(status_code=500, detail="Indexing in Azure Cognitive Search failed.")
+    # Duplicate uploads share the original's blob and index entries: no download or re-embedding
+    target_id = doc.source_document_id or doc_id
+    if doc.source_document_id:
+        done = await db.run_sync(get_latest_ingest_job, target_id, status="succeeded")
+        if done:
+            return {
+                "doc_id": doc_id,
+                "job_id": done.id,
+                "status": done.status,
+                "message": f"Identical content already indexed as document {target_id}"
+            }
 
+    active = await db.run_sync(get_latest_ingest_job, target_id)
+    if active and active.status in ("queued", "running"):
         return {
             "doc_id": doc_id,
-            "num_chunks": len(chunks),
-            "message": "Document processed and indexed successfully"
+            "job_id": active.id,
+            "status": active.status,
+            "message": "Document is already being processed"
         }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Processing failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    job = await worker_pool.enqueue(target_id)
+    return {
+        "doc_id": doc_id,
+        "job_id": job.id,
+        "status": job.status,
+        "message": "Document queued for processing"
+    }
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Report stage, progress and per-stage timings of an ingest job.
+    Raises 404 if job not found.
+    """
+    job = get_ingest_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_to_dict(job)
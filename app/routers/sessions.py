@@ -30,21 +30,21 @@ def start_session(data: SessionCreateRequest, db: Session = Depends(get_db)):
     Returns session_id.
     """
     session = repos.create_session(db=db, user_id=data.user_id)
-    return {"sessionId": session.session_id}
+    return {"sessionId": str(session.id)}
 
 
 @router.get("/{session_id}", response_model=SessionResponse)
-def get_session(session_id: str, db: Session = Depends(get_db)):
+def get_session(session_id: int, db: Session = Depends(get_db)):
     """
     Retrieve session info by session_id.
     Raises 404 if session not found.
     """
-    session = repos.create_session(db=db, session_id=session_id)
+    session = repos.get_session(db=db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     return {
-        "sessionId": session.session_id,
+        "sessionId": str(session.id),
         "userId": session.user_id,
         "createdAt": session.created_at.isoformat()
     }
@@ -1,58 +1,68 @@
 # app/routers/upload.py
-import os
-import tempfile
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+import time
+import uuid
 from datetime import datetime
+from typing import Optional
 
 from app.state import repos
-from app.state.db import get_db
+from app.state.db import get_async_db
+from app.deps.services import get_storage
 from app.services.storage_manager import StorageManager
+from app.utils.metrics import observe_stages
 
 router = APIRouter()
 
 @router.post("/")
 async def upload_document(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    session_id: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    storage_manager: StorageManager = Depends(get_storage),
 ):
     """
-    Uploads a file to Azure Blob Storage without requiring session_id.
+    Uploads a file to Azure Blob Storage. With ``session_id`` the document belongs
+    to that session, and /chat with the same ``session_id`` searches only its documents.
     """
-    storage_manager = StorageManager()
+    if session_id is not None and await db.run_sync(repos.get_session, session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
 
-    # Unique blob name with timestamp
+    # Unique blob name: timestamp for readability, random suffix so same-second uploads never collide
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    blob_name = f"{timestamp}_{file.filename}"
-
-    # Write file to temp
-    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-        temp_path = tmp_file.name
-        tmp_file.write(await file.read())
+    blob_name = f"{timestamp}_{uuid.uuid4().hex[:8]}_{file.filename}"
 
     try:
-        # Upload to Azure Blob
-        storage_manager.upload_file(temp_path, blob_name)
+        # Stream the request body to Azure Blob as staged blocks (no full in-memory copy);
+        # identical content that is already stored is hashed locally and never uploaded
+        async def is_known(content_hash: str) -> bool:
+            return await db.run_sync(repos.get_document_by_hash, content_hash) is not None
+
+        started = time.perf_counter()
+        transfer = await storage_manager.aupload_stream(file, blob_name, skip_if=is_known)
+        observe_stages("upload", {"upload": time.perf_counter() - started})
+
+        source = None if transfer["committed"] else await db.run_sync(repos.get_document_by_hash, transfer["sha256"])
 
-        # Insert into DB without session
-        doc = repos.create_document(
-            db=db,
-            session_id=None,
+        # Duplicates point at the original blob and index entries (chat resolves them to the original)
+        doc = await db.run_sync(
+            repos.create_document,
+            session_id=session_id,
             filename=file.filename,
-            blob_url=blob_name
+            blob_url=source.blob_url if source else blob_name,
+            content_hash=transfer["sha256"],
+            source_document_id=source.id if source else None
         )
 
         return {
-            "message": "File uploaded successfully",
-            "blobPath": blob_name,
-            "documentId": doc.id
+            "message": "Duplicate of an existing document; reusing it" if source else "File uploaded successfully",
+            "blobPath": doc.blob_url,
+            "documentId": doc.id,
+            "sessionId": doc.session_id,
+            "sourceDocumentId": doc.source_document_id,
+            "transfer": transfer
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
 
-    finally:
-        try:
-            os.remove(temp_path)
-        except Exception:
-            pass
@@ -0,0 +1,128 @@
+# app/services/answer_cache.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.utils.hashing import sha256_from_text
+
+
+class AnswerCache:
+    """
+    Semantic cache of chat answers.
+
+    An entry is reused when a new query's embedding has cosine similarity
+    >= ``threshold`` with a cached query *and* retrieval returned the same
+    chunk set. Entries expire after ``ttl_seconds``, the least recently used
+    are evicted beyond ``max_entries``, and everything is dropped when the
+    index version changes (``repos.get_index_version``: bumped in the database
+    by every ingest, so it is shared by all worker processes).
+    """
+
+    def __init__(self, threshold: float = 0.97, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()  # LRU order
+        self._by_context: dict[str, set] = {}
+        self._index_version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def context_key(context_chunks: List[str]) -> str:
+        return sha256_from_text("\x00".join(sorted(context_chunks)))
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    # -------------------- Internal --------------------
+    def _drop(self, entry_id: str):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_context.get(entry["context_key"])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_context[entry["context_key"]]
+
+    def _sync_version(self, index_version):
+        if index_version != self._index_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._by_context.clear()
+            self._index_version = index_version
+
+    # -------------------- Public API --------------------
+    def lookup(self, query_embedding: List[float], context_chunks: List[str], index_version=None) -> Optional[dict]:
+        """Return the cached response payload, or None on a miss."""
+        key = self.context_key(context_chunks)
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(index_version)
+
+            ids = [i for i in self._by_context.get(key, ()) if now - self._entries[i]["created"] <= self.ttl_seconds]
+            for expired in set(self._by_context.get(key, ())) - set(ids):
+                self._drop(expired)
+            if not ids:
+                self.misses += 1
+                return None
+
+            query = self._normalize(query_embedding)
+            matrix = np.stack([self._entries[i]["embedding"] for i in ids])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id]["response"]
+
+    def store(self, query_embedding: List[float], context_chunks: List[str], response: dict, index_version=None):
+        key = self.context_key(context_chunks)
+        with self._lock:
+            self._sync_version(index_version)
+            entry_id = uuid.uuid4().hex
+            self._entries[entry_id] = {
+                "embedding": self._normalize(query_embedding),
+                "context_key": key,
+                "response": response,
+                "created": time.monotonic(),
+            }
+            self._by_context.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
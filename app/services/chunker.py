@@ -1,52 +1,174 @@
 
-import logging
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Union
 from app.config.settings import settings
-try:
-    import tiktoken
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
-    logging.warning("tiktoken not installed, falling back to simple word splitter.")
+from app.utils.tokens import get_tokenizer
+
+
+@dataclass
+class TextChunk:
+    """A chunk plus its position in the source document (end offsets are exclusive)."""
+    text: str
+    index: int
+    char_start: int
+    char_end: int
+    token_start: int
+    token_end: int
+
 
 class Chunker:
-    def __init__(self, chunk_size: int = 1000, overlap: int = 200, model: str = None):
+    # Upper bound on how much text is encoded at once; segments are cut at
+    # paragraph breaks (or lines / spaces) below this size.
+    MAX_SEGMENT_CHARS = 64_000
+
+    # Chunks end right after the match; following whitespace starts the next chunk
+    _PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+    _SENTENCE_RE = re.compile(r"[.!?][\"')\]]*(?=\s)|\n")
+    BOUNDARIES = (None, "sentence", "paragraph")
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        model: str = None,
+        boundary: Optional[str] = None,
+        boundary_tolerance: int = 100,
+    ):
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        if boundary not in self.BOUNDARIES:
+            raise ValueError(f"boundary must be one of {self.BOUNDARIES}")
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.model = model or settings.azure_openai_chat_deployment
+        self.boundary = boundary
+        self.boundary_tolerance = boundary_tolerance
 
-        if TIKTOKEN_AVAILABLE:
-            try:
-                self.tokenizer = tiktoken.encoding_for_model(model)
-            except KeyError:
-                logging.warning(f"Tokenizer for model {model} not found. Falling back to cl100k_base.")
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")
-        else:
-            self.tokenizer = None  # fallback mode
+    @property
+    def tokenizer(self):
+        """The model's encoding, loaded on first use (tiktoken may download it)."""
+        return get_tokenizer(self.model)  # None without tiktoken: word-splitting fallback
 
     def chunk_text(self, text: str):
         """
         Splits text into overlapping chunks using tokens if available,
         otherwise falls back to word-based splitting.
         """
+        return [chunk.text for chunk in self.iter_chunks(text)]
+
+    # -------------------- Streaming mode --------------------
+    def iter_chunks(
+        self,
+        source: Union[str, Iterable[str]],
+        boundary: Optional[str] = None,
+        tolerance: Optional[int] = None,
+    ) -> Iterator[TextChunk]:
+        """
+        Yield overlapping chunks with character and token offsets.
+
+        ``source`` is a string or an iterable of consecutive segments (e.g. pages);
+        offsets refer to the concatenation of the segments. Text is encoded one
+        segment at a time and only the current window is buffered, and chunk text
+        is sliced from the source rather than decoded, so overlaps cost nothing.
+
+        With ``boundary="sentence"`` or ``"paragraph"`` a chunk's end is moved
+        back by at most ``tolerance`` tokens to the nearest such boundary.
+        """
+        boundary = boundary if boundary is not None else self.boundary
+        if boundary not in self.BOUNDARIES:
+            raise ValueError(f"boundary must be one of {self.BOUNDARIES}")
+        tolerance = self.boundary_tolerance if tolerance is None else tolerance
+
+        tokens: list = []
+        starts: List[int] = []  # absolute char offset of each buffered token
+        buf_text = ""
+        text_base = 0  # absolute char offset of buf_text[0]
+        token_base = 0  # absolute token index of tokens[0]
+        char_pos = 0  # absolute char offset where the next segment begins
+        index = 0
+
+        def emit(final: bool) -> TextChunk:
+            nonlocal tokens, starts, buf_text, text_base, token_base, index
+            end = min(self.chunk_size, len(tokens))
+            if end < len(tokens) and boundary:
+                end = self._snap_to_boundary(buf_text, text_base, starts, end, boundary, tolerance)
+
+            char_start = starts[0]
+            char_end = starts[end] if end < len(tokens) else char_pos
+            chunk = TextChunk(
+                text=buf_text[char_start - text_base:char_end - text_base],
+                index=index,
+                char_start=char_start,
+                char_end=char_end,
+                token_start=token_base,
+                token_end=token_base + end,
+            )
+            index += 1
+
+            advance = len(tokens) if final else max(end - self.overlap, 1)
+            tokens, starts = tokens[advance:], starts[advance:]
+            token_base += advance
+            new_base = starts[0] if starts else char_pos
+            buf_text = buf_text[new_base - text_base:]
+            text_base = new_base
+            return chunk
+
+        for segment in self._segments(source):
+            seg_tokens, seg_starts = self._encode(segment)
+            tokens += seg_tokens
+            starts += [char_pos + s for s in seg_starts]
+            buf_text += segment
+            char_pos += len(segment)
+            while len(tokens) > self.chunk_size:
+                yield emit(final=False)
+
+        while tokens:
+            yield emit(final=len(tokens) <= self.chunk_size)
+
+    def _encode(self, segment: str):
+        """Return (tokens, char offset of each token within the segment)."""
         if self.tokenizer:
-            tokens = self.tokenizer.encode(text)
-            chunks = []
-            start = 0
-            while start < len(tokens):
-                end = start + self.chunk_size
-                chunk_tokens = tokens[start:end]
-                chunk_text = self.tokenizer.decode(chunk_tokens)
-                chunks.append(chunk_text)
-                start += self.chunk_size - self.overlap
-            return chunks
-        else:
-            # Simple word-based fallback
-            words = text.split()
-            chunks = []
-            start = 0
-            while start < len(words):
-                end = start + self.chunk_size
-                chunk = " ".join(words[start:end])
-                chunks.append(chunk)
-                start += self.chunk_size - self.overlap
-            return chunks
+            seg_tokens = self.tokenizer.encode(segment, disallowed_special=())
+            _, offsets = self.tokenizer.decode_with_offsets(seg_tokens)
+            return seg_tokens, offsets
+        # Simple word-based fallback
+        matches = list(re.finditer(r"\S+", segment))
+        return [m.group() for m in matches], [m.start() for m in matches]
+
+    def _segments(self, source: Union[str, Iterable[str]]) -> Iterator[str]:
+        parts = [source] if isinstance(source, str) else source
+        for part in parts:
+            pos = 0
+            while pos < len(part):
+                end = pos + self.MAX_SEGMENT_CHARS
+                if end >= len(part):
+                    yield part[pos:]
+                    break
+                cut = part.rfind("\n\n", pos, end)
+                if cut <= pos:
+                    cut = part.rfind("\n", pos, end)
+                if cut <= pos:
+                    cut = part.rfind(" ", pos, end)
+                cut = end if cut <= pos else cut + 1
+                yield part[pos:cut]
+                pos = cut
+
+    def _snap_to_boundary(self, buf_text, text_base, starts, end, boundary, tolerance) -> int:
+        """Move ``end`` back to the last paragraph/sentence break within ``tolerance`` tokens."""
+        lo = max(end - tolerance, 1)
+        region_start = starts[lo] - text_base
+        region = buf_text[region_start:starts[end] - text_base]
+
+        patterns = [self._PARAGRAPH_RE] if boundary == "paragraph" else [self._PARAGRAPH_RE, self._SENTENCE_RE]
+        for pattern in patterns:
+            last = None
+            for last in pattern.finditer(region):
+                pass
+            if last is not None:
+                cut = text_base + region_start + last.end()
+                snapped = bisect_left(starts, cut)
+                if lo <= snapped <= end:
+                    return snapped
+        return end
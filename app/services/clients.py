@@ -0,0 +1,266 @@
+# app/services/clients.py
+import asyncio
+from typing import TYPE_CHECKING, Optional
+
+import aiohttp
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+from app.config.settings import settings
+
+# The Azure / OpenAI / LangChain SDKs take seconds to import; each is
+# imported when its first client is built (or by the start-up warm-up).
+if TYPE_CHECKING:
+    from azure.core.pipeline.transport import AioHttpTransport, RequestsTransport
+    from azure.search.documents import SearchClient
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+    from azure.search.documents.indexes import SearchIndexClient
+    from azure.storage.blob import BlobServiceClient
+    from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+    from langchain_openai import AzureChatOpenAI
+    from openai import AzureOpenAI, AsyncAzureOpenAI
+
+OPENAI_API_VERSION = "2024-05-01-preview"  # works for embeddings + chat
+CHAT_API_VERSION = "2023-07-01-preview"
+
+
+class ClientRegistry:
+    """
+    Owns every long-lived Azure / OpenAI client and the keep-alive HTTP
+    connection pools underneath them.
+
+    Clients are created on first use and then shared by all services, so
+    a request reuses warm TLS connections instead of opening new ones.
+    Async clients must first be touched from inside the event loop
+    (aiohttp sessions bind to the running loop). ``aclose()`` is called
+    from the app lifespan on shutdown.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._requests_session: Optional[requests.Session] = None
+        self._aiohttp_session: Optional[aiohttp.ClientSession] = None
+        self._httpx_client: Optional[httpx.Client] = None
+        self._httpx_async_client: Optional[httpx.AsyncClient] = None
+
+        self._blob_service_client = None
+        self._async_blob_service_client = None
+        self._search_clients: dict = {}
+        self._async_search_clients: dict = {}
+        self._index_clients: dict = {}
+        self._openai_client = None
+        self._async_openai_client = None
+        self._chat_models: dict = {}
+
+    # -------------------- HTTP pools --------------------
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+
+    @property
+    def requests_session(self) -> requests.Session:
+        if self._requests_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.http_max_keepalive,
+                pool_maxsize=settings.http_max_connections,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._requests_session = session
+        return self._requests_session
+
+    @property
+    def aiohttp_session(self) -> aiohttp.ClientSession:
+        if self._aiohttp_session is None or self._aiohttp_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.http_max_connections,
+                keepalive_timeout=settings.http_keepalive_expiry,
+            )
+            self._aiohttp_session = aiohttp.ClientSession(connector=connector)
+        return self._aiohttp_session
+
+    @property
+    def httpx_client(self) -> httpx.Client:
+        if self._httpx_client is None:
+            self._httpx_client = httpx.Client(limits=self._limits(), timeout=self._timeout())
+        return self._httpx_client
+
+    @property
+    def httpx_async_client(self) -> httpx.AsyncClient:
+        if self._httpx_async_client is None:
+            self._httpx_async_client = httpx.AsyncClient(limits=self._limits(), timeout=self._timeout())
+        return self._httpx_async_client
+
+    def _transport(self) -> "RequestsTransport":
+        from azure.core.pipeline.transport import RequestsTransport
+
+        return RequestsTransport(session=self.requests_session, session_owner=False)
+
+    def _async_transport(self) -> "AioHttpTransport":
+        from azure.core.pipeline.transport import AioHttpTransport
+
+        return AioHttpTransport(session=self.aiohttp_session, session_owner=False)
+
+    # -------------------- Blob Storage --------------------
+    @staticmethod
+    def _storage_connection_string() -> str:
+        return (
+            f"DefaultEndpointsProtocol=https;"
+            f"AccountName={settings.azure_storage_account};"
+            f"AccountKey={settings.azure_storage_key};"
+            f"EndpointSuffix=core.windows.net"
+        )
+
+    @staticmethod
+    def _blob_transfer_options() -> dict:
+        # Blobs above the single-shot size move as ranged GETs / staged blocks of blob_chunk_size
+        return {
+            "max_single_get_size": settings.blob_single_shot_size,
+            "max_chunk_get_size": settings.blob_chunk_size,
+            "max_single_put_size": settings.blob_single_shot_size,
+            "max_block_size": settings.blob_chunk_size,
+        }
+
+    @property
+    def blob_service_client(self) -> "BlobServiceClient":
+        if self._blob_service_client is None:
+            from azure.storage.blob import BlobServiceClient
+
+            self._blob_service_client = BlobServiceClient.from_connection_string(
+                self._storage_connection_string(), transport=self._transport(), **self._blob_transfer_options()
+            )
+        return self._blob_service_client
+
+    @property
+    def async_blob_service_client(self) -> "AsyncBlobServiceClient":
+        if self._async_blob_service_client is None:
+            from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+            self._async_blob_service_client = AsyncBlobServiceClient.from_connection_string(
+                self._storage_connection_string(), transport=self._async_transport(), **self._blob_transfer_options()
+            )
+        return self._async_blob_service_client
+
+    # -------------------- Cognitive Search --------------------
+    def search_index_client(self, endpoint: str, key: str) -> "SearchIndexClient":
+        if endpoint not in self._index_clients:
+            from azure.core.credentials import AzureKeyCredential
+            from azure.search.documents.indexes import SearchIndexClient
+
+            self._index_clients[endpoint] = SearchIndexClient(
+                endpoint=endpoint, credential=AzureKeyCredential(key), transport=self._transport()
+            )
+        return self._index_clients[endpoint]
+
+    def search_client(self, endpoint: str, key: str, index_name: str) -> "SearchClient":
+        cache_key = (endpoint, index_name)
+        if cache_key not in self._search_clients:
+            from azure.core.credentials import AzureKeyCredential
+            from azure.search.documents import SearchClient
+
+            self._search_clients[cache_key] = SearchClient(
+                endpoint=endpoint, index_name=index_name, credential=AzureKeyCredential(key),
+                transport=self._transport(),
+            )
+        return self._search_clients[cache_key]
+
+    def async_search_client(self, endpoint: str, key: str, index_name: str) -> "AsyncSearchClient":
+        cache_key = (endpoint, index_name)
+        if cache_key not in self._async_search_clients:
+            from azure.core.credentials import AzureKeyCredential
+            from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+            self._async_search_clients[cache_key] = AsyncSearchClient(
+                endpoint=endpoint, index_name=index_name, credential=AzureKeyCredential(key),
+                transport=self._async_transport(),
+            )
+        return self._async_search_clients[cache_key]
+
+    # -------------------- Azure OpenAI --------------------
+    @property
+    def openai_client(self) -> "AzureOpenAI":
+        if self._openai_client is None:
+            from openai import AzureOpenAI
+
+            self._openai_client = AzureOpenAI(
+                api_key=settings.azure_openai_api_key,
+                azure_endpoint=settings.azure_openai_endpoint,
+                api_version=OPENAI_API_VERSION,
+                max_retries=0,  # callers (EmbeddingBatcher) retry per micro-batch
+                http_client=self.httpx_client,
+            )
+        return self._openai_client
+
+    @property
+    def async_openai_client(self) -> "AsyncAzureOpenAI":
+        if self._async_openai_client is None:
+            from openai import AsyncAzureOpenAI
+
+            self._async_openai_client = AsyncAzureOpenAI(
+                api_key=settings.azure_openai_api_key,
+                azure_endpoint=settings.azure_openai_endpoint,
+                api_version=OPENAI_API_VERSION,
+                max_retries=0,  # callers (EmbeddingBatcher) retry per micro-batch
+                http_client=self.httpx_async_client,
+            )
+        return self._async_openai_client
+
+    def chat_model(self, temperature: float, max_tokens: int, streaming: bool = False) -> "AzureChatOpenAI":
+        """One LangChain chat model per parameter set, all on the shared HTTP pools."""
+        cache_key = (temperature, max_tokens, streaming)
+        if cache_key not in self._chat_models:
+            from langchain_openai import AzureChatOpenAI
+
+            self._chat_models[cache_key] = AzureChatOpenAI(
+                deployment_name=settings.azure_openai_chat_deployment,
+                model=settings.azure_openai_chat_deployment,  # `model_name` is deprecated, use `model`
+                azure_endpoint=settings.azure_openai_endpoint,
+                api_version=CHAT_API_VERSION,
+                api_key=settings.azure_openai_api_key,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                streaming=streaming,
+                http_client=self.httpx_client,
+                http_async_client=self.httpx_async_client,
+            )
+        return self._chat_models[cache_key]
+
+    # -------------------- Lifecycle --------------------
+    async def aclose(self):
+        """Close async SDK clients first, then the pools they run on."""
+        closers = [c.close() for c in self._async_search_clients.values()]
+        if self._async_blob_service_client is not None:
+            closers.append(self._async_blob_service_client.close())
+        await asyncio.gather(*closers, return_exceptions=True)
+
+        for client in [*self._search_clients.values(), *self._index_clients.values()]:
+            client.close()
+        if self._blob_service_client is not None:
+            self._blob_service_client.close()
+
+        if self._httpx_async_client is not None:
+            await self._httpx_async_client.aclose()
+        if self._aiohttp_session is not None:
+            await self._aiohttp_session.close()
+        if self._httpx_client is not None:
+            self._httpx_client.close()
+        if self._requests_session is not None:
+            self._requests_session.close()
+
+        self._reset()
+        logger.info("👋 Closed shared Azure clients")
+
+
+# Process-wide registry; its lifetime is managed by the app lifespan in app/main.py
+registry = ClientRegistry()
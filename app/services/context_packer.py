@@ -0,0 +1,115 @@
+# app/services/context_packer.py
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.utils.tokens import count_tokens, truncate_tokens
+
+
+@dataclass
+class PackedContext:
+    chunks: List[str] = field(default_factory=list)
+    tokens: int = 0  # tokens of the joined context, separators included
+    merged: int = 0  # hits folded into a neighbouring chunk
+    trimmed: bool = False  # a block was cut at a sentence boundary
+    dropped: int = 0  # blocks that did not fit in what was left of the budget
+
+
+class ContextPacker:
+    """
+    Assemble retrieved chunks into the prompt context within a token budget.
+
+    Hits from the same document at consecutive manifest positions are merged
+    into one block with the chunker's overlap removed. Blocks are then added
+    in relevance order (a block ranks as its best hit). A block that does not
+    fit is trimmed back to its last sentence boundary when enough budget is
+    left, otherwise skipped; later, smaller blocks still fill what remains.
+    """
+
+    SEPARATOR = "\n\n"
+    _SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*(?=\s)|\n")
+
+    def __init__(self, budget_tokens: int = 3000, model: str = "", min_trim_tokens: int = 32):
+        self.budget_tokens = budget_tokens
+        self.model = model
+        self.min_trim_tokens = min_trim_tokens
+
+    @staticmethod
+    def merge_overlap(first: str, second: str) -> str:
+        """Concatenate two consecutive chunks, keeping their shared text once."""
+        probe = second[:16]
+        start = first.find(probe) if probe else -1
+        while start != -1:
+            if second.startswith(first[start:]):
+                return first + second[len(first) - start:]
+            start = first.find(probe, start + 1)
+        return first + "\n" + second
+
+    def _blocks(self, hits: List[dict]) -> List[tuple[int, str, int]]:
+        """(rank, text, hits merged) per block, in relevance order."""
+        groups: dict = {}
+        blocks = []
+        for rank, hit in enumerate(hits):
+            if hit.get("doc_id") is None or hit.get("position") is None:
+                blocks.append((rank, hit["content"].strip(), 1))
+            else:
+                groups.setdefault(hit["doc_id"], {}).setdefault(hit["position"], (rank, hit["content"]))
+
+        for by_position in groups.values():
+            run: list = []
+            for position in sorted(by_position):
+                if run and position != run[-1][0] + 1:
+                    blocks.append(self._merge_run(run))
+                    run = []
+                run.append((position, *by_position[position]))
+            blocks.append(self._merge_run(run))
+
+        blocks.sort(key=lambda block: block[0])
+        return blocks
+
+    def _merge_run(self, run: list) -> tuple[int, str, int]:
+        text = run[0][2]
+        for _, _, content in run[1:]:
+            text = self.merge_overlap(text, content)
+        return min(rank for _, rank, _ in run), text.strip(), len(run)
+
+    def _trim(self, text: str, max_tokens: int) -> str:
+        prefix = truncate_tokens(text, max_tokens, self.model)
+        last = None
+        for last in self._SENTENCE_END_RE.finditer(prefix):
+            pass
+        return prefix[:last.end()].rstrip() if last else ""
+
+    def pack(self, hits: List[dict], budget_tokens: Optional[int] = None) -> PackedContext:
+        """
+        ``hits`` are in relevance order with ``content`` and, when known,
+        ``doc_id`` and ``position`` (manifest order within the document).
+        """
+        budget = self.budget_tokens if budget_tokens is None else budget_tokens
+        packed = PackedContext()
+        separator_tokens = count_tokens(self.SEPARATOR, self.model)
+
+        blocks = self._blocks(hits)
+        seen = set()
+        for _, text, size in blocks:
+            if text in seen:
+                packed.merged += size
+                continue
+            seen.add(text)
+            packed.merged += size - 1
+
+            cost = count_tokens(text, self.model) + (separator_tokens if packed.chunks else 0)
+            if packed.tokens + cost <= budget:
+                packed.chunks.append(text)
+                packed.tokens += cost
+                continue
+
+            remaining = budget - packed.tokens - (separator_tokens if packed.chunks else 0)
+            trimmed = self._trim(text, remaining) if remaining >= self.min_trim_tokens else ""
+            if trimmed:
+                packed.tokens += count_tokens(trimmed, self.model) + (separator_tokens if packed.chunks else 0)
+                packed.chunks.append(trimmed)
+                packed.trimmed = True
+            else:
+                packed.dropped += 1
+        return packed
@@ -0,0 +1,149 @@
+# app/services/conversation_memory.py
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from loguru import logger
+
+from app.state import repos
+from app.state.db import db_call
+from app.utils.tokens import count_tokens
+
+
+@dataclass
+class MemoryWindow:
+    summary: str = ""
+    turns: List[dict] = field(default_factory=list)  # {role, content}, oldest first
+    tokens: int = 0  # summary + turns
+
+    @property
+    def empty(self) -> bool:
+        return not self.summary and not self.turns
+
+    def messages(self) -> list:
+        """LangChain messages to place between the system prompt and the new question."""
+        from langchain.schema import AIMessage, HumanMessage, SystemMessage  # slow import, deferred to first use
+
+        messages = []
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}"))
+        for turn in self.turns:
+            cls = HumanMessage if turn["role"] == "user" else AIMessage
+            messages.append(cls(content=turn["content"]))
+        return messages
+
+
+class ConversationMemory:
+    """
+    Per-session chat history bounded by a token budget.
+
+    Messages are stored in the ``messages`` table. A prompt gets the session's
+    cached summary plus the newest turns that fit in ``window_tokens``. When the
+    unsummarised turns outgrow the window, the oldest are folded into the
+    summary (one LLM call, in the background) until half the window is free,
+    so the summary is only recomputed every few turns and prompt size stays
+    roughly constant however long the conversation runs.
+    """
+
+    SUMMARY_PROMPT = (
+        "Condense the conversation below into a short summary for the assistant's own use. "
+        "Keep facts, names, numbers, decisions and open questions needed to answer follow-ups. "
+        "Reply with the summary only."
+    )
+
+    def __init__(self, llm, window_tokens: int = 1500, summary_tokens: int = 300, model: str = ""):
+        self.llm = llm
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.model = model
+        self._compacting: set[int] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def aload(self, session_id: int) -> Optional[MemoryWindow]:
+        """Summary plus the newest turns within the window; None if the session does not exist."""
+        memory = await db_call(repos.get_session_memory, session_id)
+        if memory is None:
+            return None
+        window = MemoryWindow(summary=memory["summary"], tokens=memory["summary_tokens"])
+        used = 0
+        kept = []
+        for message in reversed(memory["messages"]):
+            if used + message["tokens"] > self.window_tokens:
+                break
+            used += message["tokens"]
+            kept.append({"role": message["role"], "content": message["content"]})
+        window.turns = kept[::-1]
+        window.tokens += used
+        return window
+
+    async def aappend(self, session_id: int, question: str, answer: str):
+        """Record a finished turn and compact the session in the background if it outgrew the window."""
+        await db_call(
+            repos.add_messages,
+            session_id,
+            [
+                {"role": "user", "content": question, "tokens": count_tokens(question, self.model)},
+                {"role": "assistant", "content": answer, "tokens": count_tokens(answer, self.model)},
+            ],
+        )
+        if session_id in self._compacting:
+            return
+        self._compacting.add(session_id)
+        task = asyncio.create_task(self._acompact(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _acompact(self, session_id: int):
+        try:
+            memory = await db_call(repos.get_session_memory, session_id)
+            if memory is None:
+                return
+            messages = memory["messages"]
+            pending = sum(m["tokens"] for m in messages)
+            if pending <= self.window_tokens:
+                return
+
+            # Fold whole turns from the oldest end until half the window is free again
+            folded = []
+            while messages and pending > self.window_tokens // 2:
+                message = messages.pop(0)
+                pending -= message["tokens"]
+                folded.append(message)
+            if messages and messages[0]["role"] == "assistant":
+                message = messages.pop(0)
+                folded.append(message)
+
+            summary = await self._asummarize(memory["summary"], folded)
+            stored = await db_call(
+                repos.set_session_summary,
+                session_id,
+                summary,
+                count_tokens(summary, self.model),
+                folded[-1]["id"],
+                memory["summarized_until"],
+            )
+            if stored:
+                logger.info(f"🧠 Session {session_id}: folded {len(folded)} messages into the summary")
+        except Exception as e:
+            logger.error(f"❌ Compacting memory of session {session_id} failed: {e}")
+        finally:
+            self._compacting.discard(session_id)
+
+    async def _asummarize(self, summary: str, messages: List[dict]) -> str:
+        from langchain.schema import HumanMessage, SystemMessage
+
+        transcript = "\n".join(
+            f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in messages
+        )
+        prompt = f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
+        return (
+            await self.llm.achat(
+                [SystemMessage(content=self.SUMMARY_PROMPT), HumanMessage(content=prompt)],
+                max_tokens=self.summary_tokens,
+            )
+        ).strip()
+
+    async def aclose(self):
+        """Wait for in-flight compactions (called on shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -1,46 +1,138 @@
 # app/services/embedder.py
 
 import logging
-from typing import List
-from openai import AzureOpenAI
+from typing import List, Optional
+import asyncio
 from app.config.settings import settings  # 👈 import your settings
+from app.services.clients import ClientRegistry, registry
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_batcher import EmbeddingBatcher, EmbeddingBatchError
+from app.utils.metrics import count_cache
 
 class Embedder:
-    def __init__(self):
+    def __init__(self, cache: Optional[EmbeddingCache] = None, clients: Optional[ClientRegistry] = None):
         """
         Initializes Azure OpenAI Embedder wrapper using settings.py.
         """
-        self.client = AzureOpenAI(
-            api_key=settings.azure_openai_api_key,
-            azure_endpoint=settings.azure_openai_endpoint,
-            api_version="2024-05-01-preview"  # works for embeddings + chat
-        )
+        # Shared, pooled clients owned by the registry
+        self.clients = clients or registry
         self.deployment = settings.azure_openai_embedding_deployment
+        self.cache = cache or EmbeddingCache(
+            path=settings.embedding_cache_path or None,
+            max_memory_items=settings.embedding_cache_max_items,
+            max_disk_items=settings.embedding_cache_max_disk_items,
+        )
+        self.batcher = EmbeddingBatcher(
+            embed_fn=self._embed_remote,
+            max_tokens_per_batch=settings.embed_max_tokens_per_batch,
+            max_items_per_batch=settings.embed_max_items_per_batch,
+            max_concurrency=settings.embed_max_concurrency,
+            max_retries=settings.embed_max_retries,
+            model=self.deployment,
+            aembed_fn=self._aembed_remote,
+        )
+
+    @property
+    def client(self):
+        return self.clients.openai_client
+
+    @property
+    def async_client(self):
+        return self.clients.async_openai_client
+
+    def _embed_remote(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(
+            model=self.deployment,
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    async def _aembed_remote(self, texts: List[str]) -> List[List[float]]:
+        response = await self.async_client.embeddings.create(
+            model=self.deployment,
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
 
     def embed_text(self, text: str) -> List[float]:
         """
         Generates embeddings for a single string.
         """
-        try:
-            response = self.client.embeddings.create(
-                model=self.deployment,
-                input=text
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logging.error(f"Embedding failed: {e}")
-            return []
+        return self.embed_batch([text])[0]
 
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Generates embeddings for a batch of strings.
+        Cached vectors are reused and duplicate strings are only sent once.
+        Raises EmbeddingBatchError if any micro-batch fails after retries.
         """
-        try:
-            response = self.client.embeddings.create(
-                model=self.deployment,
-                input=texts
-            )
-            return [item.embedding for item in response.data]
-        except Exception as e:
-            logging.error(f"Batch embedding failed: {e}")
-            return [[] for _ in texts]
+        if not texts:
+            return []
+
+        hashes = [self.cache.key(t) for t in texts]
+        found = self.cache.get_many(self.deployment, dict.fromkeys(hashes))
+
+        # Unique, uncached texts in first-seen order
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+        count_cache("embedding", hits=len(texts) - len(missing), misses=len(missing))
+
+        if missing:
+            keys = list(missing)
+            try:
+                vectors = self.batcher.run(list(missing.values()))
+            except EmbeddingBatchError as e:
+                # Keep what succeeded so a retry only pays for the failed part
+                self.cache.put_many(self.deployment, {keys[i]: v for i, v in e.partial.items()})
+                logging.error(f"Batch embedding failed: {e}")
+                raise
+            fresh = dict(zip(keys, vectors))
+            self.cache.put_many(self.deployment, fresh)
+            found.update(fresh)
+
+        return [found[h] for h in hashes]
+
+    async def aembed_text(self, text: str) -> List[float]:
+        """
+        Async variant of embed_text.
+        """
+        return (await self.aembed_batch([text]))[0]
+
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async variant of embed_batch. Cache lookups run in a worker thread
+        and remote micro-batches are awaited concurrently.
+        """
+        if not texts:
+            return []
+
+        hashes = [self.cache.key(t) for t in texts]
+        found = await asyncio.to_thread(self.cache.get_many, self.deployment, dict.fromkeys(hashes))
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+        count_cache("embedding", hits=len(texts) - len(missing), misses=len(missing))
+
+        if missing:
+            keys = list(missing)
+            try:
+                vectors = await self.batcher.arun(list(missing.values()))
+            except EmbeddingBatchError as e:
+                await asyncio.to_thread(
+                    self.cache.put_many, self.deployment, {keys[i]: v for i, v in e.partial.items()}
+                )
+                logging.error(f"Batch embedding failed: {e}")
+                raise
+            fresh = dict(zip(keys, vectors))
+            await asyncio.to_thread(self.cache.put_many, self.deployment, fresh)
+            found.update(fresh)
+
+        return [found[h] for h in hashes]
+
+    def cache_stats(self) -> dict:
+        """Hit / miss / eviction counters of the embedding cache."""
+        return self.cache.stats()
@@ -0,0 +1,220 @@
+# app/services/embedding_batcher.py
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.utils.metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES
+from app.utils.tokens import get_tokenizer
+
+
+class EmbeddingBatchError(RuntimeError):
+    """
+    Raised when one or more micro-batches still fail after all retries.
+    ``partial`` maps input index -> embedding for every item that did succeed,
+    so callers can keep (or cache) the work that was already paid for.
+    """
+
+    def __init__(self, message: str, failed_indices: List[int], partial: Dict[int, List[float]]):
+        super().__init__(message)
+        self.failed_indices = failed_indices
+        self.partial = partial
+
+
+class EmbeddingBatcher:
+    """
+    Splits texts into micro-batches bounded by token count and item count,
+    sends them concurrently and retries only the batches that failed,
+    using exponential backoff with full jitter.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_tokens_per_batch: int = 16000,
+        max_items_per_batch: int = 64,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        model: Optional[str] = None,
+        aembed_fn: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.aembed_fn = aembed_fn
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_items_per_batch = max_items_per_batch
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.model = model or ""
+
+    @property
+    def tokenizer(self):
+        """The model's encoding, loaded on first use (tiktoken may download it)."""
+        return get_tokenizer(self.model)  # None without tiktoken: character-based estimates
+
+    # -------------------- Planning --------------------
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer:
+            return len(self.tokenizer.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    def plan(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group input indices into batches. A single text larger than the token
+        budget is sent on its own rather than rejected here.
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if current and (
+                current_tokens + tokens > self.max_tokens_per_batch
+                or len(current) >= self.max_items_per_batch
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    # -------------------- Execution --------------------
+    def backoff_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Full-jitter exponential backoff, honouring a server Retry-After hint when present."""
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _check(batch: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        if len(vectors) != len(batch) or any(not v for v in vectors):
+            raise ValueError("Embedding response is missing vectors")
+        return vectors
+
+    def _retry_delay(self, batch: List[str], attempt: int, error: Exception) -> float:
+        delay = self.backoff_delay(attempt, error)
+        UPSTREAM_RETRIES.labels("openai_embeddings").inc()
+        logging.warning(
+            f"Embedding batch of {len(batch)} failed (attempt {attempt + 1}/{self.max_retries + 1}): {error}; "
+            f"retrying in {delay:.2f}s"
+        )
+        return delay
+
+    def _run_batch(self, texts: List[str], indices: List[int]) -> List[List[float]]:
+        batch = [texts[i] for i in indices]
+        attempt = 0
+        while True:
+            try:
+                return self._check(batch, self.embed_fn(batch))
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    UPSTREAM_ERRORS.labels("openai_embeddings").inc()
+                    raise
+                time.sleep(self._retry_delay(batch, attempt, e))
+                attempt += 1
+
+    async def _arun_batch(self, texts: List[str], indices: List[int], semaphore: asyncio.Semaphore):
+        batch = [texts[i] for i in indices]
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    return self._check(batch, await self.aembed_fn(batch))
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    UPSTREAM_ERRORS.labels("openai_embeddings").inc()
+                    raise
+                # Back off outside the semaphore so other batches keep flowing
+                await asyncio.sleep(self._retry_delay(batch, attempt, e))
+                attempt += 1
+
+    def run(self, texts: List[str]) -> List[List[float]]:
+        """Embed ``texts`` and return vectors in input order, or raise EmbeddingBatchError."""
+        if not texts:
+            return []
+
+        batches = self.plan(texts)
+        results: Dict[int, List[float]] = {}
+        failed: List[int] = []
+        errors: List[str] = []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            futures = {pool.submit(self._run_batch, texts, indices): indices for indices in batches}
+            for future in as_completed(futures):
+                indices = futures[future]
+                try:
+                    for i, vec in zip(indices, future.result()):
+                        results[i] = vec
+                except Exception as e:
+                    failed.extend(indices)
+                    errors.append(str(e))
+
+        return self._collect(texts, batches, results, failed, errors)
+
+    async def arun(self, texts: List[str]) -> List[List[float]]:
+        """Async variant of ``run`` using ``aembed_fn`` and a semaphore instead of threads."""
+        if self.aembed_fn is None:
+            raise RuntimeError("EmbeddingBatcher was created without an async embed function")
+        if not texts:
+            return []
+
+        # Token counting is CPU-bound; keep it off the event loop
+        batches = await asyncio.to_thread(self.plan, texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        outcomes = await asyncio.gather(
+            *(self._arun_batch(texts, indices, semaphore) for indices in batches),
+            return_exceptions=True,
+        )
+
+        results: Dict[int, List[float]] = {}
+        failed: List[int] = []
+        errors: List[str] = []
+        for indices, outcome in zip(batches, outcomes):
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, asyncio.CancelledError):
+                    raise outcome
+                failed.extend(indices)
+                errors.append(str(outcome))
+            else:
+                for i, vec in zip(indices, outcome):
+                    results[i] = vec
+        return self._collect(texts, batches, results, failed, errors)
+
+    @staticmethod
+    def _collect(texts, batches, results, failed, errors) -> List[List[float]]:
+        if failed:
+            raise EmbeddingBatchError(
+                f"{len(failed)}/{len(texts)} texts failed to embed in "
+                f"{len(errors)}/{len(batches)} batches: {errors[0]}",
+                failed_indices=sorted(failed),
+                partial=results,
+            )
+        return [results[i] for i in range(len(texts))]
+
+
+def _retry_after_seconds(error: Optional[Exception]) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
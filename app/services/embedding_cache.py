@@ -0,0 +1,176 @@
+# app/services/embedding_cache.py
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.utils.hashing import sha256_from_text
+
+
+class EmbeddingCache:
+    """
+    Two-tier, content-addressed embedding cache.
+
+    Entries are keyed by ``(deployment, sha256_from_text(text))`` so switching
+    embedding deployments never serves vectors from another model.
+    Tier 1 is an in-memory LRU; tier 2 is a SQLite table of raw float32 blobs,
+    also evicted least recently used first once it holds more than
+    ``max_disk_items`` rows (0 = unbounded). Pass ``path=None`` to run memory-only.
+    """
+
+    SQL_BATCH = 500
+    # Disk eviction trims to this fraction of max_disk_items, so it runs once per many puts
+    DISK_LOW_WATER = 0.9
+
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 10000, max_disk_items: int = 200000):
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        self._conn = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    deployment TEXT NOT NULL,
+                    text_hash  TEXT NOT NULL,
+                    dim        INTEGER NOT NULL,
+                    vector     BLOB NOT NULL,
+                    used_at    REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (deployment, text_hash)
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+            if "used_at" not in columns:  # caches created before the disk tier was bounded
+                self._conn.execute("ALTER TABLE embeddings ADD COLUMN used_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_used_at ON embeddings (used_at)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return sha256_from_text(text)
+
+    # -------------------- Memory tier --------------------
+    def _remember(self, key: tuple, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # -------------------- Disk tier --------------------
+    def _touch(self, deployment: str, hashes: List[str]):
+        self._conn.executemany(
+            "UPDATE embeddings SET used_at = ? WHERE deployment = ? AND text_hash = ?",
+            [(time.time(), deployment, h) for h in hashes],
+        )
+        self._conn.commit()
+
+    def _evict_disk(self):
+        """Past ``max_disk_items`` rows (any process's), delete the least recently used down to the low-water mark."""
+        if not self.max_disk_items:
+            return
+        # COUNT(*) walks the small used_at index; cheap next to the embedding call that preceded the put
+        rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if rows <= self.max_disk_items:
+            return
+        excess = rows - int(self.max_disk_items * self.DISK_LOW_WATER)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY used_at LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        self.disk_evictions += excess
+
+    # -------------------- Public API --------------------
+    def get_many(self, deployment: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the given text hashes; missing hashes are omitted."""
+        found: Dict[str, List[float]] = {}
+        pending = []
+        with self._lock:
+            for h in hashes:
+                key = (deployment, h)
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[h] = vec.tolist()
+                    self.hits += 1
+                else:
+                    pending.append(h)
+
+            rows = []
+            if self._conn is not None:
+                # Stay well below SQLite's bound-parameter limit.
+                for start in range(0, len(pending), self.SQL_BATCH):
+                    part = pending[start:start + self.SQL_BATCH]
+                    placeholders = ",".join("?" * len(part))
+                    rows += self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings "
+                        f"WHERE deployment = ? AND text_hash IN ({placeholders})",
+                        [deployment, *part],
+                    ).fetchall()
+            for h, blob in rows:
+                vec = np.frombuffer(blob, dtype=np.float32)
+                self._remember((deployment, h), vec)
+                found[h] = vec.tolist()
+                self.hits += 1
+                self.disk_hits += 1
+
+            self.misses += sum(1 for h in pending if h not in found)
+            if found and self._conn is not None:
+                self._touch(deployment, list(found))
+        return found
+
+    def put_many(self, deployment: str, items: Dict[str, List[float]]):
+        """Store vectors keyed by text hash. Empty vectors are never cached."""
+        rows = []
+        with self._lock:
+            for h, embedding in items.items():
+                if not embedding:
+                    continue
+                vec = np.asarray(embedding, dtype=np.float32)
+                self._remember((deployment, h), vec)
+                rows.append((deployment, h, int(vec.shape[0]), vec.tobytes(), time.time()))
+
+            if rows and self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (deployment, text_hash, dim, vector, used_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+                self._evict_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "memory_items": len(self._memory),
+            }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,34 @@
+# app/services/extract_workers.py
+"""
+Functions executed inside the extraction process pool.
+
+Kept in a module with no app imports so spawned workers start quickly.
+"""
+from importlib.util import find_spec
+from typing import List, Tuple
+
+# PyMuPDF is only imported by the first PDF extraction, not at app start-up
+_HAS_FITZ = find_spec("fitz") is not None
+
+
+def pdf_page_count(path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as pdf:
+        return pdf.page_count
+
+
+def extract_pdf_pages(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Return ``(page_number, text)`` for pages ``[start, stop)``; page numbers are 1-based."""
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(path) as pdf:
+        for index in range(start, min(stop, pdf.page_count)):
+            page = pdf.load_page(index)
+            try:
+                text = page.get_text("text")
+            except Exception:
+                text = page.get_text()
+            pages.append((index + 1, text or ""))
+    return pages
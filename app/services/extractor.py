@@ -1,31 +1,67 @@
 # app/services/extractor.py
+import multiprocessing
 import tempfile
 import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from importlib.util import find_spec
 from pathlib import Path
+from typing import Iterator, Optional
 from loguru import logger
 
+from app.config.settings import settings
+from app.services import extract_workers
 from app.services.storage_manager import StorageManager
 
-# Optional imports
-try:
-    import fitz  # PyMuPDF
-    _HAS_FITZ = True
-except Exception:
-    _HAS_FITZ = False
+# Optional dependencies, imported on first use (PyMuPDF by extract_workers, usually in the pool)
+_HAS_FITZ = extract_workers._HAS_FITZ
+_HAS_DOCX = find_spec("docx") is not None  # python-docx
 
-try:
-    import docx  # python-docx
-    _HAS_DOCX = True
-except Exception:
-    _HAS_DOCX = False
+
+@dataclass
+class PageText:
+    """Text of one page; ``page_number`` is 1-based."""
+    page_number: int
+    text: str
 
 
 class Extractor:
     """
     Wrapper class for text extraction from local files and Azure blobs.
     Compatible with process.py usage.
+
+    Large PDFs are split into page ranges extracted in a process pool of
+    ``settings.extract_workers`` processes; pages are yielded in order.
     """
 
+    def __init__(self, storage: StorageManager | None = None, max_workers: Optional[int] = None):
+        self._storage = storage
+        self.max_workers = max_workers or settings.extract_workers or os.cpu_count() or 1
+        self.pages_per_task = settings.extract_pages_per_task
+        self.parallel_min_pages = settings.extract_parallel_min_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: workers must not inherit the event loop / client threads of the app process
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def storage(self) -> StorageManager:
+        # Built on first blob access; StorageManager itself only wraps shared clients
+        if self._storage is None:
+            self._storage = StorageManager()
+        return self._storage
+
     def extract_text(self, local_path: str) -> str:
         """Extract text from a local file (.pdf, .docx, .txt, .md)."""
         return self._extract_text_from_local(local_path)
@@ -34,6 +70,19 @@ class Extractor:
         """Download a blob from Azure and extract text."""
         return self._extract_text_from_blob(blob_path)
 
+    def iter_pages(self, local_path: str) -> Iterator[PageText]:
+        """
+        Yield pages of a local file in order as soon as each is extracted.
+        DOCX pages follow explicit and last-rendered page breaks; text files are one page.
+        """
+        ext = Path(local_path).suffix.lower()
+        if ext == ".pdf":
+            yield from self._iter_pdf_pages(local_path)
+        elif ext in [".docx"]:
+            yield from self._iter_docx_pages(local_path)
+        else:
+            yield PageText(page_number=1, text=self._read_text_file(local_path))
+
     # -------------------- Internal methods --------------------
     def _read_text_file(self, path: str) -> str:
         try:
@@ -47,31 +96,67 @@ class Extractor:
                 logger.error(f"Failed to read text file {path}: {e}")
                 return ""
 
+    def _iter_pdf_pages(self, path: str) -> Iterator[PageText]:
+        if not _HAS_FITZ:
+            raise RuntimeError("PyMuPDF (fitz) not installed. Run `pip install pymupdf`.")
+        page_count = extract_workers.pdf_page_count(path)
+
+        if page_count < self.parallel_min_pages or self.max_workers <= 1:
+            for number, text in extract_workers.extract_pdf_pages(path, 0, page_count):
+                yield PageText(page_number=number, text=text)
+            return
+
+        ranges = [(start, start + self.pages_per_task) for start in range(0, page_count, self.pages_per_task)]
+        # Keep at most two ranges per worker in flight to bound buffered pages
+        window = self.max_workers * 2
+        futures = [self.pool.submit(extract_workers.extract_pdf_pages, path, *r) for r in ranges[:window]]
+        next_range = len(futures)
+        try:
+            for i in range(len(ranges)):
+                pages = futures[i].result()
+                futures[i] = None
+                if next_range < len(ranges):
+                    futures.append(self.pool.submit(extract_workers.extract_pdf_pages, path, *ranges[next_range]))
+                    next_range += 1
+                for number, text in pages:
+                    yield PageText(page_number=number, text=text)
+        finally:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+
+    def _iter_docx_pages(self, path: str) -> Iterator[PageText]:
+        if not _HAS_DOCX:
+            raise RuntimeError("python-docx not installed. Run `pip install python-docx`.")
+        import docx
+
+        doc = docx.Document(path)
+        page_number = 1
+        paragraphs = []
+        for p in doc.paragraphs:
+            if p.text and p.text.strip():
+                paragraphs.append(p.text)
+            if p.contains_page_break or p._p.xpath("./w:r/w:br[@w:type='page']"):
+                yield PageText(page_number=page_number, text="\n\n".join(paragraphs))
+                page_number += 1
+                paragraphs = []
+        if paragraphs:
+            yield PageText(page_number=page_number, text="\n\n".join(paragraphs))
+
     def _extract_pdf(self, path: str) -> str:
         if not _HAS_FITZ:
             raise RuntimeError("PyMuPDF (fitz) not installed. Run `pip install pymupdf`.")
-        text_parts = []
         try:
-            with fitz.open(path) as pdf:
-                for page in pdf:
-                    try:
-                        text = page.get_text("text")
-                    except Exception:
-                        text = page.get_text()
-                    if text:
-                        text_parts.append(text)
+            return "\n".join(page.text for page in self._iter_pdf_pages(path) if page.text)
         except Exception as e:
             logger.error(f"Error extracting PDF {path}: {e}")
             return ""
-        return "\n".join(text_parts)
 
     def _extract_docx(self, path: str) -> str:
         if not _HAS_DOCX:
             raise RuntimeError("python-docx not installed. Run `pip install python-docx`.")
         try:
-            doc = docx.Document(path)
-            paragraphs = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
-            return "\n\n".join(paragraphs)
+            return "\n\n".join(page.text for page in self._iter_docx_pages(path) if page.text)
         except Exception as e:
             logger.error(f"Error extracting DOCX {path}: {e}")
             return ""
@@ -95,7 +180,7 @@ class Extractor:
             return ""
 
     def _extract_text_from_blob(self, blob_path: str) -> str:
-        storage = StorageManager()
+        storage = self.storage
 
         suffix = Path(blob_path).suffix or ""
         tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
@@ -0,0 +1,142 @@
+# app/services/ingest_queue.py
+import asyncio
+import json
+from typing import Callable, Optional
+
+from loguru import logger
+from sqlalchemy import func
+
+from app.services.ingestion import IngestionPipeline
+from app.state import repos
+from app.state.db import db_call
+
+
+class IngestWorkerPool:
+    """
+    In-process workers that drain the ``ingest_jobs`` table.
+
+    The queue lives in SQLite, so jobs survive restarts and several app
+    processes can share it; ``concurrency`` bounds the jobs run by this
+    process at once. Workers wake immediately on ``notify()`` and otherwise
+    poll every ``poll_interval`` seconds for jobs enqueued elsewhere.
+
+    Every ``heartbeat_interval`` seconds the pool refreshes ``updated_at`` on
+    the jobs it is running and re-queues ``running`` jobs that nobody has
+    refreshed for ``stale_after_seconds``: their process died mid-job.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        concurrency: int = 2,
+        poll_interval: float = 2.0,
+        heartbeat_interval: float = 15.0,
+        stale_after_seconds: float = 60.0,
+        on_indexed: Optional[Callable[[], None]] = None,
+    ):
+        self.pipeline = pipeline
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after_seconds = stale_after_seconds
+        self.on_indexed = on_indexed  # called after each successful job (e.g. to refresh BM25)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: list[asyncio.Task] = []
+        self._running: set[int] = set()
+
+    async def start(self):
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        await self._requeue_stale()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        self._workers.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"✅ Started {self.concurrency} ingest worker(s)")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(self, document_id: int):
+        job = await db_call(repos.create_ingest_job, document_id)
+        self.notify()
+        return job
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _requeue_stale(self):
+        requeued = await db_call(repos.requeue_stale_ingest_jobs, self.stale_after_seconds)
+        if requeued:
+            logger.info(f"🔁 Re-queued {requeued} interrupted ingest job(s)")
+            self.notify()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await db_call(repos.touch_ingest_jobs, sorted(self._running))
+                await self._requeue_stale()
+            except Exception as e:
+                logger.error(f"❌ Ingest heartbeat failed: {e}")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            try:
+                job = await db_call(repos.claim_next_ingest_job)
+            except Exception as e:
+                logger.error(f"❌ Ingest worker {worker_id} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._running.add(job.id)
+            try:
+                await self._run_job(job.id, job.document_id)
+            finally:
+                self._running.discard(job.id)
+
+    async def _run_job(self, job_id: int, document_id: int):
+        async def progress(stage: str, fields: dict):
+            update = {"stage": stage, "timings": json.dumps(fields.pop("timings", {}))}
+            update.update(fields)
+            await db_call(repos.update_ingest_job, job_id, **update)
+
+        try:
+            doc = await db_call(repos.get_document_by_id, document_id)
+            if doc is None:
+                raise LookupError(f"Document {document_id} not found")
+            result = await self.pipeline.run(doc.id, doc.name, doc.blob_url, progress=progress)
+            await db_call(
+                repos.update_ingest_job,
+                job_id,
+                status="succeeded",
+                stage="done",
+                timings=json.dumps(result["timings"]),
+                chunk_changes=json.dumps(result["chunks"]),
+                finished_at=func.now(),
+            )
+            if self.on_indexed is not None:
+                self.on_indexed()
+        except asyncio.CancelledError:
+            # Shutdown mid-job: hand it back to the queue for the next start
+            await asyncio.shield(db_call(repos.update_ingest_job, job_id, status="queued"))
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ingest job {job_id} for document {document_id} failed: {e}", exc_info=True)
+            await db_call(
+                repos.update_ingest_job,
+                job_id,
+                status="failed",
+                error=str(e),
+                finished_at=func.now(),
+            )
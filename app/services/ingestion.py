@@ -0,0 +1,206 @@
+# app/services/ingestion.py
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from app.config.settings import settings
+from app.services.chunker import Chunker
+from app.services.embedder import Embedder
+from app.services.extractor import Extractor
+from app.services.storage_manager import StorageManager
+from app.state import repos
+from app.state.db import db_call
+from app.utils.hashing import sha256_from_text
+from app.utils.metrics import PAYLOAD_CHUNKS, observe_payload, observe_stages
+
+ProgressCallback = Callable[[str, dict], Awaitable[None]]
+
+
+class IngestionError(RuntimeError):
+    """Raised when a document cannot be ingested (e.g. no extractable text)."""
+
+
+class IngestionPipeline:
+    """
+    download → extract → chunk → embed → index for a single document.
+
+    ``progress(stage, fields)`` is awaited at every stage boundary and after
+    each embedding window, so callers can persist job state as it moves.
+
+    Indexing is incremental: chunk ids are derived from chunk content, and
+    the document's manifest (its ``chunks`` rows) records what is indexed.
+    Only new chunks are embedded, chunks whose pages moved are re-upserted,
+    and chunks that disappeared are deleted from the vector store.
+    """
+
+    def __init__(
+        self,
+        storage: StorageManager,
+        extractor: Extractor,
+        chunker: Chunker,
+        embedder: Embedder,
+        vector_store,
+        tmp_dir: Path,
+    ):
+        self.storage = storage
+        self.extractor = extractor
+        self.chunker = chunker
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.tmp_dir = tmp_dir
+
+    @property
+    def embed_window(self) -> int:
+        # Enough texts to keep every concurrent micro-batch busy between progress reports
+        batcher = self.embedder.batcher
+        return batcher.max_items_per_batch * batcher.max_concurrency
+
+    def _extract_and_chunk(self, local_path: str) -> tuple[list[dict], float]:
+        """
+        Chunk pages as the extractor yields them, so chunking overlaps extraction.
+        Returns chunk dicts (text + first/last page) and the seconds spent extracting.
+        """
+        page_starts: list[int] = []
+        page_numbers: list[int] = []
+        position = 0
+        extract_seconds = 0.0
+
+        def segments():
+            nonlocal position, extract_seconds
+            pages = self.extractor.iter_pages(local_path)
+            while True:
+                started = time.perf_counter()
+                page = next(pages, None)
+                extract_seconds += time.perf_counter() - started
+                if page is None:
+                    return
+                if not page.text:
+                    continue
+                page_starts.append(position)
+                page_numbers.append(page.page_number)
+                text = page.text + "\n"
+                position += len(text)
+                yield text
+
+        chunks = []
+        for chunk in self.chunker.iter_chunks(segments()):
+            if not chunk.text.strip():
+                continue
+            last_char = max(chunk.char_end - 1, chunk.char_start)
+            chunks.append({
+                "content": chunk.text,
+                "page_start": page_numbers[bisect_right(page_starts, chunk.char_start) - 1],
+                "page_end": page_numbers[bisect_right(page_starts, last_char) - 1],
+            })
+        return chunks, extract_seconds
+
+    @staticmethod
+    def _assign_keys(page_chunks: list[dict]):
+        """Give each chunk a content hash and a stable id (repeats get an occurrence suffix)."""
+        seen: dict[str, int] = {}
+        for chunk in page_chunks:
+            content_hash = sha256_from_text(chunk["content"])
+            occurrence = seen.get(content_hash, 0)
+            seen[content_hash] = occurrence + 1
+            chunk["content_hash"] = content_hash
+            chunk["chunk_id"] = content_hash[:32] if occurrence == 0 else f"{content_hash[:32]}-{occurrence}"
+
+    async def run(
+        self,
+        doc_id: int,
+        doc_name: str,
+        blob_url: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> dict:
+        timings: dict = {}
+
+        async def report(stage: str, **fields):
+            if progress is not None:
+                await progress(stage, {**fields, "timings": dict(timings)})
+
+        local_path = self.tmp_dir / f"{doc_id}_{doc_name}"  # unique per document so concurrent jobs never collide
+        try:
+            await report("download")
+            started = time.perf_counter()
+            await self.storage.adownload_file(blob_name=blob_url, file_path=str(local_path))
+            timings["download"] = time.perf_counter() - started
+
+            # Extraction (process pool) and chunking run together off the event loop
+            await report("extract")
+            started = time.perf_counter()
+            page_chunks, extract_seconds = await run_in_threadpool(self._extract_and_chunk, str(local_path))
+            timings["extract"] = extract_seconds
+            timings["chunk"] = time.perf_counter() - started - extract_seconds
+            if not page_chunks:
+                raise IngestionError("Failed to extract text")
+        finally:
+            try:
+                local_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+        # Diff against the manifest of what is already indexed
+        self._assign_keys(page_chunks)
+        manifest = {c.chunk_key: c for c in await db_call(repos.get_chunk_manifest, doc_id)}
+        current = {c["chunk_id"] for c in page_chunks}
+        added = [c for c in page_chunks if c["chunk_id"] not in manifest]
+        moved = [
+            c for c in page_chunks
+            if c["chunk_id"] in manifest
+            and (manifest[c["chunk_id"]].page_start, manifest[c["chunk_id"]].page_end) != (c["page_start"], c["page_end"])
+        ]
+        removed = [key for key in manifest if key not in current]
+        upserts = added + moved
+        changes = {
+            "reused": len(page_chunks) - len(upserts),
+            "added": len(added),
+            "updated": len(moved),
+            "removed": len(removed),
+        }
+
+        # Only new / moved chunks are embedded; moved ones are normally embedding-cache hits
+        chunks = [c["content"] for c in upserts]
+        await report("embed", chunks_total=len(chunks), chunks_embedded=0)
+        started = time.perf_counter()
+        embeddings = []
+        for start in range(0, len(chunks), self.embed_window):
+            embeddings += await self.embedder.aembed_batch(chunks[start:start + self.embed_window])
+            await report("embed", chunks_embedded=len(embeddings))
+        timings["embed"] = time.perf_counter() - started
+
+        # chunks + metadata for indexing
+        chunks_with_meta = [{**chunk, "doc_id": str(doc_id)} for chunk in upserts]
+
+        await report("index")
+        started = time.perf_counter()
+        if chunks_with_meta:
+            ok = await self.vector_store.aadd_embeddings(chunks_with_meta, embeddings)
+            if not ok:
+                raise IngestionError("Indexing in vector store failed.")
+        if removed:
+            await self.vector_store.adelete_ids([f"{doc_id}_{key}" for key in removed])
+        timings["index"] = time.perf_counter() - started
+
+        # The manifest is only updated once the index reflects it, so a failed run is simply redone
+        await db_call(
+            repos.apply_chunk_manifest,
+            doc_id,
+            upserts,
+            removed,
+            {c["chunk_id"]: position for position, c in enumerate(page_chunks)},
+            embeddings,
+            settings.chunk_embedding_dtype,
+        )
+
+        observe_stages("ingest", timings)
+        observe_payload(PAYLOAD_CHUNKS, document=len(page_chunks), embedded=len(upserts))
+        logger.info(
+            f"✅ Indexed document {doc_id}: {len(page_chunks)} chunks "
+            f"({changes['reused']} reused, {changes['added']} added, {changes['updated']} updated, "
+            f"{changes['removed']} removed) in {sum(timings.values()):.2f}s"
+        )
+        return {"doc_id": doc_id, "num_chunks": len(page_chunks), "chunks": changes, "timings": timings}
@@ -0,0 +1,180 @@
+# app/services/lexical_index.py
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over indexed chunks.
+
+    Postings are stored per term as NumPy arrays (doc rows, term frequencies),
+    so a query touches only the rows of its own terms. ``build`` and ``update``
+    prepare a complete new state and swap it in, so searches never see a
+    partial one. ``update`` replaces the chunks of some documents: their old
+    rows are tombstoned and dropped from the postings of their own terms, the
+    new rows are appended, and only the touched terms get new arrays. The rows
+    are compacted once tombstones outnumber live rows.
+    """
+
+    # Words plus joined identifiers such as "AB-1234", "v2.1" or "ISO/IEC"
+    _TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+    _EMPTY = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.signature = None  # opaque marker of the corpus the index was built from (the index version)
+        self._lock = threading.Lock()
+        self._state: Optional[dict] = None
+
+    @classmethod
+    def tokenize(cls, text: str) -> list[str]:
+        """Lowercased terms; compound identifiers are kept whole and also split into parts."""
+        terms = []
+        for match in cls._TOKEN_RE.finditer(text.lower()):
+            token = match.group()
+            terms.append(token)
+            if not token.isalnum():
+                terms.extend(re.findall(r"\w+", token))
+        return terms
+
+    def build(self, docs: Iterable[tuple[str, str, int]], signature=None):
+        """Index ``(id, text, document_id)`` triples, replacing the current index."""
+        with self._lock:
+            self._state = self._apply(self._empty_state(), [], docs)
+            self.signature = signature
+
+    def update(self, document_ids: Iterable[int], docs: Iterable[tuple[str, str, int]], signature=None):
+        """Replace the chunks of ``document_ids`` with ``docs``, their current chunks (none = all removed)."""
+        with self._lock:
+            state = self._apply(self._state or self._empty_state(), document_ids, docs)
+            if state["dead"] > max(state["live"], 1024):
+                state = self._compact(state)
+            self._state = state
+            self.signature = signature
+
+    @staticmethod
+    def _empty_state() -> dict:
+        return {
+            "ids": [],
+            "texts": [],
+            "documents": np.empty(0, dtype=np.int64),
+            "lengths": np.empty(0, dtype=np.float32),
+            "live": 0,
+            "dead": 0,
+            "total_length": 0.0,
+            "postings": {},
+        }
+
+    def _apply(self, state: dict, document_ids: Iterable[int], docs: Iterable[tuple[str, str, int]]) -> dict:
+        """A new state with the rows of ``document_ids`` tombstoned and ``docs`` appended."""
+        ids, texts = list(state["ids"]), list(state["texts"])
+        documents, lengths = state["documents"].copy(), state["lengths"].copy()
+        total_length = state["total_length"]
+
+        dead_rows = np.flatnonzero(np.isin(documents, np.fromiter(document_ids, dtype=np.int64)))
+        removed_terms = set()
+        for row in dead_rows:
+            removed_terms.update(self.tokenize(texts[row]))
+            ids[row] = texts[row] = None
+        total_length -= float(lengths[dead_rows].sum())
+        documents[dead_rows] = -1
+        lengths[dead_rows] = 0.0
+
+        added: dict[str, list] = defaultdict(list)
+        new_documents, new_lengths = [], []
+        for row, (doc_id, text, document_id) in enumerate(docs, start=len(ids)):
+            counts = Counter(self.tokenize(text))
+            ids.append(doc_id)
+            texts.append(text)
+            new_documents.append(document_id)
+            new_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                added[term].append((row, tf))
+        documents = np.concatenate([documents, np.asarray(new_documents, dtype=np.int64)])
+        lengths = np.concatenate([lengths, np.asarray(new_lengths, dtype=np.float32)])
+        total_length += float(sum(new_lengths))
+
+        dead = np.zeros(len(ids), dtype=bool)
+        dead[dead_rows] = True
+        postings = dict(state["postings"])
+        for term in removed_terms | added.keys():
+            rows, tf = postings.get(term, self._EMPTY)
+            if term in removed_terms:
+                keep = ~dead[rows]
+                rows, tf = rows[keep], tf[keep]
+            if term in added:
+                rows = np.concatenate([rows, np.fromiter((r for r, _ in added[term]), dtype=np.int32)])
+                tf = np.concatenate([tf, np.fromiter((f for _, f in added[term]), dtype=np.float32)])
+            if rows.size:
+                postings[term] = (rows, tf)
+            else:
+                postings.pop(term, None)
+
+        live = state["live"] - len(dead_rows) + len(new_documents)
+        return {
+            "ids": ids,
+            "texts": texts,
+            "documents": documents,
+            "lengths": lengths,
+            "live": live,
+            "dead": state["dead"] + len(dead_rows),
+            "total_length": total_length,
+            "postings": postings,
+        }
+
+    @staticmethod
+    def _compact(state: dict) -> dict:
+        """Drop tombstoned rows, renumbering the postings (no re-tokenising)."""
+        alive = state["documents"] >= 0
+        renumber = (np.cumsum(alive) - 1).astype(np.int32)
+        return {
+            "ids": [i for i in state["ids"] if i is not None],
+            "texts": [t for t, keep in zip(state["texts"], alive) if keep],
+            "documents": state["documents"][alive],
+            "lengths": state["lengths"][alive],
+            "live": state["live"],
+            "dead": 0,
+            "total_length": state["total_length"],
+            "postings": {term: (renumber[rows], tf) for term, (rows, tf) in state["postings"].items()},
+        }
+
+    def search(self, query: str, k: int = 5, doc_ids: Optional[list[int]] = None) -> list[dict]:
+        """Return up to ``k`` hits (id, content, score) ranked by BM25, optionally within ``doc_ids``."""
+        state = self._state
+        if not state or not state["live"] or k <= 0:
+            return []
+
+        n = state["live"]
+        lengths, avgdl = state["lengths"], state["total_length"] / n or 1.0
+        scores = np.zeros(len(state["ids"]), dtype=np.float32)
+        for term in set(self.tokenize(query)):
+            entry = state["postings"].get(term)
+            if entry is None:
+                continue
+            rows, tf = entry
+            idf = math.log(1.0 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths[rows] / avgdl)
+            scores[rows] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        matched = np.flatnonzero(scores)
+        if doc_ids is not None:
+            matched = matched[np.isin(state["documents"][matched], np.asarray(doc_ids, dtype=np.int64))]
+        if matched.size == 0:
+            return []
+        if matched.size > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [
+            {"id": state["ids"][i], "content": state["texts"][i], "score": float(scores[i])}
+            for i in matched
+        ]
+
+    def __len__(self) -> int:
+        state = self._state
+        return state["live"] if state else 0
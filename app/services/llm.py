@@ -1,32 +1,89 @@
 # app/services/llm.py
 
 import logging
-from langchain_openai import AzureChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from app.services.clients import ClientRegistry, registry
 from app.config.settings import settings
+from app.utils.tokens import count_tokens
+from app.utils.metrics import UPSTREAM_ERRORS
+
+if TYPE_CHECKING:
+    from langchain_openai import AzureChatOpenAI
 
 logger = logging.getLogger(__name__)
 
 class AzureChatLLM:
-    def __init__(self):
-        self.base_params = {
-            "deployment_name": settings.azure_openai_chat_deployment,
-            "model": settings.azure_openai_chat_deployment,  # `model_name` is deprecated, use `model`
-            "azure_endpoint": settings.azure_openai_endpoint,  # ✅ FIX: must use azure_endpoint now
-            "api_version": "2023-07-01-preview",              # ✅ FIX: param renamed
-            "api_key": settings.azure_openai_api_key,
-        }
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        # Chat models are cached per parameter set and share the registry's HTTP pools
+        self.clients = clients or registry
         logger.info(f"AzureChatLLM initialized with deployment: {settings.azure_openai_chat_deployment}")
 
+    def _client(self, temperature: float, max_tokens: int, streaming: bool = False) -> "AzureChatOpenAI":
+        return self.clients.chat_model(temperature, max_tokens, streaming=streaming)
+
     def chat(self, messages: list, temperature: float = 0.0, max_tokens: int = 1024):
         try:
-            client = AzureChatOpenAI(
-                **self.base_params,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            client = self._client(temperature, max_tokens)
             response = client.invoke(messages)  # modern LangChain call
             return response.content
         except Exception as e:
+            UPSTREAM_ERRORS.labels("openai_chat").inc()
             logger.error(f"LLM chat failed: {e}", exc_info=True)
             raise
+
+    async def achat(self, messages: list, temperature: float = 0.0, max_tokens: int = 1024):
+        """Async variant of chat; LangChain drives AsyncAzureOpenAI under the hood."""
+        try:
+            client = self._client(temperature, max_tokens)
+            response = await client.ainvoke(messages)
+            return response.content
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("openai_chat").inc()
+            logger.error(f"LLM chat failed: {e}", exc_info=True)
+            raise
+
+    async def astream(
+        self,
+        messages: list,
+        temperature: float = 0.0,
+        max_tokens: int = 1024,
+        usage: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield answer text deltas as the model produces them.
+
+        If ``usage`` is given it is filled with prompt/completion token counts
+        when the stream ends. The API version in use does not report usage on
+        streams, so counts are estimated with tiktoken unless the server sends them.
+        Closing the generator (e.g. on client disconnect) closes the upstream request.
+        """
+        client = self._client(temperature, max_tokens, streaming=True)
+        completion = []
+        reported = None
+        try:
+            async for chunk in client.astream(messages):
+                if getattr(chunk, "usage_metadata", None):
+                    reported = chunk.usage_metadata
+                if chunk.content:
+                    completion.append(chunk.content)
+                    yield chunk.content
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("openai_chat").inc()
+            logger.error(f"LLM stream failed: {e}", exc_info=True)
+            raise
+        finally:
+            if usage is not None:
+                if reported:
+                    usage.update(
+                        prompt_tokens=reported.get("input_tokens", 0),
+                        completion_tokens=reported.get("output_tokens", 0),
+                        estimated=False,
+                    )
+                else:
+                    model = settings.azure_openai_chat_deployment
+                    usage.update(
+                        prompt_tokens=sum(count_tokens(str(m.content), model) for m in messages),
+                        completion_tokens=count_tokens("".join(completion), model),
+                        estimated=True,
+                    )
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
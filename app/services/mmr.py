@@ -0,0 +1,36 @@
+# app/services/mmr.py
+import numpy as np
+
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_: float = 0.5) -> list[int]:
+    """
+    Maximal Marginal Relevance: pick ``k`` candidate rows that are relevant to
+    ``query`` but not redundant with each other.
+
+    Each step maximises ``lambda_ * sim(q, c) - (1 - lambda_) * max sim(c, selected)``.
+    Both similarity matrices are computed once up front; a step only updates
+    the running max-similarity vector, so the work per pick is O(n) NumPy.
+    Returns row indices into ``candidates`` in selection order.
+    """
+    n = candidates.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    vectors = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    q = query / max(float(np.linalg.norm(query)), 1e-12)
+    relevance = vectors @ q
+    pairwise = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    for _ in range(k - 1):
+        scores = lambda_ * relevance - (1.0 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(redundancy, pairwise[chosen], out=redundancy)
+    return selected
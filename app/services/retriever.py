@@ -0,0 +1,186 @@
+# app/services/retriever.py
+import asyncio
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+from app.services.lexical_index import BM25Index
+from app.services.mmr import mmr_select
+from app.state import repos
+from app.state.db import db_call
+
+
+class HybridRetriever:
+    """
+    Vector, lexical or hybrid retrieval over the indexed chunks.
+
+    The lexical leg is a local BM25 index built from the chunk manifest in
+    SQLite (so it works offline and with either vector store backend),
+    optionally joined by the Azure Search keyword query. Hybrid mode fetches
+    ``candidates`` hits per leg and merges them with reciprocal rank fusion.
+
+    The BM25 index is refreshed by a background task whenever the shared index
+    version moves, re-indexing only the documents whose chunks changed: it
+    polls every ``lexical_refresh_interval`` seconds and wakes at once on
+    ``notify()`` (called after a local ingest). Requests search the last built
+    index; only the very first build is waited for.
+
+    With ``mmr=True`` the ranked list is over-fetched (``k * mmr_multiplier``)
+    and the final ``k`` are picked by Maximal Marginal Relevance against the
+    candidates' stored vectors, dropping near-duplicate (overlapping) chunks.
+    """
+
+    MODES = ("vector", "lexical", "hybrid")
+
+    def __init__(
+        self,
+        vector_store,
+        lexical_index: Optional[BM25Index] = None,
+        candidates: int = 20,
+        rrf_k: int = 60,
+        azure_keyword: bool = False,
+        mmr_lambda: float = 0.5,
+        mmr_multiplier: int = 4,
+        lexical_refresh_interval: float = 5.0,
+    ):
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index or BM25Index()
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.azure_keyword = azure_keyword and hasattr(vector_store, "akeyword_search")
+        self.mmr_lambda = mmr_lambda
+        self.mmr_multiplier = max(1, mmr_multiplier)
+        self.lexical_refresh_interval = lexical_refresh_interval
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_wakeup: Optional[asyncio.Event] = None
+        self._lexical_built: Optional[asyncio.Event] = None
+
+    @staticmethod
+    def rrf(result_lists: List[List[dict]], k: int, rrf_k: int = 60) -> List[dict]:
+        """Reciprocal rank fusion: each list adds 1 / (rrf_k + rank) to a hit's score."""
+        fused: dict[str, dict] = {}
+        for results in result_lists:
+            for rank, hit in enumerate(results, start=1):
+                entry = fused.setdefault(hit["id"], {**hit, "score": 0.0})
+                entry["score"] += 1.0 / (rrf_k + rank)
+        return sorted(fused.values(), key=lambda h: h["score"], reverse=True)[:k]
+
+    # -------------------- BM25 refresh --------------------
+    def start(self):
+        """Start the background BM25 refresh (idempotent; must run inside the event loop)."""
+        if self._refresh_task is None:
+            self._refresh_wakeup = asyncio.Event()
+            self._lexical_built = asyncio.Event()
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    def notify(self):
+        """Chunks were indexed: refresh the BM25 index now instead of at the next poll."""
+        if self._refresh_wakeup is not None:
+            self._refresh_wakeup.set()
+
+    async def aclose(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    async def alexical_ready(self):
+        """Wait until the BM25 index has been built once."""
+        self.start()
+        await self._lexical_built.wait()
+
+    async def refresh_lexical(self) -> bool:
+        """
+        Bring the BM25 index up to the shared index version: the first time by a full
+        build, afterwards by re-indexing only the documents changed since the version
+        it was built at. Documents changed after ``version`` was read are re-applied
+        on the next refresh, which is harmless (an update replaces their rows).
+        """
+        version = await db_call(repos.get_index_version)
+        built = self.lexical_index.signature
+        if version == built:
+            return False
+        if built is None or version < built:
+            docs = await db_call(repos.list_indexed_chunks)
+            await asyncio.to_thread(self.lexical_index.build, docs, version)
+            logger.info(f"🔤 Built BM25 index over {len(docs)} chunks (index version {version})")
+            return True
+        changed = await db_call(repos.list_documents_indexed_since, built)
+        docs = await db_call(repos.list_indexed_chunks, changed) if changed else []
+        await asyncio.to_thread(self.lexical_index.update, changed, docs, version)
+        logger.info(f"🔤 Updated BM25 index for {len(changed)} documents, {len(docs)} chunks (index version {version})")
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            self._refresh_wakeup.clear()
+            try:
+                await self.refresh_lexical()
+            except Exception as e:
+                logger.error(f"❌ BM25 refresh failed: {e}")
+            finally:
+                # Also set on failure: requests then search the previous (or empty) index
+                self._lexical_built.set()
+            try:
+                await asyncio.wait_for(self._refresh_wakeup.wait(), timeout=self.lexical_refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _lexical_legs(self, query: str, doc_ids: Optional[List[int]]) -> List[List[dict]]:
+        await self.alexical_ready()
+        legs = [asyncio.to_thread(self.lexical_index.search, query, self.candidates, doc_ids)]
+        if self.azure_keyword:
+            legs.append(self.vector_store.akeyword_search(query, k=self.candidates, doc_ids=doc_ids))
+        return list(await asyncio.gather(*legs))
+
+    async def aretrieve(
+        self,
+        query: str,
+        query_embedding: List[float],
+        k: int = 5,
+        mode: str = "hybrid",
+        doc_ids: Optional[List[int]] = None,
+        mmr: bool = False,
+    ) -> List[dict]:
+        """Return the top ``k`` hits (id, content, score) for ``mode``, optionally within ``doc_ids``."""
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        if doc_ids is not None and not doc_ids:
+            return []
+
+        fetch_k = k * self.mmr_multiplier if mmr else k
+        if mode == "vector":
+            hits = await self.vector_store.asearch_hits(query_embedding, k=fetch_k, doc_ids=doc_ids, with_vectors=mmr)
+        elif mode == "lexical":
+            hits = self.rrf(await self._lexical_legs(query, doc_ids), fetch_k, self.rrf_k)
+        else:
+            vector_hits, lexical_legs = await asyncio.gather(
+                self.vector_store.asearch_hits(
+                    query_embedding, k=max(fetch_k, self.candidates), doc_ids=doc_ids, with_vectors=mmr
+                ),
+                self._lexical_legs(query, doc_ids),
+            )
+            hits = self.rrf([vector_hits, *lexical_legs], fetch_k, self.rrf_k)
+
+        if not mmr or len(hits) <= k:
+            return hits[:k]
+        return await self._mmr(query_embedding, hits, k)
+
+    async def _mmr(self, query_embedding: List[float], hits: List[dict], k: int) -> List[dict]:
+        # Lexical-only hits carry no vector; fetch theirs in one call
+        missing = [hit["id"] for hit in hits if "vector" not in hit]
+        if missing:
+            vectors = await self.vector_store.aget_vectors(missing)
+            for hit in hits:
+                if "vector" not in hit and hit["id"] in vectors:
+                    hit["vector"] = vectors[hit["id"]]
+
+        scored = [hit for hit in hits if "vector" in hit]
+        unscored = [hit for hit in hits if "vector" not in hit]
+        if not scored:
+            return hits[:k]
+        matrix = np.stack([np.asarray(hit["vector"], dtype=np.float32) for hit in scored])
+        query = np.asarray(query_embedding, dtype=np.float32)
+        picked = [scored[i] for i in mmr_select(query, matrix, k, self.mmr_lambda)]
+        return (picked + unscored)[:k]
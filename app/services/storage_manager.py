@@ -1,43 +1,71 @@
-from azure.storage.blob import BlobServiceClient
+import asyncio
+import hashlib
+import inspect
+import time
+import uuid
+from typing import Callable, Optional
 from app.config.settings import settings
+from app.services.clients import ClientRegistry, registry
+from app.utils.metrics import PAYLOAD_BYTES, UPSTREAM_ERRORS, observe_payload
 from loguru import logger
 
+
+async def _maybe_await(value):
+    return await value if inspect.isawaitable(value) else value
+
+
 class StorageManager:
-    def __init__(self):
-        try:
-            # Build connection string dynamically from settings
-            connection_string = (
-                f"DefaultEndpointsProtocol=https;"
-                f"AccountName={settings.azure_storage_account};"
-                f"AccountKey={settings.azure_storage_key};"
-                f"EndpointSuffix=core.windows.net"
-            )
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        # Clients and their connection pools are shared via the registry and
+        # built on first use, so constructing a StorageManager is free
+        self.clients = clients or registry
 
-            self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            self.container_client = self.blob_service_client.get_container_client(
-                settings.azure_storage_container
-            )
-            logger.info("✅ Connected to Azure Blob Storage")
+    @property
+    def blob_service_client(self):
+        return self.clients.blob_service_client
 
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to Azure Blob Storage: {e}")
-            raise
+    @property
+    def container_client(self):
+        return self.blob_service_client.get_container_client(settings.azure_storage_container)
+
+    @property
+    def async_container_client(self):
+        # Resolved per call: the aio client is created lazily inside the event loop
+        return self.clients.async_blob_service_client.get_container_client(
+            settings.azure_storage_container
+        )
+
+    @staticmethod
+    def _transfer_stats(action: str, blob_name: str, nbytes: int, started: float) -> dict:
+        seconds = time.perf_counter() - started
+        mb_per_s = (nbytes / (1024 * 1024)) / seconds if seconds > 0 else 0.0
+        logger.info(f"✅ {action} {blob_name}: {nbytes} bytes in {seconds:.2f}s ({mb_per_s:.1f} MB/s)")
+        observe_payload(PAYLOAD_BYTES, **{action.lower(): nbytes})
+        return {"bytes": nbytes, "seconds": seconds, "mb_per_s": mb_per_s}
 
     def upload_file(self, file_path: str, blob_name: str):
         try:
+            started = time.perf_counter()
             with open(file_path, "rb") as f:
-                self.container_client.upload_blob(name=blob_name, data=f, overwrite=True)
-            logger.info(f"✅ Uploaded {blob_name}")
+                self.container_client.upload_blob(
+                    name=blob_name, data=f, overwrite=True, max_concurrency=settings.blob_max_concurrency
+                )
+                nbytes = f.tell()
+            return self._transfer_stats("Uploaded", blob_name, nbytes, started)
         except Exception as e:
+            UPSTREAM_ERRORS.labels("blob").inc()
             logger.error(f"❌ Upload failed: {e}")
 
     def download_file(self, blob_name: str, file_path: str):
         try:
-            blob = self.container_client.download_blob(blob_name)
+            started = time.perf_counter()
+            # Ranged GETs are written straight to the file; only max_concurrency chunks are buffered
+            blob = self.container_client.download_blob(blob_name, max_concurrency=settings.blob_max_concurrency)
             with open(file_path, "wb") as f:
-                f.write(blob.readall())
-            logger.info(f"✅ Downloaded {blob_name}")
+                nbytes = blob.readinto(f)
+            return self._transfer_stats("Downloaded", blob_name, nbytes, started)
         except Exception as e:
+            UPSTREAM_ERRORS.labels("blob").inc()
             logger.error(f"❌ Download failed: {e}")
 
     def list_files(self, prefix: str = ""):
@@ -46,5 +74,146 @@ class StorageManager:
             #logger.info(f"📂 Blobs in container: {blobs}")
             #return blobs
         except Exception as e:
+            UPSTREAM_ERRORS.labels("blob").inc()
             logger.error(f"❌ List files failed: {e}")
             return []
+
+    # -------------------- Async API --------------------
+    async def aupload_file(self, file_path: str, blob_name: str):
+        """Upload a local file without blocking the event loop. Raises on failure."""
+        try:
+            started = time.perf_counter()
+            with open(file_path, "rb") as f:
+                await self.async_container_client.upload_blob(
+                    name=blob_name, data=f, overwrite=True, max_concurrency=settings.blob_max_concurrency
+                )
+                nbytes = f.tell()
+            return self._transfer_stats("Uploaded", blob_name, nbytes, started)
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("blob").inc()
+            logger.error(f"❌ Upload failed: {e}")
+            raise
+
+    async def aupload_stream(
+        self, stream, blob_name: str, skip_if: Optional[Callable[[str], object]] = None
+    ) -> dict:
+        """
+        Upload from an async ``read(n)`` stream (e.g. an UploadFile) as staged blocks.
+
+        Up to ``blob_max_concurrency`` blocks of ``blob_chunk_size`` are in
+        flight at once, so memory stays bounded whatever the upload size; the
+        first failed block aborts the upload without reading the rest.
+        If ``skip_if(sha256)`` (sync or async) is true, no blob is created. A
+        seekable stream is hashed before anything is uploaded, so a duplicate
+        costs one local read; otherwise the sha256 is computed while streaming
+        and the check runs after the upload, discarding the staged blocks.
+        Failed uploads discard theirs too. Raises on failure.
+        """
+        if skip_if is not None and hasattr(stream, "seek"):
+            content_hash, nbytes = await self._hash_stream(stream)
+            if await self._skip(skip_if, content_hash, blob_name):
+                return {"bytes": nbytes, "sha256": content_hash, "committed": False}
+            await _maybe_await(stream.seek(0))
+            skip_if = None
+
+        blob_client = self.async_container_client.get_blob_client(blob_name)
+        slots = asyncio.Semaphore(settings.blob_max_concurrency)
+        # Staged blocks are per blob name, so ids carry an upload id: a concurrent
+        # upload to the same name can then never commit this upload's blocks
+        upload_id = uuid.uuid4().hex
+        block_ids: list = []
+        tasks: list = []
+        failures: list = []
+        nbytes = 0
+        digest = hashlib.sha256()
+
+        async def stage(block_id: str, data: bytes):
+            try:
+                await blob_client.stage_block(block_id=block_id, data=data, length=len(data))
+            except Exception as e:
+                failures.append(e)
+                raise
+            finally:
+                slots.release()
+
+        started = time.perf_counter()
+        try:
+            while True:
+                await slots.acquire()  # wait for a free slot before buffering the next block
+                if failures:
+                    slots.release()
+                    raise failures[0]
+                data = await stream.read(settings.blob_chunk_size)
+                if not data:
+                    slots.release()
+                    break
+                block_id = f"{upload_id}-{len(block_ids):08d}"  # ids must be equal length; the SDK base64-encodes them
+                block_ids.append(block_id)
+                tasks.append(asyncio.create_task(stage(block_id, data)))
+                digest.update(data)
+                nbytes += len(data)
+
+            await asyncio.gather(*tasks)
+            content_hash = digest.hexdigest()
+            if skip_if is not None and await self._skip(skip_if, content_hash, blob_name):
+                await self._discard_blocks(blob_client, blob_name)
+                return {"bytes": nbytes, "sha256": content_hash, "committed": False}
+
+            await blob_client.commit_block_list(block_ids)
+            stats = self._transfer_stats("Uploaded", blob_name, nbytes, started)
+            return {**stats, "sha256": content_hash, "committed": True}
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            UPSTREAM_ERRORS.labels("blob").inc()
+            logger.error(f"❌ Upload failed: {e}")
+            await asyncio.shield(self._discard_blocks(blob_client, blob_name))
+            raise
+
+    @staticmethod
+    async def _hash_stream(stream) -> tuple[str, int]:
+        digest, nbytes = hashlib.sha256(), 0
+        while data := await stream.read(settings.blob_chunk_size):
+            digest.update(data)
+            nbytes += len(data)
+        return digest.hexdigest(), nbytes
+
+    @staticmethod
+    async def _skip(skip_if: Callable[[str], object], content_hash: str, blob_name: str) -> bool:
+        if not await _maybe_await(skip_if(content_hash)):
+            return False
+        logger.info(f"♻️ {blob_name} duplicates existing content {content_hash[:12]}; not committed")
+        return True
+
+    @staticmethod
+    async def _discard_blocks(blob_client, blob_name: str):
+        """
+        Drop uncommitted blocks now instead of leaving them for Azure's one-week
+        garbage collection: committing an empty list discards them, then the
+        resulting empty blob is deleted. Both steps are conditional, so a blob
+        committed under this name by someone else is never touched (its blocks
+        are then left to Azure). Best effort; failures are only logged.
+        """
+        from azure.core import MatchConditions
+
+        try:
+            committed = await blob_client.commit_block_list([], match_condition=MatchConditions.IfMissing)
+            await blob_client.delete_blob(etag=committed["etag"], match_condition=MatchConditions.IfNotModified)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not discard staged blocks of {blob_name}: {e}")
+
+    async def adownload_file(self, blob_name: str, file_path: str):
+        """Download a blob to a local file with parallel ranged GETs. Raises on failure."""
+        try:
+            started = time.perf_counter()
+            downloader = await self.async_container_client.download_blob(
+                blob_name, max_concurrency=settings.blob_max_concurrency
+            )
+            with open(file_path, "wb") as f:
+                nbytes = await downloader.readinto(f)
+            return self._transfer_stats("Downloaded", blob_name, nbytes, started)
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("blob").inc()
+            logger.error(f"❌ Download failed: {e}")
+            raise
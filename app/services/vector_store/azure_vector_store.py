@@ -1,6 +1,6 @@
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
+import asyncio
+import threading
+from typing import Optional
 from azure.search.documents.indexes.models import (
     SearchIndex,
     SearchField,
@@ -12,28 +12,72 @@ from azure.search.documents.indexes.models import (
 )
 import uuid
 
+import numpy as np
+
+from app.services.clients import ClientRegistry, registry
+from app.utils.metrics import count_errors
+
 
 class AzureVectorStore:
-    def __init__(self, endpoint: str, key: str, index_name: str = "documents"):
+    # Filterable chunk metadata; added to existing indexes on startup if missing
+    METADATA_FIELDS = [
+        SimpleField(name="doc_id", type=SearchFieldDataType.String, filterable=True),
+        SimpleField(name="chunk_id", type=SearchFieldDataType.String),
+        SimpleField(name="page_start", type=SearchFieldDataType.Int32, filterable=True),
+        SimpleField(name="page_end", type=SearchFieldDataType.Int32, filterable=True),
+    ]
+
+    def __init__(self, endpoint: str, key: str, index_name: str = "documents", clients: Optional[ClientRegistry] = None):
         self.endpoint = endpoint
         self.key = key
         self.index_name = index_name
+        # Search clients and their connection pools are shared via the registry
+        self.clients = clients or registry
 
-        self.index_client = SearchIndexClient(
-            endpoint=self.endpoint, credential=AzureKeyCredential(self.key)
-        )
-        self.search_client = SearchClient(
-            endpoint=self.endpoint, index_name=self.index_name, credential=AzureKeyCredential(self.key)
-        )
+        # The index is checked on first use (or by the start-up warm-up), not here,
+        # so a slow or unreachable Search endpoint cannot block the app from booting
+        self._index_ready = False
+        self._index_lock = threading.Lock()
+
+    @property
+    def index_client(self):
+        return self.clients.search_index_client(self.endpoint, self.key)
+
+    @property
+    def search_client(self):
+        self.ensure_index()
+        return self.clients.search_client(self.endpoint, self.key, self.index_name)
 
-        # Ensure index exists on init
-        self._ensure_index()
+    @property
+    def async_search_client(self):
+        return self.clients.async_search_client(self.endpoint, self.key, self.index_name)
+
+    def ensure_index(self):
+        """Run ``_ensure_index`` once per process; retried on the next call if it failed."""
+        if self._index_ready:
+            return
+        with self._index_lock:
+            if not self._index_ready:
+                self._ensure_index()
+                self._index_ready = True
+
+    async def aensure_index(self):
+        if not self._index_ready:
+            await asyncio.to_thread(self.ensure_index)
 
     def _ensure_index(self):
-        """Create index if it does not exist."""
+        """Create index if it does not exist, or add missing metadata fields to it."""
         try:
-            self.index_client.get_index(self.index_name)
+            index = self.index_client.get_index(self.index_name)
         except Exception:
+            index = None
+        if index is not None:
+            existing = {field.name for field in index.fields}
+            missing = [field for field in self.METADATA_FIELDS if field.name not in existing]
+            if missing:
+                index.fields.extend(missing)
+                self.index_client.create_or_update_index(index)
+        else:
             # Define schema
             fields = [
                 SimpleField(name="id", type=SearchFieldDataType.String, key=True),
@@ -44,6 +88,7 @@ class AzureVectorStore:
                     searchable=True,
                     vector_search_profile="defaultHnswProfile",
                 ),
+                *self.METADATA_FIELDS,
             ]
 
             # Define vector search setup
@@ -60,7 +105,8 @@ class AzureVectorStore:
             index = SearchIndex(name=self.index_name, fields=fields, vector_search=vector_search)
             self.index_client.create_index(index)
 
-    def add_embeddings(self, chunks_with_meta: list[dict], embeddings: list[list[float]]):
+    @staticmethod
+    def _to_documents(chunks_with_meta: list[dict], embeddings: list[list[float]]) -> list[dict]:
         if len(chunks_with_meta) != len(embeddings):
              raise ValueError("Chunks and embeddings length mismatch")
         docs = []
@@ -69,13 +115,41 @@ class AzureVectorStore:
                 "id": f"{chunk['doc_id']}_{chunk['chunk_id']}",
                 "doc_id": chunk["doc_id"],
                 "chunk_id": chunk["chunk_id"],
+                "page_start": chunk.get("page_start"),
+                "page_end": chunk.get("page_end"),
                 "content_text": chunk["content"], 
                 "embedding": emb
             })
+        return docs
 
+    @count_errors("azure_search")
+    def add_embeddings(self, chunks_with_meta: list[dict], embeddings: list[list[float]]):
+        docs = self._to_documents(chunks_with_meta, embeddings)
         result = self.search_client.upload_documents(docs)
         return all(r.succeeded for r in result)
 
+    @count_errors("azure_search")
+    async def aadd_embeddings(self, chunks_with_meta: list[dict], embeddings: list[list[float]]):
+        docs = self._to_documents(chunks_with_meta, embeddings)
+        await self.aensure_index()
+        result = await self.async_search_client.upload_documents(docs)
+        return all(r.succeeded for r in result)
+
+
+    @count_errors("azure_search")
+    def delete_ids(self, ids: list[str]) -> int:
+        if not ids:
+            return 0
+        result = self.search_client.delete_documents([{"id": doc_id} for doc_id in ids])
+        return sum(1 for r in result if r.succeeded)
+
+    @count_errors("azure_search")
+    async def adelete_ids(self, ids: list[str]) -> int:
+        if not ids:
+            return 0
+        await self.aensure_index()
+        result = await self.async_search_client.delete_documents([{"id": doc_id} for doc_id in ids])
+        return sum(1 for r in result if r.succeeded)
 
     def add_document(self, content: str, embedding: list):
         """Add a single document with embedding."""
@@ -86,9 +160,18 @@ class AzureVectorStore:
         }
         self.search_client.upload_documents([doc])
 
-    def search(self, embedding: list, k: int = 3):
-        """Perform vector search."""
-        results = self.search_client.search(
+    @staticmethod
+    def _filter(doc_ids: Optional[list] = None) -> Optional[str]:
+        """OData filter on the indexed document ids, or None for the whole index."""
+        if doc_ids is None:
+            return None
+        values = ",".join(str(d).replace("'", "''") for d in doc_ids)
+        return f"search.in(doc_id, '{values}', ',')"
+
+    def _search_kwargs(
+        self, embedding: list, k: int, doc_ids: Optional[list] = None, with_vectors: bool = False
+    ) -> dict:
+        kwargs = dict(
             search_text="",  # must be empty for pure vector search
             vector_queries=[
                 {
@@ -98,7 +181,75 @@ class AzureVectorStore:
                     "fields": "embedding",
                 }
             ],
-            select=["id", "content_text"],
+            select=["id", "content_text", "embedding"] if with_vectors else ["id", "content_text"],
         )
+        search_filter = self._filter(doc_ids)
+        if search_filter:
+            # Filter before the HNSW search so k results come from the scoped documents
+            kwargs.update(filter=search_filter, vector_filter_mode="preFilter")
+        return kwargs
+
+    @staticmethod
+    def _to_hit(result) -> dict:
+        hit = {"id": result["id"], "content": result["content_text"], "score": result["@search.score"]}
+        if result.get("embedding") is not None:
+            hit["vector"] = np.asarray(result["embedding"], dtype=np.float32)
+        return hit
 
+    @count_errors("azure_search")
+    def search(self, embedding: list, k: int = 3, doc_ids: Optional[list] = None):
+        """Perform vector search, optionally restricted to documents."""
+        results = self.search_client.search(**self._search_kwargs(embedding, k, doc_ids))
         return [r["content_text"] for r in results]
+
+    @count_errors("azure_search")
+    async def asearch(self, embedding: list, k: int = 3, doc_ids: Optional[list] = None):
+        """Perform vector search without blocking the event loop."""
+        await self.aensure_index()
+        results = await self.async_search_client.search(**self._search_kwargs(embedding, k, doc_ids))
+        return [r["content_text"] async for r in results]
+
+    @count_errors("azure_search")
+    def search_hits(
+        self, embedding: list, k: int = 3, doc_ids: Optional[list] = None, with_vectors: bool = False
+    ) -> list[dict]:
+        results = self.search_client.search(**self._search_kwargs(embedding, k, doc_ids, with_vectors))
+        return [self._to_hit(r) for r in results]
+
+    @count_errors("azure_search")
+    async def asearch_hits(
+        self, embedding: list, k: int = 3, doc_ids: Optional[list] = None, with_vectors: bool = False
+    ) -> list[dict]:
+        await self.aensure_index()
+        results = await self.async_search_client.search(
+            **self._search_kwargs(embedding, k, doc_ids, with_vectors)
+        )
+        return [self._to_hit(r) async for r in results]
+
+    @count_errors("azure_search")
+    async def aget_vectors(self, ids: list[str]) -> dict[str, np.ndarray]:
+        """Stored vectors for the given ids, fetched in one filtered query."""
+        if not ids:
+            return {}
+        values = ",".join(str(i).replace("'", "''") for i in ids)
+        await self.aensure_index()
+        results = await self.async_search_client.search(
+            search_text="*",
+            filter=f"search.in(id, '{values}', ',')",
+            select=["id", "embedding"],
+            top=len(ids),
+        )
+        return {r["id"]: np.asarray(r["embedding"], dtype=np.float32) async for r in results}
+
+    @count_errors("azure_search")
+    async def akeyword_search(self, query: str, k: int = 3, doc_ids: Optional[list] = None) -> list[dict]:
+        """Full-text (BM25) query against ``content_text``, run by the search service."""
+        await self.aensure_index()
+        results = await self.async_search_client.search(
+            search_text=query,
+            search_fields=["content_text"],
+            select=["id", "content_text"],
+            filter=self._filter(doc_ids),
+            top=k,
+        )
+        return [self._to_hit(r) async for r in results]
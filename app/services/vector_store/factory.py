@@ -0,0 +1,30 @@
+from app.config.settings import settings
+
+
+def build_vector_store(index_name: str = "documents"):
+    """
+    Return the vector store backend selected by ``settings.vector_store_backend``.
+    Both backends expose ``add_embeddings`` / ``add_document`` / ``search``.
+    """
+    # Backends are imported on demand: the Azure one pulls in the Search SDK
+    backend = settings.vector_store_backend.lower()
+    if backend == "local":
+        from app.services.vector_store.local_vector_store import LocalVectorStore
+
+        return LocalVectorStore(
+            index_dir=settings.faiss_index_dir,
+            index_name=index_name,
+            quantization=settings.local_vector_quantization.lower(),
+            pq_subspaces=settings.local_vector_pq_subspaces,
+            rerank_factor=settings.local_vector_rerank_factor,
+            quantize_min_rows=settings.local_vector_quantize_min_rows,
+        )
+    if backend == "azure":
+        from app.services.vector_store.azure_vector_store import AzureVectorStore
+
+        return AzureVectorStore(
+            endpoint=settings.azure_search_endpoint,
+            key=settings.azure_search_api_key,
+            index_name=index_name,
+        )
+    raise ValueError(f"Unknown vector store backend: {settings.vector_store_backend}")
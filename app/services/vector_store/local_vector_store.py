@@ -0,0 +1,595 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from app.services.vector_store.quantization import (
+    QUANTIZATION_KINDS,
+    load_quantizer,
+    save_quantizer,
+    train_quantizer,
+)
+
+try:
+    import fcntl  # POSIX only; used to serialise writers across worker processes
+    _HAS_FCNTL = True
+except ImportError:
+    _HAS_FCNTL = False
+
+
+class _FileLock:
+    """Advisory inter-process lock around index writes."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+")
+        if _HAS_FCNTL:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if _HAS_FCNTL:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        self._fh.close()
+        self._fh = None
+
+
+class LocalVectorStore:
+    """
+    In-process vector store with the same surface as AzureVectorStore.
+
+    Layout under ``<index_dir>/<index_name>/``:
+      - ``vectors.f32``  row-major float32 matrix (rows x dim), memory-mapped read-only
+      - ``meta.jsonl``   append-only row metadata; the last line for a row wins
+                         (a ``deleted`` line tombstones the row until its id is re-added)
+      - ``index.json``   committed row count, dimension, generation
+                         (bumped by ``rebuild``, which replaces both data files),
+                         a version counter bumped by every commit
+                         and the current codebook, if any
+      - ``codes.bin``    compressed copy of every row (int8 or PQ codes), memory-mapped
+      - ``quantizer.npz`` the codebook the codes were made with
+
+    Readers only map the rows recorded in ``index.json``, so a writer in another
+    worker can append safely while searches are running. Vectors are stored
+    L2-normalised so the dot product equals cosine similarity, matching the
+    Azure index. Rows are partitioned by ``doc_id`` in memory, so a search
+    filtered to some documents only reads and scores their rows.
+
+    With ``quantization`` set to ``int8`` or ``pq`` a codebook is trained once
+    the index holds ``quantize_min_rows`` rows (smaller indexes stay exact).
+    Searches then scan only the codes and rerank the best
+    ``k * rerank_factor`` rows with their float32 vectors, so the working set
+    is the codes (4x or dim*4/subspaces x smaller) plus the shortlisted rows.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    META_FILE = "meta.jsonl"
+    HEADER_FILE = "index.json"
+    LOCK_FILE = ".lock"
+    CODES_FILE = "codes.bin"
+    QUANTIZER_FILE = "quantizer.npz"
+    # Rows sampled to train a codebook (also the encoding batch size)
+    TRAIN_SAMPLE = 32_768
+    # Optional chunk metadata persisted alongside the required fields
+    EXTRA_FIELDS = ("page_start", "page_end")
+    PARTITION_FIELDS = ("doc_id",)
+
+    def __init__(
+        self,
+        index_dir: str,
+        index_name: str = "documents",
+        quantization: str = "none",
+        pq_subspaces: int = 0,
+        rerank_factor: int = 10,
+        quantize_min_rows: int = 10000,
+    ):
+        if quantization not in QUANTIZATION_KINDS:
+            raise ValueError(f"quantization must be one of {QUANTIZATION_KINDS}")
+        self.index_name = index_name
+        self.quantization = quantization
+        self.pq_subspaces = pq_subspaces
+        self.rerank_factor = max(1, rerank_factor)
+        self.quantize_min_rows = max(1, quantize_min_rows)
+        self.path = Path(index_dir) / index_name
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._vectors_path = self.path / self.VECTORS_FILE
+        self._meta_path = self.path / self.META_FILE
+        self._header_path = self.path / self.HEADER_FILE
+        self._codes_path = self.path / self.CODES_FILE
+        self._quantizer_path = self.path / self.QUANTIZER_FILE
+        self._lock = threading.RLock()
+        self._file_lock = _FileLock(self.path / self.LOCK_FILE)
+
+        self.dim: int | None = None
+        self._rows = 0
+        self._vectors: np.ndarray | None = None
+        self._meta: list[dict] = []
+        self._id_to_row: dict[str, int] = {}
+        self._deleted: set[int] = set()
+        self._partitions: dict[str, dict[str, set[int]]] = {field: {} for field in self.PARTITION_FIELDS}
+        self._live: np.ndarray | None = None  # row mask, only built when something is deleted
+        self._meta_offset = 0
+        self._version = -1  # header version last loaded; -1 = nothing loaded yet
+        self._generation = 0
+        self._codebook: dict | None = None  # header entry: kind, code_size, generation, version
+        self._quantizer = None
+        self._codes: np.ndarray | None = None
+
+        self._ensure_index()
+
+    # -------------------- Index lifecycle --------------------
+    def _ensure_index(self):
+        """Create empty index files if they do not exist, then load them."""
+        with self._file_lock:
+            self._vectors_path.touch(exist_ok=True)
+            self._meta_path.touch(exist_ok=True)
+            self._codes_path.touch(exist_ok=True)
+            if not self._header_path.exists():
+                self._write_header(dim=None, rows=0)
+        self._refresh(force=True)
+        logger.info(f"✅ Local vector store ready at {self.path} ({self._rows} rows)")
+
+    def _read_header(self) -> dict:
+        with open(self._header_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_header(self, dim: int | None, rows: int, generation: int | None = None):
+        """Publish a commit; caller holds the file lock, so the version read here is current."""
+        tmp = self._header_path.with_suffix(".json.tmp")
+        generation = self._generation if generation is None else generation
+        version = self._read_header().get("version", 0) + 1 if self._header_path.exists() else 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"dim": dim, "rows": rows, "generation": generation, "version": version, "codebook": self._codebook}, f
+            )
+        os.replace(tmp, self._header_path)
+
+    def _reset_meta(self):
+        self._meta = []
+        self._id_to_row = {}
+        self._deleted = set()
+        self._partitions = {field: {} for field in self.PARTITION_FIELDS}
+        self._meta_offset = 0
+
+    def _refresh(self, force: bool = False):
+        """Re-map vectors and pick up metadata appended by other processes."""
+        with self._lock:
+            # A counter rather than the file mtime: commits within one mtime tick must not be missed
+            try:
+                header = self._read_header()
+            except FileNotFoundError:
+                return
+            version = header.get("version", 0)
+            if not force and version == self._version:
+                return
+
+            rows, dim = header["rows"], header["dim"]
+            if header.get("generation", 0) != self._generation:
+                # The index was rebuilt: the metadata log starts over
+                self._reset_meta()
+                self._generation = header.get("generation", 0)
+
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                f.seek(self._meta_offset)
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # partially written line; picked up on next refresh
+                    self._meta_offset += len(line.encode("utf-8"))
+                    self._apply_meta(json.loads(line))
+
+            codebook = header.get("codebook")
+            if codebook != self._codebook:
+                self._quantizer = load_quantizer(self._quantizer_path) if codebook else None
+                self._codebook = codebook
+
+            self.dim = dim
+            self._rows = rows
+            if rows and dim:
+                self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            else:
+                self._vectors = None
+            if rows and self._quantizer is not None:
+                self._codes = np.memmap(
+                    self._codes_path, dtype=self._quantizer.code_dtype, mode="r",
+                    shape=(rows, self._quantizer.code_size),
+                )
+            else:
+                self._codes = None
+            if self._deleted:
+                self._live = np.ones(rows, dtype=bool)
+                self._live[[r for r in self._deleted if r < rows]] = False
+            else:
+                self._live = None
+            self._version = version
+
+    def _apply_meta(self, record: dict):
+        row = record["row"]
+        if row < len(self._meta):
+            self._partition(self._meta[row], row, add=False)
+            self._meta[row] = record
+        else:
+            self._meta.extend([{}] * (row - len(self._meta)))
+            self._meta.append(record)
+        self._id_to_row[record["id"]] = row
+        if record.get("deleted"):
+            self._deleted.add(row)
+        else:
+            self._deleted.discard(row)
+            self._partition(record, row, add=True)
+
+    def _partition(self, record: dict, row: int, add: bool):
+        for field in self.PARTITION_FIELDS:
+            value = record.get(field)
+            if value is None:
+                continue
+            rows = self._partitions[field].setdefault(str(value), set())
+            if add:
+                rows.add(row)
+            else:
+                rows.discard(row)
+                if not rows:
+                    del self._partitions[field][str(value)]
+
+    def _filtered_rows(self, doc_ids: list | None) -> np.ndarray | None:
+        """Sorted committed rows of the given documents, or None when unfiltered."""
+        if doc_ids is None:
+            return None
+        with self._lock:
+            by_doc = self._partitions["doc_id"]
+            selected = set().union(*(by_doc.get(str(d), ()) for d in doc_ids))
+            rows = np.fromiter((r for r in selected if r < self._rows), dtype=np.int64)
+        rows.sort()
+        return rows
+
+    # -------------------- Writes --------------------
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def add_embeddings(self, chunks_with_meta: list[dict], embeddings: list[list[float]]):
+        if len(chunks_with_meta) != len(embeddings):
+            raise ValueError("Chunks and embeddings length mismatch")
+        if not embeddings:
+            return True
+
+        matrix = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2:
+            raise ValueError("Embeddings must all have the same dimension")
+
+        self._write([self._doc(chunk) for chunk in chunks_with_meta], matrix)
+        return True
+
+    def _doc(self, chunk: dict) -> dict:
+        return {
+            "id": f"{chunk['doc_id']}_{chunk['chunk_id']}",
+            "doc_id": chunk["doc_id"],
+            "chunk_id": chunk["chunk_id"],
+            "content_text": chunk["content"],
+            **{k: chunk[k] for k in self.EXTRA_FIELDS if k in chunk},
+        }
+
+    def rebuild(self, chunks_with_meta: list[dict], matrix: np.ndarray | None) -> int:
+        """
+        Replace the whole index with the given rows in one pass (e.g. vectors
+        loaded from the chunks table). Both data files are written aside and
+        swapped in; other workers reload them when they see the new generation.
+        """
+        rows = len(chunks_with_meta)
+        if rows and (matrix is None or matrix.shape[0] != rows):
+            raise ValueError("Chunks and embeddings length mismatch")
+        matrix = self._normalize(np.asarray(matrix, dtype=np.float32)) if rows else None
+        dim = int(matrix.shape[1]) if rows else None
+
+        with self._lock, self._file_lock:
+            tmp_vectors = self._vectors_path.with_suffix(".f32.tmp")
+            tmp_meta = self._meta_path.with_suffix(".jsonl.tmp")
+            with open(tmp_vectors, "wb") as f:
+                if rows:
+                    f.write(np.ascontiguousarray(matrix).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps({"row": row, **self._doc(chunk)}) + "\n" for row, chunk in enumerate(chunks_with_meta))
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_meta, self._meta_path)
+            # The old codes describe other rows; a new codebook is trained below if enabled
+            self._codebook, self._quantizer = None, None
+            self._write_header(dim=dim, rows=rows, generation=self._read_header().get("generation", 0) + 1)
+            self._refresh(force=True)
+            if self._needs_codebook():
+                self._train_codebook()
+        logger.info(f"♻️ Rebuilt local vector store at {self.path} ({rows} rows)")
+        return rows
+
+    def add_document(self, content: str, embedding: list):
+        """Add a single document with embedding."""
+        matrix = self._normalize(np.asarray([embedding], dtype=np.float32))
+        self._write([{"id": str(uuid.uuid4()), "content_text": content}], matrix)
+
+    def _write(self, docs: list[dict], matrix: np.ndarray):
+        with self._lock, self._file_lock:
+            # Forced: rows another worker committed since our last look must not be overwritten
+            self._refresh(force=True)
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+
+            rows = self._rows
+            meta_lines = []
+            # Once a codebook exists every row is encoded, whatever this worker's setting
+            codes = self._quantizer.encode(matrix) if self._quantizer is not None else None
+            with open(self._vectors_path, "r+b") as f, open(self._codes_path, "r+b") as codes_file:
+                for i, (doc, vec) in enumerate(zip(docs, matrix)):
+                    row = self._id_to_row.get(doc["id"])
+                    if row is None:
+                        row = rows
+                        rows += 1
+                    f.seek(row * self.dim * 4)
+                    f.write(vec.tobytes())
+                    if codes is not None:
+                        codes_file.seek(row * codes.shape[1] * codes.itemsize)
+                        codes_file.write(codes[i].tobytes())
+                    meta_lines.append(json.dumps({"row": row, **doc}) + "\n")
+                    self._id_to_row[doc["id"]] = row
+                for handle in (f, codes_file):
+                    handle.flush()
+                    os.fsync(handle.fileno())
+
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                f.writelines(meta_lines)
+
+            # Publishing the new row count is the commit point for readers.
+            self._write_header(dim=self.dim, rows=rows)
+            self._refresh(force=True)
+            if self._needs_codebook():
+                self._train_codebook()
+
+    # -------------------- Quantization --------------------
+    def _needs_codebook(self) -> bool:
+        return (
+            self.quantization != "none"
+            and self._rows >= self.quantize_min_rows
+            and (self._codebook is None or self._codebook["kind"] != self.quantization)
+        )
+
+    def train_codebook(self):
+        """(Re)train the codebook on the current rows, e.g. after the corpus has drifted."""
+        if self.quantization == "none":
+            raise ValueError("quantization is disabled for this index")
+        with self._lock, self._file_lock:
+            self._refresh(force=True)
+            if self._rows:
+                self._train_codebook()
+
+    def _train_codebook(self):
+        """Train on a row sample, encode every row and publish; caller holds both locks."""
+        rows, vectors = self._rows, self._vectors
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(rows, min(rows, self.TRAIN_SAMPLE), replace=False))
+        quantizer = train_quantizer(self.quantization, np.asarray(vectors[sample]), self.pq_subspaces)
+
+        tmp_codes = self._codes_path.with_suffix(".bin.tmp")
+        tmp_quantizer = self._quantizer_path.with_suffix(".npz.tmp")
+        with open(tmp_codes, "wb") as f:
+            for start in range(0, rows, self.TRAIN_SAMPLE):
+                f.write(quantizer.encode(np.asarray(vectors[start:start + self.TRAIN_SAMPLE])).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        save_quantizer(quantizer, tmp_quantizer)
+        os.replace(tmp_codes, self._codes_path)
+        os.replace(tmp_quantizer, self._quantizer_path)
+
+        # Generation + version identify the codebook, so readers reload it after a retrain or rebuild
+        previous = self._codebook if self._codebook and self._codebook["generation"] == self._generation else {}
+        self._codebook = {
+            "kind": quantizer.kind,
+            "code_size": quantizer.code_size,
+            "generation": self._generation,
+            "version": previous.get("version", 0) + 1,
+        }
+        self._quantizer = quantizer
+        self._write_header(dim=self.dim, rows=rows)
+        self._refresh(force=True)
+        logger.info(
+            f"🗜️ Trained {quantizer.kind} codebook for {self.path} ({rows} rows, "
+            f"{quantizer.code_size * np.dtype(quantizer.code_dtype).itemsize} bytes/row vs {self.dim * 4})"
+        )
+
+    def delete_ids(self, ids: list[str]) -> int:
+        """Tombstone rows by id; returns how many were live. Rows are reused if the id comes back."""
+        with self._lock, self._file_lock:
+            self._refresh(force=True)
+            lines = []
+            for doc_id in ids:
+                row = self._id_to_row.get(doc_id)
+                if row is None or row in self._deleted:
+                    continue
+                record = {"row": row, "id": doc_id, "deleted": True}
+                lines.append(json.dumps(record) + "\n")
+                self._apply_meta(record)
+            if not lines:
+                return 0
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self._write_header(dim=self.dim, rows=self._rows)
+            self._refresh(force=True)
+            return len(lines)
+
+    # -------------------- Reads --------------------
+    def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < scores.shape[0]:
+            idx = np.argpartition(-scores, k - 1)[:k]
+        else:
+            idx = np.arange(scores.shape[0])
+        return idx[np.argsort(-scores[idx], kind="stable")]
+
+    def search_hits(
+        self,
+        embedding: list,
+        k: int = 3,
+        doc_ids: list | None = None,
+        with_vectors: bool = False,
+    ) -> list[dict]:
+        """
+        Vector search (cosine) over the memory-mapped matrix; hits carry id, content and score
+        (plus the normalised ``vector`` if requested). With ``doc_ids`` only those
+        documents' rows are read and scored. Exact unless a codebook is in use, in which case
+        the codes are scanned and the shortlist reranked with the float32 vectors.
+        """
+        self._refresh()
+        vectors, live, codes = self._vectors, self._live, self._codes
+        if vectors is None or embedding is None or len(embedding) == 0:
+            return []
+
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        rows = self._filtered_rows(doc_ids)
+        if rows is not None:
+            rows = rows[rows < vectors.shape[0]]
+        if codes is not None and self.quantization != "none":
+            top = self._quantized_top(vectors, codes, live, rows, query, k, shortlist=k * self.rerank_factor)
+        else:
+            top = self._exact_top(vectors, live, rows, query, k)
+
+        hits = [self._hit(row, score) for row, score in top]
+        if with_vectors and hits:
+            matrix = np.asarray(vectors[[row for row, _ in top]])
+            for hit, vector in zip(hits, matrix):
+                hit["vector"] = vector
+        return hits
+
+    def _exact_top(self, vectors, live, rows, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        if rows is not None:
+            scores = vectors[rows] @ query if rows.size else np.empty(0, dtype=np.float32)
+            return [(int(rows[i]), scores[i]) for i in self._top_k(scores, k)]
+        scores = vectors @ query
+        if live is not None and live.shape[0] == scores.shape[0]:
+            scores[~live] = -np.inf
+        return [(int(i), scores[i]) for i in self._top_k(scores, k) if scores[i] > -np.inf]
+
+    def _quantized_top(self, vectors, codes, live, rows, query: np.ndarray, k: int, shortlist: int) -> list[tuple[int, float]]:
+        """Score the codes, then rerank the ``shortlist`` best rows with their full vectors."""
+        if rows is not None:
+            approx = self._quantizer.score(codes[rows], query) if rows.size else np.empty(0, dtype=np.float32)
+            candidates = rows[self._top_k(approx, shortlist)]
+        else:
+            approx = self._quantizer.score(codes, query)
+            if live is not None and live.shape[0] == approx.shape[0]:
+                approx[~live] = -np.inf
+            candidates = self._top_k(approx, shortlist)
+            candidates = candidates[approx[candidates] > -np.inf]
+        candidates = np.sort(candidates)  # ascending rows: sequential reads from the mmap
+        scores = np.asarray(vectors[candidates]) @ query
+        return [(int(candidates[i]), scores[i]) for i in self._top_k(scores, k)]
+
+    def measure_recall(self, queries=None, k: int = 10, sample: int = 100, seed: int = 0) -> dict:
+        """
+        recall@k of the quantized search against exact search, with and without the
+        rerank step. ``queries`` defaults to ``sample`` stored vectors (live rows).
+        """
+        self._refresh()
+        vectors, live, codes = self._vectors, self._live, self._codes
+        if codes is None:
+            raise ValueError("Index has no codebook yet (quantization off or fewer than quantize_min_rows rows)")
+        if queries is None:
+            candidates = np.flatnonzero(live) if live is not None else np.arange(vectors.shape[0])
+            picked = np.random.default_rng(seed).choice(candidates, min(sample, candidates.size), replace=False)
+            queries = np.asarray(vectors[np.sort(picked)])
+        queries = self._normalize(np.asarray(queries, dtype=np.float32).reshape(-1, vectors.shape[1]))
+
+        recall, recall_codes = [], []
+        for query in queries:
+            exact = {row for row, _ in self._exact_top(vectors, live, None, query, k)}
+            if not exact:
+                continue
+            reranked = self._quantized_top(vectors, codes, live, None, query, k, shortlist=k * self.rerank_factor)
+            codes_only = self._quantized_top(vectors, codes, live, None, query, k, shortlist=k)
+            recall.append(len(exact & {row for row, _ in reranked}) / len(exact))
+            recall_codes.append(len(exact & {row for row, _ in codes_only}) / len(exact))
+
+        code_bytes, vector_bytes = codes.nbytes, vectors.nbytes
+        return {
+            "quantization": self._codebook["kind"],
+            "queries": len(recall),
+            "k": k,
+            "rerank_factor": self.rerank_factor,
+            "recall": float(np.mean(recall)) if recall else 0.0,
+            "recall_codes_only": float(np.mean(recall_codes)) if recall_codes else 0.0,
+            "code_bytes": int(code_bytes),
+            "vector_bytes": int(vector_bytes),
+            "compression": vector_bytes / code_bytes if code_bytes else 0.0,
+        }
+
+    def _hit(self, row: int, score) -> dict:
+        meta = self._meta[row]
+        return {"id": meta["id"], "content": meta["content_text"], "score": float(score)}
+
+    def get_vectors(self, ids: list[str]) -> dict[str, np.ndarray]:
+        """Stored (normalised) vectors for the given ids; unknown or deleted ids are skipped."""
+        self._refresh()
+        vectors = self._vectors
+        if vectors is None:
+            return {}
+        found = [
+            (doc_id, row) for doc_id, row in ((d, self._id_to_row.get(d)) for d in ids)
+            if row is not None and row < vectors.shape[0] and row not in self._deleted
+        ]
+        if not found:
+            return {}
+        matrix = np.asarray(vectors[[row for _, row in found]])
+        return {doc_id: vector for (doc_id, _), vector in zip(found, matrix)}
+
+    def search(self, embedding: list, k: int = 3, doc_ids: list | None = None):
+        """Perform vector search (cosine) over the memory-mapped matrix."""
+        return [hit["content"] for hit in self.search_hits(embedding, k, doc_ids)]
+
+    # -------------------- Async API --------------------
+    # The kernel is CPU-bound NumPy, which releases the GIL, so a worker thread
+    # keeps the event loop free without a separate process.
+    async def aadd_embeddings(self, chunks_with_meta: list[dict], embeddings: list[list[float]]):
+        return await asyncio.to_thread(self.add_embeddings, chunks_with_meta, embeddings)
+
+    async def asearch(self, embedding: list, k: int = 3, doc_ids: list | None = None):
+        return await asyncio.to_thread(self.search, embedding, k, doc_ids)
+
+    async def asearch_hits(
+        self,
+        embedding: list,
+        k: int = 3,
+        doc_ids: list | None = None,
+        with_vectors: bool = False,
+    ) -> list[dict]:
+        return await asyncio.to_thread(self.search_hits, embedding, k, doc_ids, with_vectors)
+
+    async def aget_vectors(self, ids: list[str]) -> dict[str, np.ndarray]:
+        return await asyncio.to_thread(self.get_vectors, ids)
+
+    async def adelete_ids(self, ids: list[str]) -> int:
+        return await asyncio.to_thread(self.delete_ids, ids)
+
+    async def arebuild(self, chunks_with_meta: list[dict], matrix: np.ndarray | None) -> int:
+        return await asyncio.to_thread(self.rebuild, chunks_with_meta, matrix)
+
+    @property
+    def version(self):
+        """Changes whenever any worker commits a write to this index."""
+        self._refresh()
+        return self._version
+
+    def __len__(self) -> int:
+        self._refresh()
+        return self._rows - len(self._deleted)
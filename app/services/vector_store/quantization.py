@@ -0,0 +1,173 @@
+# app/services/vector_store/quantization.py
+"""
+Vector compression for the local index: int8 scalar quantization and
+product quantization (PQ). Both score codes against a float32 query without
+decompressing them, so a search can scan the codes and rerank a shortlist
+with the full-precision vectors.
+"""
+from pathlib import Path
+
+import numpy as np
+
+QUANTIZATION_KINDS = ("none", "int8", "pq")
+
+# Rows scored per block, bounding the temporaries of a scan
+_BLOCK_ROWS = 16384
+# int8 blocks are widened to float32 in a buffer of this size
+_WIDEN_BYTES = 1 << 20
+
+
+class ScalarQuantizer:
+    """One int8 per dimension with a per-dimension scale: 4x smaller than float32."""
+
+    kind = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, scale: np.ndarray):
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @property
+    def code_size(self) -> int:
+        return int(self.scale.shape[0])
+
+    @classmethod
+    def train(cls, sample: np.ndarray) -> "ScalarQuantizer":
+        max_abs = np.abs(sample).max(axis=0).astype(np.float32)
+        max_abs[max_abs == 0] = 1.0
+        return cls(max_abs / 127.0)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(matrix / self.scale), -127, 127).astype(np.int8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products of the encoded rows with ``query``."""
+        scaled = (query * self.scale).astype(np.float32)
+        # Blocks are widened into one reused cache-sized float32 buffer for the matmul
+        buffer = np.empty((max(64, _WIDEN_BYTES // (4 * self.code_size)), self.code_size), dtype=np.float32)
+
+        def score_block(block: np.ndarray) -> np.ndarray:
+            widened = buffer[:block.shape[0]]
+            np.copyto(widened, block, casting="unsafe")
+            return widened @ scaled
+
+        return _blocked(codes, score_block, block_rows=buffer.shape[0])
+
+    def arrays(self) -> dict:
+        return {"scale": self.scale}
+
+
+class ProductQuantizer:
+    """
+    Splits vectors into ``subspaces`` slices and stores each slice as the id of
+    its nearest of 256 k-means centroids: ``subspaces`` bytes per vector. A query
+    builds a (subspaces x 256) table of slice-centroid dot products once, and a
+    row's score is the sum of its entries in that table.
+    """
+
+    kind = "pq"
+    code_dtype = np.uint8
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)  # (subspaces, clusters, sub_dim)
+
+    @property
+    def code_size(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @staticmethod
+    def subspaces_for(dim: int, requested: int = 0) -> int:
+        """``requested`` (default dim / 8) lowered to the nearest divisor of ``dim``."""
+        subspaces = max(1, min(requested or dim // 8, dim))
+        while dim % subspaces:
+            subspaces -= 1
+        return subspaces
+
+    @classmethod
+    def train(cls, sample: np.ndarray, subspaces: int = 0, iterations: int = 10, seed: int = 0) -> "ProductQuantizer":
+        dim = sample.shape[1]
+        subspaces = cls.subspaces_for(dim, subspaces)
+        slices = sample.reshape(sample.shape[0], subspaces, dim // subspaces)
+        rng = np.random.default_rng(seed)
+        clusters = min(256, sample.shape[0])
+        centroids = np.stack([_kmeans(np.ascontiguousarray(slices[:, j]), clusters, iterations, rng) for j in range(subspaces)])
+        return cls(centroids)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        subspaces, _, sub_dim = self.centroids.shape
+        slices = matrix.reshape(matrix.shape[0], subspaces, sub_dim)
+        codes = np.empty((matrix.shape[0], subspaces), dtype=np.uint8)
+        for j in range(subspaces):
+            codes[:, j] = _nearest(slices[:, j], self.centroids[j])
+        return codes
+
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        subspaces, _, sub_dim = self.centroids.shape
+        return np.einsum("jcd,jd->jc", self.centroids, query.reshape(subspaces, sub_dim)).astype(np.float32)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        table = self.lookup_table(query)
+
+        def score_block(block: np.ndarray) -> np.ndarray:
+            scores = np.zeros(block.shape[0], dtype=np.float32)
+            for j in range(table.shape[0]):
+                scores += table[j].take(block[:, j])
+            return scores
+
+        return _blocked(codes, score_block)
+
+    def arrays(self) -> dict:
+        return {"centroids": self.centroids}
+
+
+# -------------------- Helpers --------------------
+def _blocked(codes: np.ndarray, score_block, block_rows: int = _BLOCK_ROWS) -> np.ndarray:
+    scores = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], block_rows):
+        scores[start:start + block_rows] = score_block(np.asarray(codes[start:start + block_rows]))
+    return scores
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin of squared distance; |point|^2 is the same for every centroid
+    distances = points @ centroids.T
+    distances *= -2.0
+    distances += (centroids ** 2).sum(axis=1)
+    return np.argmin(distances, axis=1)
+
+
+def _kmeans(points: np.ndarray, clusters: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = points[rng.choice(points.shape[0], clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(points, centroids)
+        counts = np.bincount(assign, minlength=clusters)
+        sums = np.stack([np.bincount(assign, weights=points[:, d], minlength=clusters) for d in range(points.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters on random points so every code is used
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            centroids[empty] = points[rng.choice(points.shape[0], empty.size, replace=False)]
+    return centroids
+
+
+def train_quantizer(kind: str, sample: np.ndarray, subspaces: int = 0):
+    if kind == "int8":
+        return ScalarQuantizer.train(sample)
+    if kind == "pq":
+        return ProductQuantizer.train(sample, subspaces)
+    raise ValueError(f"quantization must be one of {QUANTIZATION_KINDS[1:]}")
+
+
+def save_quantizer(quantizer, path: Path):
+    with open(path, "wb") as f:
+        np.savez(f, kind=np.array(quantizer.kind), **quantizer.arrays())
+
+
+def load_quantizer(path: Path):
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind == "int8":
+            return ScalarQuantizer(data["scale"])
+        if kind == "pq":
+            return ProductQuantizer(data["centroids"])
+    raise ValueError(f"Unknown quantizer kind in {path}: {kind}")
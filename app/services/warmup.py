@@ -0,0 +1,77 @@
+# app/services/warmup.py
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+Step = Callable[[], Awaitable]
+
+
+class Warmup:
+    """
+    Start-up work and its outcome, as reported by the readiness endpoint.
+
+    ``run`` executes a step inline (e.g. DB initialisation, before serving);
+    ``add`` + ``start`` run steps concurrently in the background once the app
+    is already accepting connections. Every step is bounded by ``timeout``.
+    The app is ready when all steps have finished and no required step failed:
+    optional steps only pre-pay work that is otherwise done on first use.
+    """
+
+    FINISHED = ("ok", "failed", "timeout")
+
+    def __init__(self, timeout: Optional[float] = 30.0):
+        self.timeout = timeout
+        self.checks: Dict[str, dict] = {}
+        self._steps: Dict[str, Step] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, step: Step, required: bool = False):
+        self._steps[name] = step
+        self.checks[name] = {"status": "pending", "required": required}
+
+    def start(self):
+        """Run the added steps in the background."""
+        if self._steps:
+            self._task = asyncio.create_task(self._run_all())
+
+    async def _run_all(self):
+        await asyncio.gather(*(self.run(name, step, self.checks[name]["required"]) for name, step in self._steps.items()))
+
+    async def run(self, name: str, step: Step, required: bool = False) -> bool:
+        self.checks[name] = {"status": "running", "required": required}
+        started = time.perf_counter()
+        status, error = "ok", None
+        try:
+            await asyncio.wait_for(step(), self.timeout)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"not finished after {self.timeout:g}s"
+        except Exception as e:
+            status, error = "failed", str(e)
+        seconds = time.perf_counter() - started
+
+        self.checks[name] = {"status": status, "required": required, "seconds": round(seconds, 3)}
+        if error:
+            self.checks[name]["error"] = error
+            log = logger.error if required else logger.warning
+            log(f"⚠️ Warm-up step {name} {status} after {seconds:.2f}s: {error}")
+        else:
+            logger.info(f"🔥 Warm-up step {name} done in {seconds:.2f}s")
+        return status == "ok"
+
+    @property
+    def finished(self) -> bool:
+        return all(check["status"] in self.FINISHED for check in self.checks.values())
+
+    @property
+    def ready(self) -> bool:
+        return self.finished and all(
+            check["status"] == "ok" for check in self.checks.values() if check["required"]
+        )
+
+    async def aclose(self):
+        """Cancel background steps still running (called on shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
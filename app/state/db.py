@@ -1,14 +1,45 @@
 # app/state/db.py
-from sqlalchemy import create_engine
+import asyncio
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base,Session
 from app.config.settings import settings
-from typing import Generator
+from typing import AsyncGenerator, Generator
+
+
+def _async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db (explicit drivers are kept)."""
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _configure_sqlite(dbapi_connection, _record):
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe in WAL mode
+    # and avoids an fsync per commit; busy_timeout makes writers wait instead of failing.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.close()
+
+
 # SQLite engine
 engine = create_engine(
-    settings.sqlite_path, 
+    settings.sqlite_path,
     connect_args={"check_same_thread": False}  # required for SQLite multithreading
 )
 
+# Async engine (aiosqlite) over the same database, for request handlers and workers
+async_engine = create_async_engine(_async_url(settings.sqlite_path))
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _configure_sqlite)
+
 # Session factory
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -16,10 +47,37 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Base class for ORM models
 Base = declarative_base()
 
 
+def init_db():
+    """
+    Create missing tables, then add the nullable columns and indexes that were
+    added to the models since existing tables were created.
+    """
+    from app.state import models  # noqa: F401  (registers the tables on Base.metadata)
+
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 # Dependency for FastAPI
 def get_db() -> Generator[Session, None, None]:
     """
@@ -30,3 +88,28 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Yield an async database session for use with async FastAPI endpoints.
+    Synchronous repo functions run on it via ``await db.run_sync(fn, ...)``;
+    run_sync executes ``fn`` on the event loop thread (only the driver I/O is
+    awaited), so keep it to single-row lookups and use ``db_call`` otherwise.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def with_session(fn, *args, **kwargs):
+    """Call ``fn(db, *args, **kwargs)`` with a short-lived session."""
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+async def db_call(fn, *args, **kwargs):
+    """Run a synchronous repo function with its own session in a worker thread, off the event loop."""
+    return await asyncio.to_thread(with_session, fn, *args, **kwargs)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.state.db import Base
+from app.utils.vectors import unpack_embedding
 
 
 class Session(Base):
@@ -8,18 +9,28 @@ class Session(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, nullable=False)
+    # Running summary of the conversation turns up to (and including) message summarized_until
+    summary = Column(Text, nullable=True)
+    summary_tokens = Column(Integer, nullable=True)
+    summarized_until = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     documents = relationship("Document", back_populates="session", cascade="all, delete-orphan")
+    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
 
 
 class Document(Base):
     __tablename__ = "documents"
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=True)  # make nullable
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=True, index=True)  # make nullable
     name = Column(String, nullable=False)
     blob_url = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded bytes
+    # Set on duplicate uploads: the blob and index entries of this document are reused
+    source_document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    # Index version of the last manifest change to this document's chunks (see IndexState)
+    index_version = Column(Integer, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     session = relationship("Session", back_populates="documents")
@@ -28,11 +39,72 @@ class Document(Base):
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    # Manifest lookups are always per document, usually by key
+    __table_args__ = (Index("ix_chunks_document_id_chunk_key", "document_id", "chunk_key"),)
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    # Manifest of what is indexed: the vector store id is "{document_id}_{chunk_key}"
+    chunk_key = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    position = Column(Integer, nullable=True)
+    page_start = Column(Integer, nullable=True)
+    page_end = Column(Integer, nullable=True)
     text = Column(Text, nullable=False)
-    embedding = Column(Text, nullable=True)
+    # Raw little-endian float32 / float16 vector; see app.utils.vectors
+    embedding = Column(LargeBinary, nullable=True)
+    embedding_dim = Column(Integer, nullable=True)
+    embedding_dtype = Column(String(8), nullable=True)  # float32 | float16
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     document = relationship("Document", back_populates="chunks")
+
+    @property
+    def vector(self):
+        """Stored embedding as a read-only NumPy view (no parsing or copy), or None."""
+        if self.embedding is None:
+            return None
+        return unpack_embedding(self.embedding, self.embedding_dim, self.embedding_dtype or "float32")
+
+
+class IndexState(Base):
+    """Single row whose ``version`` is bumped in every transaction that changes the chunk manifest."""
+    __tablename__ = "index_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class Message(Base):
+    __tablename__ = "messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, index=True)
+    role = Column(String, nullable=False)  # user | assistant
+    content = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    session = relationship("Session", back_populates="messages")
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued | running | succeeded | failed
+    stage = Column(String, nullable=True)  # download | extract | chunk | embed | index | done
+    chunks_total = Column(Integer, nullable=False, default=0)
+    chunks_embedded = Column(Integer, nullable=False, default=0)
+    timings = Column(Text, nullable=True)  # JSON object: stage -> seconds
+    chunk_changes = Column(Text, nullable=True)  # JSON object: reused / added / updated / removed
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    document = relationship("Document")
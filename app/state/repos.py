@@ -1,7 +1,13 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from typing import Optional
+
+import numpy as np
+
 from app.state import models
+from app.utils.vectors import pack_embedding, unpack_embedding
 
 
 def commit_session(db: Session):
@@ -29,17 +35,69 @@ def get_session(db: Session, session_id: int) -> Optional[models.Session]:
     return db.query(models.Session).filter(models.Session.id == session_id).first()
 
 
+# ------------------- Conversation memory -------------------
+def add_messages(db: Session, session_id: int, messages: list[dict]) -> None:
+    """Append ``{role, content, tokens}`` turns to a session with one commit."""
+    if messages:
+        db.execute(insert(models.Message), [{**message, "session_id": session_id} for message in messages])
+        commit_session(db)
+
+
+def get_session_memory(db: Session, session_id: int) -> Optional[dict]:
+    """
+    The session's cached summary plus every message not yet folded into it,
+    oldest first. Returns None if the session does not exist.
+    """
+    session = get_session(db, session_id)
+    if session is None:
+        return None
+    query = db.query(models.Message.id, models.Message.role, models.Message.content, models.Message.tokens).filter(
+        models.Message.session_id == session_id
+    )
+    if session.summarized_until is not None:
+        query = query.filter(models.Message.id > session.summarized_until)
+    return {
+        "summary": session.summary or "",
+        "summary_tokens": session.summary_tokens or 0,
+        "summarized_until": session.summarized_until,
+        "messages": [row._asdict() for row in query.order_by(models.Message.id).all()],
+    }
+
+
+def set_session_summary(
+    db: Session, session_id: int, summary: str, summary_tokens: int, summarized_until: int, expected_until: Optional[int]
+) -> bool:
+    """Store a new summary only if nobody else compacted the session meanwhile (``expected_until`` unchanged)."""
+    updated = db.execute(
+        update(models.Session)
+        .where(models.Session.id == session_id)
+        .where(
+            models.Session.summarized_until.is_(None)
+            if expected_until is None
+            else models.Session.summarized_until == expected_until
+        )
+        .values(summary=summary, summary_tokens=summary_tokens, summarized_until=summarized_until)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    commit_session(db)
+    return bool(updated)
+
+
 # ------------------- Document CRUD -------------------
 def create_document(
     db: Session, 
     session_id: int | None,  # allow None
     filename: str, 
-    blob_url: Optional[str] = None
+    blob_url: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    source_document_id: Optional[int] = None
 ) -> models.Document:
     doc = models.Document(
         session_id=session_id, 
         name=filename, 
-        blob_url=blob_url
+        blob_url=blob_url,
+        content_hash=content_hash,
+        source_document_id=source_document_id
     )
     db.add(doc)
     commit_session(db)
@@ -52,19 +110,362 @@ def get_document_by_id(db: Session, doc_id: int) -> Optional[models.Document]:
     return db.query(models.Document).filter(models.Document.id == doc_id).first()
 
 
+def resolve_index_document_ids(
+    db: Session, doc_id: Optional[int] = None, session_id: Optional[int] = None
+) -> Optional[list[int]]:
+    """
+    Ids under which the given document / session's chunks are indexed
+    (duplicates resolve to their source document). None means no filter;
+    a session that owns no documents gets an empty list, so it searches nothing.
+    """
+    if doc_id is None and session_id is None:
+        return None
+    query = db.query(models.Document.id, models.Document.source_document_id)
+    if doc_id is not None:
+        query = query.filter(models.Document.id == doc_id)
+    if session_id is not None:
+        query = query.filter(models.Document.session_id == session_id)
+    return sorted({source_id or own_id for own_id, source_id in query.all()})
+
+
+def get_document_by_hash(db: Session, content_hash: str) -> Optional[models.Document]:
+    """
+    Fetch the original (non-duplicate) document with the given content hash.
+    Returns Document instance or None if the content was never uploaded.
+    """
+    return (
+        db.query(models.Document)
+        .filter(models.Document.content_hash == content_hash, models.Document.source_document_id.is_(None))
+        .order_by(models.Document.id)
+        .first()
+    )
+
+
 # ------------------- Chunk CRUD -------------------
+def _embedding_columns(embedding, dtype: str) -> dict:
+    if embedding is None:
+        return {"embedding": None, "embedding_dim": None, "embedding_dtype": None}
+    blob, dim, dtype = pack_embedding(embedding, dtype)
+    return {"embedding": blob, "embedding_dim": dim, "embedding_dtype": dtype}
+
+
 def add_chunk(
     db: Session, 
     document_id: int, 
     text: str, 
-    embedding: Optional[str] = None
+    embedding=None,
+    embedding_dtype: str = "float32",
 ) -> models.Chunk:
     chunk = models.Chunk(
         document_id=document_id, 
         text=text, 
-        embedding=embedding
+        **_embedding_columns(embedding, embedding_dtype),
     )
     db.add(chunk)
     commit_session(db)
     db.refresh(chunk)
     return chunk
+
+
+def add_chunks(db: Session, document_id: int, chunks: list[dict]) -> int:
+    """
+    Bulk-insert chunk rows for a document with a single executemany and one commit.
+    Each dict may carry any Chunk column (text is required); an ``embedding``
+    given as a vector is stored as a float32 BLOB.
+    """
+    if not chunks:
+        return 0
+    rows = []
+    for chunk in chunks:
+        row = {**chunk, "document_id": document_id}
+        if row.get("embedding") is not None and not isinstance(row["embedding"], bytes):
+            row.update(_embedding_columns(row["embedding"], row.get("embedding_dtype") or "float32"))
+        rows.append(row)
+    db.execute(insert(models.Chunk), rows)
+    commit_session(db)
+    return len(chunks)
+
+
+def get_chunk_manifest(db: Session, document_id: int) -> list[models.Chunk]:
+    return (
+        db.query(models.Chunk)
+        .filter(models.Chunk.document_id == document_id, models.Chunk.chunk_key.isnot(None))
+        .all()
+    )
+
+
+def list_indexed_chunks(db: Session, document_ids: Optional[list[int]] = None) -> list[tuple[str, str, int]]:
+    """Every indexed chunk (or those of ``document_ids``) as ``(vector store id, text, document id)``."""
+    query = db.query(models.Chunk.document_id, models.Chunk.chunk_key, models.Chunk.text).filter(
+        models.Chunk.chunk_key.isnot(None)
+    )
+    if document_ids is not None:
+        query = query.filter(models.Chunk.document_id.in_(document_ids))
+    rows = query.order_by(models.Chunk.id).yield_per(5000)
+    return [(f"{document_id}_{chunk_key}", text, document_id) for document_id, chunk_key, text in rows]
+
+
+def list_documents_indexed_since(db: Session, version: int) -> list[int]:
+    """Documents whose chunk manifest changed after index version ``version``."""
+    rows = db.query(models.Document.id).filter(models.Document.index_version > version).order_by(models.Document.id)
+    return [document_id for (document_id,) in rows]
+
+
+def get_chunk_positions(db: Session, index_ids: list[str]) -> dict[str, tuple[int, int]]:
+    """Map vector store ids ("{document_id}_{chunk_key}") to (document id, position) where known."""
+    wanted = {}
+    for index_id in index_ids:
+        document_id, _, chunk_key = index_id.partition("_")
+        if document_id.isdigit() and chunk_key:
+            wanted[(int(document_id), chunk_key)] = index_id
+    if not wanted:
+        return {}
+    rows = (
+        db.query(models.Chunk.document_id, models.Chunk.chunk_key, models.Chunk.position)
+        .filter(
+            models.Chunk.document_id.in_({d for d, _ in wanted}),
+            models.Chunk.chunk_key.in_({k for _, k in wanted}),
+        )
+        .all()
+    )
+    return {
+        wanted[(document_id, chunk_key)]: (document_id, position)
+        for document_id, chunk_key, position in rows
+        if (document_id, chunk_key) in wanted and position is not None
+    }
+
+
+def get_index_version(db: Session) -> int:
+    """Shared index version: changes whenever any process commits a manifest change."""
+    version = db.query(models.IndexState.version).filter(models.IndexState.id == 1).scalar()
+    return version or 0
+
+
+def _bump_index_version(db: Session) -> int:
+    bumped = (
+        db.query(models.IndexState)
+        .filter(models.IndexState.id == 1)
+        .update({models.IndexState.version: models.IndexState.version + 1}, synchronize_session=False)
+    )
+    if not bumped:
+        db.add(models.IndexState(id=1, version=1))
+        return 1
+    return get_index_version(db)
+
+
+def apply_chunk_manifest(
+    db: Session,
+    document_id: int,
+    upserts: list[dict],
+    removed_keys: list[str],
+    positions: dict[str, int],
+    embeddings: Optional[list] = None,
+    embedding_dtype: str = "float32",
+) -> None:
+    """
+    Bring a document's manifest in line with what was just indexed, in one commit.
+    ``upserts`` are chunk dicts (chunk_id, content, content_hash, pages);
+    ``positions`` maps every current chunk key to its order in the document.
+    ``embeddings``, aligned with ``upserts``, are stored as ``embedding_dtype`` BLOBs.
+    The index version is bumped in the same commit (first, so the write lock is taken
+    before the manifest is read) and recorded on the document, so readers can
+    pick up just the documents changed since the version they last saw.
+    """
+    version = _bump_index_version(db)
+    db.execute(update(models.Document).where(models.Document.id == document_id).values(index_version=version))
+    existing = dict(
+        db.execute(
+            select(models.Chunk.chunk_key, models.Chunk.id).where(
+                models.Chunk.document_id == document_id, models.Chunk.chunk_key.isnot(None)
+            )
+        ).all()
+    )
+
+    if removed_keys:
+        db.execute(
+            delete(models.Chunk).where(
+                models.Chunk.document_id == document_id, models.Chunk.chunk_key.in_(removed_keys)
+            )
+        )
+
+    vectors = embeddings if embeddings is not None else [None] * len(upserts)
+
+    def fields(chunk: dict, embedding) -> dict:
+        row = {
+            "text": chunk["content"],
+            "content_hash": chunk["content_hash"],
+            "page_start": chunk.get("page_start"),
+            "page_end": chunk.get("page_end"),
+            "position": positions.get(chunk["chunk_id"]),
+        }
+        if embeddings is not None:
+            row.update(_embedding_columns(embedding, embedding_dtype))
+        return row
+
+    upserted = {chunk["chunk_id"] for chunk in upserts}
+    new_rows = [
+        {"document_id": document_id, "chunk_key": chunk["chunk_id"], **fields(chunk, embedding)}
+        for chunk, embedding in zip(upserts, vectors)
+        if chunk["chunk_id"] not in existing
+    ]
+    changed_rows = [
+        {"id": existing[chunk["chunk_id"]], **fields(chunk, embedding)}
+        for chunk, embedding in zip(upserts, vectors)
+        if chunk["chunk_id"] in existing
+    ]
+    # Unchanged chunks only need their position refreshed
+    moved_rows = [
+        {"id": row_id, "position": positions[key]}
+        for key, row_id in existing.items()
+        if key in positions and key not in upserted
+    ]
+
+    if new_rows:
+        db.execute(insert(models.Chunk), new_rows)
+    if changed_rows:
+        db.execute(update(models.Chunk), changed_rows)
+    if moved_rows:
+        db.execute(update(models.Chunk), moved_rows)
+    commit_session(db)
+
+
+def count_chunk_embeddings(db: Session) -> int:
+    """Indexed chunks that have a stored embedding."""
+    return (
+        db.query(func.count(models.Chunk.id))
+        .filter(models.Chunk.chunk_key.isnot(None), models.Chunk.embedding.isnot(None))
+        .scalar()
+    )
+
+
+def load_chunk_embeddings(db: Session, batch_size: int = 5000) -> tuple[list[dict], Optional[np.ndarray]]:
+    """
+    Every indexed chunk with a stored embedding, for rebuilding a vector index.
+
+    Returns ``(chunks_with_meta, matrix)``: vector store chunk dicts (doc_id,
+    chunk_id, content, pages) and a float32 ``(n, dim)`` matrix
+    filled row by row straight from the BLOBs. Rows whose dimension differs
+    from the first one are skipped.
+    """
+    total = count_chunk_embeddings(db)
+    rows = (
+        db.query(
+            models.Chunk.document_id,
+            models.Chunk.chunk_key,
+            models.Chunk.text,
+            models.Chunk.page_start,
+            models.Chunk.page_end,
+            models.Chunk.embedding,
+            models.Chunk.embedding_dim,
+            models.Chunk.embedding_dtype,
+        )
+        .filter(models.Chunk.chunk_key.isnot(None), models.Chunk.embedding.isnot(None))
+        .order_by(models.Chunk.id)
+        .yield_per(batch_size)
+    )
+
+    chunks: list[dict] = []
+    matrix: Optional[np.ndarray] = None
+    for document_id, chunk_key, text, page_start, page_end, blob, dim, dtype in rows:
+        if matrix is None:
+            matrix = np.empty((total, dim), dtype=np.float32)
+        if dim != matrix.shape[1] or len(chunks) == matrix.shape[0]:
+            continue
+        matrix[len(chunks)] = unpack_embedding(blob, dim, dtype or "float32")
+        chunks.append({
+            "doc_id": str(document_id),
+            "chunk_id": chunk_key,
+            "content": text,
+            "page_start": page_start,
+            "page_end": page_end,
+        })
+    return chunks, (matrix[:len(chunks)] if matrix is not None else None)
+
+
+# ------------------- Ingest job queue -------------------
+def create_ingest_job(db: Session, document_id: int) -> models.IngestJob:
+    job = models.IngestJob(document_id=document_id, status="queued")
+    db.add(job)
+    commit_session(db)
+    db.refresh(job)
+    return job
+
+
+def get_ingest_job(db: Session, job_id: int) -> Optional[models.IngestJob]:
+    return db.query(models.IngestJob).filter(models.IngestJob.id == job_id).first()
+
+
+def get_latest_ingest_job(db: Session, document_id: int, status: Optional[str] = None) -> Optional[models.IngestJob]:
+    query = db.query(models.IngestJob).filter(models.IngestJob.document_id == document_id)
+    if status is not None:
+        query = query.filter(models.IngestJob.status == status)
+    return query.order_by(models.IngestJob.id.desc()).first()
+
+
+def claim_next_ingest_job(db: Session) -> Optional[models.IngestJob]:
+    """
+    Atomically move the oldest queued job to ``running`` and return it.
+    The conditional UPDATE makes the claim safe across worker processes.
+    """
+    candidates = (
+        db.query(models.IngestJob.id)
+        .filter(models.IngestJob.status == "queued")
+        .order_by(models.IngestJob.id)
+        .limit(5)
+        .all()
+    )
+    for (job_id,) in candidates:
+        claimed = (
+            db.query(models.IngestJob)
+            .filter(models.IngestJob.id == job_id, models.IngestJob.status == "queued")
+            .update(
+                {
+                    models.IngestJob.status: "running",
+                    models.IngestJob.stage: None,
+                    models.IngestJob.error: None,
+                    models.IngestJob.started_at: func.now(),
+                    models.IngestJob.updated_at: func.now(),
+                    models.IngestJob.attempts: models.IngestJob.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        commit_session(db)
+        if claimed:
+            return get_ingest_job(db, job_id)
+    return None
+
+
+def update_ingest_job(db: Session, job_id: int, **fields) -> None:
+    db.query(models.IngestJob).filter(models.IngestJob.id == job_id).update(
+        {**fields, "updated_at": func.now()}, synchronize_session=False
+    )
+    commit_session(db)
+
+
+def touch_ingest_jobs(db: Session, job_ids: list[int]) -> int:
+    """Heartbeat: mark the given ``running`` jobs as still owned by a live worker."""
+    if not job_ids:
+        return 0
+    count = (
+        db.query(models.IngestJob)
+        .filter(models.IngestJob.id.in_(job_ids), models.IngestJob.status == "running")
+        .update({models.IngestJob.updated_at: func.now()}, synchronize_session=False)
+    )
+    commit_session(db)
+    return count
+
+
+def requeue_stale_ingest_jobs(db: Session, stale_after_seconds: float) -> int:
+    """
+    Return ``running`` jobs whose worker has stopped heartbeating to the queue,
+    e.g. because the process that owned them crashed or was restarted.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    count = (
+        db.query(models.IngestJob)
+        .filter(models.IngestJob.status == "running", models.IngestJob.updated_at < cutoff)
+        .update({models.IngestJob.status: "queued"}, synchronize_session=False)
+    )
+    commit_session(db)
+    return count
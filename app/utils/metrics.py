@@ -0,0 +1,153 @@
+# app/utils/metrics.py
+import functools
+import inspect
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# -------------------- Metrics --------------------
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of a pipeline stage (chat: embed/search/pack/llm, ingest: download/extract/chunk/embed/index)",
+    ["pipeline", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+HTTP_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "End-to-end HTTP request latency, body included",
+    ["method", "route", "status"],
+)
+PAYLOAD_TOKENS = Histogram(
+    "rag_payload_tokens",
+    "Token counts per request (query, context, history, answer)",
+    ["kind"],
+    buckets=(16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+PAYLOAD_CHUNKS = Histogram(
+    "rag_payload_chunks",
+    "Chunk counts per request or document (retrieved, packed, document, embedded)",
+    ["kind"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 5000),
+)
+PAYLOAD_BYTES = Histogram(
+    "rag_payload_bytes",
+    "Bytes moved per blob transfer",
+    ["kind"],
+    buckets=tuple(1024 * 4 ** i for i in range(11)),  # 1 KiB .. 1 GiB
+)
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests_total",
+    "Cache lookups by cache and result (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+)
+UPSTREAM_ERRORS = Counter("rag_upstream_errors_total", "Failed calls to Azure services", ["service"])
+UPSTREAM_RETRIES = Counter("rag_upstream_retries_total", "Retried calls to Azure services", ["service"])
+
+# Per-request stage durations for the Server-Timing header (stage -> seconds)
+_server_timing: ContextVar[Optional[dict]] = ContextVar("server_timing", default=None)
+
+
+# -------------------- Recording helpers --------------------
+def observe_stages(pipeline: str, timings: dict):
+    """Record ``{stage: seconds}`` in the stage histogram and the current response's Server-Timing."""
+    current = _server_timing.get()
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.labels(pipeline, stage).observe(seconds)
+        if current is not None:
+            current[stage] = current.get(stage, 0.0) + seconds
+
+
+def observe_payload(metric: Histogram, **sizes):
+    for kind, size in sizes.items():
+        metric.labels(kind).observe(size)
+
+
+def count_cache(cache: str, hits: int = 0, misses: int = 0):
+    if hits:
+        CACHE_REQUESTS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, "miss").inc(misses)
+
+
+def count_errors(service: str):
+    """Decorator: count exceptions escaping a (sync or async) upstream call, then re-raise."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    UPSTREAM_ERRORS.labels(service).inc()
+                    raise
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                UPSTREAM_ERRORS.labels(service).inc()
+                raise
+        return wrapper
+    return decorate
+
+
+def render() -> tuple[bytes, str]:
+    """Prometheus text exposition; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# -------------------- Middleware --------------------
+class MetricsMiddleware:
+    """
+    Times every HTTP request and adds a ``Server-Timing`` header listing the
+    stages observed before the response started (``app`` is the total so far).
+    Streaming responses therefore only carry the stages run before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stages: dict = {}
+        token = _server_timing.set(stages)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages.items()]
+                entries.append(f"app;dur={(time.perf_counter() - started) * 1000:.1f}")
+                message["headers"] = [*message.get("headers", []), (b"server-timing", ", ".join(entries).encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _server_timing.reset(token)
+            route = scope.get("route")
+            HTTP_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
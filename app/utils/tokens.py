@@ -0,0 +1,42 @@
+import logging
+from functools import lru_cache
+from importlib.util import find_spec
+
+# tiktoken itself is imported on first use: the import is slow and most start-ups don't need it yet
+TIKTOKEN_AVAILABLE = find_spec("tiktoken") is not None
+if not TIKTOKEN_AVAILABLE:
+    logging.warning("tiktoken not installed, token counts will be estimated from characters.")
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(model: str = ""):
+    """Return a cached tiktoken encoding for ``model`` (cl100k_base fallback), or None."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    tokenizer = get_tokenizer(model)
+    if tokenizer is None:
+        return len(text) // 4 + 1
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "") -> str:
+    """Longest prefix of ``text`` that fits in ``max_tokens`` tokens."""
+    if max_tokens <= 0:
+        return ""
+    tokenizer = get_tokenizer(model)
+    if tokenizer is None:
+        return text[:max_tokens * 4]
+    tokens = tokenizer.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    _, offsets = tokenizer.decode_with_offsets(tokens[:max_tokens + 1])
+    return text[:offsets[max_tokens]]
@@ -0,0 +1,22 @@
+import numpy as np
+
+# Storage dtypes for embedding BLOBs; vectors are computed and searched in float32
+EMBEDDING_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def pack_embedding(vector, dtype: str = "float32") -> tuple[bytes, int, str]:
+    """Encode a 1-D vector as raw little-endian bytes; returns (blob, dim, dtype)."""
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype {dtype!r}; expected one of {sorted(EMBEDDING_DTYPES)}")
+    vec = np.asarray(vector, dtype=np.dtype(EMBEDDING_DTYPES[dtype]).newbyteorder("<"))
+    if vec.ndim != 1:
+        raise ValueError("Embedding must be a 1-D vector")
+    return vec.tobytes(), int(vec.shape[0]), dtype
+
+
+def unpack_embedding(blob: bytes, dim: int, dtype: str = "float32") -> np.ndarray:
+    """Zero-copy, read-only view over a stored embedding BLOB."""
+    vec = np.frombuffer(blob, dtype=np.dtype(EMBEDDING_DTYPES[dtype]).newbyteorder("<"))
+    if vec.shape[0] != dim:
+        raise ValueError(f"Embedding BLOB holds {vec.shape[0]} values, expected {dim}")
+    return vec
@@ -0,0 +1,249 @@
+# benchmarks/bench_e2e.py
+"""
+End-to-end benchmark: upload → process → chat through the real FastAPI
+routes, with Blob Storage, Azure OpenAI and Azure AI Search replaced by the
+in-process fakes in ``benchmarks.fakes``.
+
+    python -m benchmarks.bench_e2e --docs 20 --pages 10 --queries 200 --concurrency 16 \\
+        --embed-latency-ms 40 --chat-latency-ms 300 --embed-rate-limit 50 --failure-rate 0.01
+
+Reports ingest docs/s and chunks/s, chat p50/p95/p99, per-stage means from
+the Prometheus metrics, fake call / fault counts and peak RSS. ``--json PATH``
+also writes the numbers for comparison against a previous run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=8, help="pages per document")
+    parser.add_argument("--formats", default="txt,pdf,docx", help="comma-separated: txt, pdf, docx")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent uploads / chat requests")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream instead of /chat")
+    parser.add_argument("--ingest-workers", type=int, default=2)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--blob-latency-ms", type=float, default=5)
+    parser.add_argument("--blob-bandwidth-mb-s", type=float, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=30)
+    parser.add_argument("--embed-rate-limit", type=float, default=0, help="embedding calls/s, 0 = unlimited")
+    parser.add_argument("--search-latency-ms", type=float, default=15)
+    parser.add_argument("--chat-latency-ms", type=float, default=200, help="time to first token")
+    parser.add_argument("--chat-token-latency-ms", type=float, default=0)
+    parser.add_argument("--chat-rate-limit", type=float, default=0, help="chat calls/s, 0 = unlimited")
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="injected 503 rate for every fake")
+    parser.add_argument("--offline-tokens", action="store_true", help="estimate tokens instead of using tiktoken")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir: Path, args: argparse.Namespace):
+    """Settings are read at import time, so the app must only be imported after this."""
+    defaults = {
+        "AZURE_STORAGE_ACCOUNT_NAME": "bench",
+        "AZURE_STORAGE_ACCOUNT_KEY": "YmVuY2g=",
+        "AZURE_STORAGE_CONTAINER_NAME": "bench",
+        "AZURE_OPENAI_ENDPOINT": "https://bench.openai.azure.com",
+        "AZURE_OPENAI_API_KEY": "bench",
+        "AZURE_OPENAI_EMBED_MODEL": "text-embedding-3-small",
+        "AZURE_OPENAI_CHAT_MODEL": "gpt-4",
+        "AZURE_SEARCH_ENDPOINT": "https://bench.search.windows.net",
+        "AZURE_SEARCH_API_KEY": "bench",
+        "AZURE_SEARCH_INDEX_NAME": "documents",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(
+        SQLITE_PATH=f"sqlite:///{workdir / 'bench.sqlite3'}",
+        VECTOR_STORE_BACKEND="azure",
+        EMBEDDING_CACHE_PATH="",
+        ANSWER_CACHE_ENABLED="false",
+        INGEST_WORKERS=str(args.ingest_workers),
+        INGEST_POLL_INTERVAL="0.05",
+    )
+
+
+def build_fakes(args: argparse.Namespace):
+    from app.services.clients import registry
+    from benchmarks.fakes import FaultProfile, estimate_tokens_offline, install_fakes
+
+    if args.offline_tokens:
+        estimate_tokens_offline()
+    jitter, failures = args.jitter_ms, args.failure_rate
+    return install_fakes(
+        registry,
+        blob=FaultProfile(args.blob_latency_ms, jitter, 0, failures, args.blob_bandwidth_mb_s),
+        embeddings=FaultProfile(args.embed_latency_ms, jitter, args.embed_rate_limit, failures),
+        chat=FaultProfile(args.chat_latency_ms, jitter, args.chat_rate_limit, failures),
+        search=FaultProfile(args.search_latency_ms, jitter, 0, failures),
+        embedding_dim=args.embedding_dim,
+        token_latency_ms=args.chat_token_latency_ms,
+    )
+
+
+def make_documents(workdir: Path, args: argparse.Namespace) -> list[Path]:
+    from benchmarks.synthetic import WRITERS
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    docs_dir = workdir / "docs"
+    docs_dir.mkdir()
+    return [
+        WRITERS[formats[i % len(formats)]](docs_dir / f"doc_{i:04d}.{formats[i % len(formats)]}", args.pages, seed=i)
+        for i in range(args.docs)
+    ]
+
+
+async def run(args: argparse.Namespace, fakes, documents: list[Path]) -> dict:
+    import httpx
+
+    from app.main import app, lifespan
+    from app.utils import metrics
+    from benchmarks.synthetic import paragraphs, peak_rss_mb, percentile
+
+    results: dict = {"config": vars(args)}
+    slots = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with lifespan(app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # -------------------- Upload --------------------
+        async def upload(path: Path):
+            async with slots:
+                response = await client.post("/upload/", files={"file": (path.name, path.read_bytes())})
+            return response.json()["documentId"] if response.status_code == 200 else None
+
+        started = time.perf_counter()
+        uploaded = await asyncio.gather(*(upload(path) for path in documents))
+        upload_seconds = time.perf_counter() - started
+        doc_ids = [doc_id for doc_id in uploaded if doc_id is not None]
+        total_bytes = sum(path.stat().st_size for path in documents)
+        results["upload"] = {
+            "docs": len(doc_ids),
+            "failed": len(documents) - len(doc_ids),
+            "seconds": upload_seconds,
+            "mb_per_s": total_bytes / (1024 * 1024) / upload_seconds if upload_seconds else 0.0,
+        }
+
+        # -------------------- Process --------------------
+        started = time.perf_counter()
+        jobs = []
+        for doc_id in doc_ids:
+            response = await client.post(f"/process/{doc_id}")
+            response.raise_for_status()
+            jobs.append(response.json()["job_id"])
+
+        finished: dict = {}
+        while len(finished) < len(jobs):
+            await asyncio.sleep(0.05)
+            for job_id in jobs:
+                if job_id in finished:
+                    continue
+                job = (await client.get(f"/process/jobs/{job_id}")).json()
+                if job["status"] in ("succeeded", "failed"):
+                    finished[job_id] = job
+        ingest_seconds = time.perf_counter() - started
+        succeeded = [job for job in finished.values() if job["status"] == "succeeded"]
+        chunks = sum(job["progress"]["chunksTotal"] for job in succeeded)
+        results["ingest"] = {
+            "docs": len(jobs),
+            "failed": len(jobs) - len(succeeded),
+            "chunks": chunks,
+            "seconds": ingest_seconds,
+            "docs_per_s": len(succeeded) / ingest_seconds if ingest_seconds else 0.0,
+            "chunks_per_s": chunks / ingest_seconds if ingest_seconds else 0.0,
+        }
+
+        # -------------------- Chat --------------------
+        rng = random.Random(7)
+        questions = [
+            " ".join(rng.sample(paragraph.split(), k=min(8, len(paragraph.split())))) + "?"
+            for paragraph in paragraphs(args.queries, seed=99)
+        ]
+        latencies: list[float] = []
+        errors = 0
+
+        async def ask(question: str):
+            nonlocal errors
+            async with slots:
+                started = time.perf_counter()
+                if args.stream:
+                    response = await client.post("/chat/stream", json={"query": question})
+                    ok = response.status_code == 200 and "event: done" in response.text
+                else:
+                    response = await client.post("/chat/", json={"query": question})
+                    ok = response.status_code == 200
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(ask(question) for question in questions))
+        chat_seconds = time.perf_counter() - started
+        results["chat"] = {
+            "queries": len(questions),
+            "errors": errors,
+            "qps": len(questions) / chat_seconds if chat_seconds else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+
+    # Stage means as recorded by the app's own instrumentation
+    stages = {}
+    for family in metrics.STAGE_SECONDS.collect():
+        sums = {tuple(s.labels.values()): s.value for s in family.samples if s.name.endswith("_sum")}
+        counts = {tuple(s.labels.values()): s.value for s in family.samples if s.name.endswith("_count")}
+        for labels, count in counts.items():
+            if count:
+                stages["/".join(labels)] = {"count": int(count), "mean_ms": sums[labels] / count * 1000}
+    results["stages"] = stages
+    results["fakes"] = fakes.stats()
+    results["peak_rss_mb"] = {"app": peak_rss_mb(), "extract_workers": peak_rss_mb(children=True)}
+    return results
+
+
+def report(results: dict):
+    from benchmarks.synthetic import print_table
+
+    upload, ingest, chat = results["upload"], results["ingest"], results["chat"]
+    print_table("Throughput", [
+        ("metric", "value"),
+        ("upload MB/s", f"{upload['mb_per_s']:.2f}  ({upload['docs']} docs, {upload['failed']} failed)"),
+        ("ingest docs/s", f"{ingest['docs_per_s']:.2f}  ({ingest['docs']} docs, {ingest['failed']} failed)"),
+        ("ingest chunks/s", f"{ingest['chunks_per_s']:.1f}  ({ingest['chunks']} chunks)"),
+        ("chat qps", f"{chat['qps']:.1f}  ({chat['queries']} queries, {chat['errors']} errors)"),
+        ("chat p50 / p95 / p99 ms", f"{chat['p50_ms']:.0f} / {chat['p95_ms']:.0f} / {chat['p99_ms']:.0f}"),
+        ("peak RSS MiB (app / workers)", f"{results['peak_rss_mb']['app']:.0f} / {results['peak_rss_mb']['extract_workers']:.0f}"),
+    ])
+    print_table("Stages", [("pipeline/stage", "count", "mean ms")] + [
+        (name, stage["count"], f"{stage['mean_ms']:.1f}") for name, stage in sorted(results["stages"].items())
+    ])
+    print_table("Fakes", [("service", "calls", "failures", "rate limited")] + [
+        (name, s["calls"], s["failures"], s["rate_limited"]) for name, s in results["fakes"].items()
+    ])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, args)
+        fakes = build_fakes(args)
+        documents = make_documents(workdir, args)
+        results = asyncio.run(run(args, fakes, documents))
+    report(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,138 @@
+# benchmarks/bench_micro.py
+"""
+Micro-benchmarks for the CPU-bound ingestion steps: ``Chunker.chunk_text`` on
+synthetic text and ``Extractor`` on synthetic PDF (serial and process pool),
+DOCX and plain-text files. No Azure service is touched.
+
+    python -m benchmarks.bench_micro --text-mb 8 --pdf-pages 200 --repeat 3
+
+Each case reports the best of ``--repeat`` runs.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--text-mb", type=float, default=4, help="size of the text fed to the chunker")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--pdf-pages", type=int, default=120)
+    parser.add_argument("--docx-pages", type=int, default=60)
+    parser.add_argument("--txt-pages", type=int, default=200)
+    parser.add_argument("--extract-workers", type=int, default=0, help="pool size for the parallel PDF case, 0 = one per CPU")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--offline-tokens", action="store_true", help="estimate tokens instead of using tiktoken")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def best_of(repeat: int, fn) -> tuple[float, object]:
+    """Run ``fn`` ``repeat`` times; return the fastest wall time and the last result."""
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+# -------------------- Chunking --------------------
+def bench_chunker(args: argparse.Namespace) -> dict:
+    from app.services.chunker import Chunker
+    from benchmarks.synthetic import text_of_size
+
+    text = text_of_size(int(args.text_mb * 1024 * 1024))
+    megabytes = len(text.encode("utf-8")) / (1024 * 1024)
+    results = {}
+    for boundary in (None, "sentence", "paragraph"):
+        chunker = Chunker(chunk_size=args.chunk_size, overlap=args.overlap, boundary=boundary)
+        seconds, chunks = best_of(args.repeat, lambda: chunker.chunk_text(text))
+        results[boundary or "none"] = {
+            "mb": megabytes,
+            "chunks": len(chunks),
+            "seconds": seconds,
+            "mb_per_s": megabytes / seconds,
+            "chunks_per_s": len(chunks) / seconds,
+        }
+    return results
+
+
+# -------------------- Extraction --------------------
+def bench_extractor(args: argparse.Namespace, workdir: Path) -> dict:
+    from app.services.extractor import Extractor
+    from benchmarks.synthetic import write_docx, write_pdf, write_txt
+
+    pdf = write_pdf(workdir / "bench.pdf", args.pdf_pages)
+    docx = write_docx(workdir / "bench.docx", args.docx_pages)
+    txt = write_txt(workdir / "bench.txt", args.txt_pages)
+
+    serial = Extractor(max_workers=1)
+    parallel = Extractor(max_workers=args.extract_workers or None)
+    parallel.parallel_min_pages = 1
+    cases = [
+        ("pdf serial", serial, pdf, args.pdf_pages),
+        ("pdf parallel", parallel, pdf, args.pdf_pages),
+        ("docx", serial, docx, args.docx_pages),
+        ("txt", serial, txt, args.txt_pages),
+    ]
+    results = {}
+    try:
+        # Start the pool outside the timed runs; spawn start-up is a one-off cost
+        parallel.pool.submit(len, "").result()
+        for name, extractor, path, pages in cases:
+            seconds, page_texts = best_of(args.repeat, lambda: list(extractor.iter_pages(str(path))))
+            results[name] = {
+                "pages": pages,
+                "chars": sum(len(page.text) for page in page_texts),
+                "seconds": seconds,
+                "pages_per_s": pages / seconds,
+                "workers": extractor.max_workers,
+            }
+    finally:
+        serial.close()
+        parallel.close()
+    return results
+
+
+def report(results: dict):
+    from benchmarks.synthetic import print_table
+
+    print_table("Chunker.chunk_text", [("boundary", "MB", "chunks", "MB/s", "chunks/s")] + [
+        (name, f"{r['mb']:.1f}", r["chunks"], f"{r['mb_per_s']:.2f}", f"{r['chunks_per_s']:.0f}")
+        for name, r in results["chunker"].items()
+    ])
+    print_table("Extractor.iter_pages", [("case", "pages", "workers", "seconds", "pages/s")] + [
+        (name, r["pages"], r["workers"], f"{r['seconds']:.3f}", f"{r['pages_per_s']:.1f}")
+        for name, r in results["extractor"].items()
+    ])
+
+
+def main(argv=None):
+    from benchmarks.bench_e2e import configure_environment
+
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, argparse.Namespace(ingest_workers=0))
+        if args.offline_tokens:
+            from benchmarks.fakes import estimate_tokens_offline
+
+            estimate_tokens_offline()
+        results = {
+            "config": vars(args),
+            "chunker": bench_chunker(args),
+            "extractor": bench_extractor(args, workdir),
+        }
+    report(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,120 @@
+# benchmarks/bench_quant.py
+"""
+Quantized local index benchmark: builds the same synthetic clustered corpus
+with LOCAL_VECTOR_QUANTIZATION none / int8 / pq and reports bytes per vector,
+build + codebook training time, query latency and recall@k against exact search.
+
+    python -m benchmarks.bench_quant --rows 200000 --dim 1536 --rerank-factor 10
+
+The float32 vectors stay on disk (memory-mapped); only the codes are scanned,
+so "scanned MiB" is the per-query working set before the rerank reads.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=500, help="topics the synthetic vectors are drawn around")
+    parser.add_argument("--noise", type=float, default=0.6, help="spread around each topic centre")
+    parser.add_argument("--kinds", default="none,int8,pq", help="comma-separated: none, int8, pq")
+    parser.add_argument("--pq-subspaces", type=int, default=0, help="0 = dim / 8")
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def make_corpus(args: argparse.Namespace):
+    import numpy as np
+
+    rng = np.random.default_rng(args.seed)
+    centres = rng.normal(size=(args.clusters, args.dim)).astype(np.float32)
+    def draw(count: int):
+        topics = rng.integers(0, args.clusters, count)
+        return centres[topics] + args.noise * rng.normal(size=(count, args.dim)).astype(np.float32)
+    # Queries are fresh draws from the same topics, not stored rows
+    return draw(args.rows), draw(args.queries)
+
+
+def bench_kind(kind: str, matrix, queries, args: argparse.Namespace, workdir: Path) -> dict:
+    from app.services.vector_store.local_vector_store import LocalVectorStore
+    from benchmarks.synthetic import percentile
+
+    store = LocalVectorStore(
+        str(workdir),
+        index_name=kind,
+        quantization=kind,
+        pq_subspaces=args.pq_subspaces,
+        rerank_factor=args.rerank_factor,
+        quantize_min_rows=1,
+    )
+    chunks = [{"doc_id": str(i // 100), "chunk_id": str(i), "content": ""} for i in range(matrix.shape[0])]
+    started = time.perf_counter()
+    store.rebuild(chunks, matrix)
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        store.search_hits(query.tolist(), k=args.k)
+        latencies.append(time.perf_counter() - started)
+
+    vector_bytes = matrix.shape[0] * matrix.shape[1] * 4
+    result = {
+        "build_seconds": build_seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "bytes_per_vector": args.dim * 4,
+        "scanned_mb": vector_bytes / (1024 * 1024),
+        "recall": 1.0,
+        "recall_codes_only": 1.0,
+    }
+    if kind != "none":
+        recall = store.measure_recall(queries, k=args.k)
+        result.update(
+            bytes_per_vector=recall["code_bytes"] // matrix.shape[0],
+            scanned_mb=recall["code_bytes"] / (1024 * 1024),
+            recall=recall["recall"],
+            recall_codes_only=recall["recall_codes_only"],
+        )
+    return result
+
+
+def report(results: dict):
+    from benchmarks.synthetic import print_table
+
+    config = results["config"]
+    print_table(
+        f"Local index, {config['rows']} x {config['dim']}, recall@{config['k']} (rerank x{config['rerank_factor']})",
+        [("quantization", "bytes/vector", "scanned MiB", "build s", "p50 ms", "p95 ms", "recall", "codes only")] + [
+            (kind, r["bytes_per_vector"], f"{r['scanned_mb']:.1f}", f"{r['build_seconds']:.1f}",
+             f"{r['p50_ms']:.2f}", f"{r['p95_ms']:.2f}", f"{r['recall']:.3f}", f"{r['recall_codes_only']:.3f}")
+            for kind, r in results["kinds"].items()
+        ],
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    matrix, queries = make_corpus(args)
+    results = {"config": vars(args), "kinds": {}}
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        for kind in [k.strip() for k in args.kinds.split(",") if k.strip()]:
+            results["kinds"][kind] = bench_kind(kind, matrix, queries, args, Path(tmp))
+    report(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,484 @@
+# benchmarks/fakes.py
+"""
+In-process stand-ins for Blob Storage, Azure OpenAI (embeddings + chat) and
+Azure AI Search, for running the real routes offline.
+
+Each fake is driven by a ``FaultProfile`` (latency, jitter, rate limit,
+injected failures). ``install_fakes(registry)`` plugs them into the shared
+``ClientRegistry`` so every service picks them up; it must run before the
+app routers are imported (the vector store touches its index on import).
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+
+# -------------------- Fault injection --------------------
+class FakeServiceError(RuntimeError):
+    """Injected upstream failure (HTTP 503)."""
+
+    def __init__(self, service: str, status: int = 503, retry_after: Optional[float] = None):
+        super().__init__(f"{service}: injected HTTP {status}")
+        headers = {"retry-after-ms": str(int(retry_after * 1000))} if retry_after is not None else {}
+        self.status_code = status
+        self.response = SimpleNamespace(status_code=status, headers=headers)
+
+
+@dataclass
+class FaultProfile:
+    latency_ms: float = 0.0  # per call (time to first token for chat)
+    jitter_ms: float = 0.0  # uniform extra latency
+    rate_limit_per_s: float = 0.0  # token bucket, 0 = unlimited; over the limit raises HTTP 429
+    failure_rate: float = 0.0  # probability of an injected HTTP 503
+    bandwidth_mb_s: float = 0.0  # blob transfers only, 0 = unlimited
+    seed: int = 0
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+
+
+class FaultInjector:
+    """Applies a FaultProfile to each call of one fake service and counts the outcomes."""
+
+    def __init__(self, service: str, profile: FaultProfile):
+        self.service = service
+        self.profile = profile
+        self.stats = CallStats()
+        self._rng = random.Random(profile.seed or zlib.crc32(service.encode()))
+        self._lock = threading.Lock()
+        self._tokens = max(profile.rate_limit_per_s, 1.0)
+        self._refilled = time.monotonic()
+
+    def _admit(self) -> float:
+        """Return the latency to apply, or raise the injected error."""
+        profile = self.profile
+        with self._lock:
+            self.stats.calls += 1
+            if profile.rate_limit_per_s > 0:
+                now = time.monotonic()
+                capacity = max(profile.rate_limit_per_s, 1.0)
+                self._tokens = min(capacity, self._tokens + (now - self._refilled) * profile.rate_limit_per_s)
+                self._refilled = now
+                if self._tokens < 1.0:
+                    self.stats.rate_limited += 1
+                    wait = (1.0 - self._tokens) / profile.rate_limit_per_s
+                    raise FakeServiceError(self.service, status=429, retry_after=wait)
+                self._tokens -= 1.0
+            if profile.failure_rate and self._rng.random() < profile.failure_rate:
+                self.stats.failures += 1
+                raise FakeServiceError(self.service)
+            return (profile.latency_ms + self._rng.uniform(0, profile.jitter_ms)) / 1000.0
+
+    def transfer_seconds(self, nbytes: int) -> float:
+        if not self.profile.bandwidth_mb_s:
+            return 0.0
+        return nbytes / (self.profile.bandwidth_mb_s * 1024 * 1024)
+
+    async def acall(self, nbytes: int = 0):
+        await asyncio.sleep(self._admit() + self.transfer_seconds(nbytes))
+
+    def call(self, nbytes: int = 0):
+        time.sleep(self._admit() + self.transfer_seconds(nbytes))
+
+
+# -------------------- Blob Storage --------------------
+class _FakeDownloader:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    async def readinto(self, stream) -> int:
+        stream.write(self._data)
+        return len(self._data)
+
+    async def readall(self) -> bytes:
+        return self._data
+
+
+class _FakeBlobClient:
+    def __init__(self, service: "FakeBlobService", name: str):
+        self._service = service
+        self._name = name
+
+    async def stage_block(self, block_id: str, data: bytes, length: Optional[int] = None, **kwargs):
+        await self._service.faults.acall(len(data))
+        self._service.staged.setdefault(self._name, {})[block_id] = bytes(data)
+
+    def _check(self, etag: Optional[str], match_condition):
+        from azure.core import MatchConditions
+
+        current = self._service.etags.get(self._name)
+        if (match_condition == MatchConditions.IfMissing and current is not None) or (
+            match_condition == MatchConditions.IfNotModified and current != etag
+        ):
+            raise FakeServiceError("blob", status=412)
+
+    async def commit_block_list(self, block_list: list, etag: Optional[str] = None, match_condition=None, **kwargs):
+        # Like Azure: uncommitted blocks are per blob name and discarded by any commit
+        await self._service.faults.acall()
+        self._check(etag, match_condition)
+        blocks = self._service.staged.pop(self._name, {})
+        self._service.blobs[self._name] = b"".join(blocks[block_id] for block_id in block_list)
+        self._service.etags[self._name] = etag = f"0x{random.getrandbits(64):016X}"
+        return {"etag": etag}
+
+    async def delete_blob(self, etag: Optional[str] = None, match_condition=None, **kwargs):
+        await self._service.faults.acall()
+        self._check(etag, match_condition)
+        del self._service.blobs[self._name]
+        del self._service.etags[self._name]
+
+
+class FakeBlobService:
+    """Async BlobServiceClient / ContainerClient in one: blobs live in a dict."""
+
+    def __init__(self, profile: FaultProfile):
+        self.faults = FaultInjector("blob", profile)
+        self.blobs: dict[str, bytes] = {}
+        self.staged: dict[str, dict[str, bytes]] = {}  # blob name -> uncommitted blocks
+        self.etags: dict[str, str] = {}
+
+    def get_container_client(self, container: str) -> "FakeBlobService":
+        return self
+
+    def get_blob_client(self, blob: str) -> _FakeBlobClient:
+        return _FakeBlobClient(self, blob)
+
+    async def upload_blob(self, name: str, data, overwrite: bool = False, **kwargs):
+        payload = data.read() if hasattr(data, "read") else bytes(data)
+        await self.faults.acall(len(payload))
+        self.blobs[name] = payload
+        self.etags[name] = f"0x{random.getrandbits(64):016X}"
+
+    async def download_blob(self, blob: str, **kwargs) -> _FakeDownloader:
+        data = self.blobs[blob]
+        await self.faults.acall(len(data))
+        return _FakeDownloader(data)
+
+    async def close(self):
+        pass
+
+
+# -------------------- Azure OpenAI --------------------
+class FakeEmbeddings:
+    """
+    ``client.embeddings.create`` with deterministic bag-of-words vectors:
+    texts sharing words get similar vectors, so retrieval behaves plausibly.
+    """
+
+    _WORD_RE = re.compile(r"\w+")
+
+    def __init__(self, profile: FaultProfile, dim: int = 256):
+        self.faults = FaultInjector("openai_embeddings", profile)
+        self.dim = dim
+        self._word_vectors: dict[str, np.ndarray] = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            vector = np.random.default_rng(zlib.crc32(word.encode())).standard_normal(self.dim).astype(np.float32)
+            self._word_vectors[word] = vector
+        return vector
+
+    def vector(self, text: str) -> list[float]:
+        total = np.zeros(self.dim, dtype=np.float32)
+        for word in self._WORD_RE.findall(text.lower()):
+            total += self._word(word)
+        norm = float(np.linalg.norm(total))
+        return (total / norm if norm else total).tolist()
+
+    def _response(self, texts) -> SimpleNamespace:
+        texts = [texts] if isinstance(texts, str) else texts
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=self.vector(t)) for i, t in enumerate(texts)])
+
+    def create(self, model: str, input, **kwargs):
+        self.faults.call()
+        return self._response(input)
+
+
+class _AsyncFakeEmbeddings:
+    def __init__(self, embeddings: FakeEmbeddings):
+        self._embeddings = embeddings
+
+    async def create(self, model: str, input, **kwargs):
+        await self._embeddings.faults.acall()
+        return self._embeddings._response(input)
+
+
+class FakeChatModel:
+    """LangChain chat model surface used by AzureChatLLM: invoke / ainvoke / astream."""
+
+    def __init__(self, faults: FaultInjector, answer_tokens: int, token_latency_ms: float, max_tokens: int):
+        self.faults = faults
+        self.answer_tokens = min(answer_tokens, max_tokens)
+        self.token_latency = token_latency_ms / 1000.0
+
+    def _tokens(self, messages) -> list[str]:
+        words = re.findall(r"\w+", str(messages[-1].content))[-200:] or ["ok"]
+        return [f"{words[i % len(words)]} " for i in range(self.answer_tokens)]
+
+    def invoke(self, messages):
+        self.faults.call()
+        tokens = self._tokens(messages)
+        time.sleep(self.token_latency * len(tokens))
+        return SimpleNamespace(content="".join(tokens).strip())
+
+    async def ainvoke(self, messages):
+        await self.faults.acall()
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.token_latency * len(tokens))
+        return SimpleNamespace(content="".join(tokens).strip())
+
+    async def astream(self, messages):
+        await self.faults.acall()
+        for token in self._tokens(messages):
+            await asyncio.sleep(self.token_latency)
+            yield SimpleNamespace(content=token, usage_metadata=None)
+
+
+# -------------------- Azure AI Search --------------------
+class _ResourceNotFound(Exception):
+    pass
+
+
+class _AsyncResults:
+    def __init__(self, results: list):
+        self._results = results
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for result in self._results:
+            yield result
+
+
+class FakeSearchIndex:
+    """
+    One search index: exact cosine vector search, simple term-overlap full-text
+    search, and the OData filters the app emits (``search.in`` and ``eq``).
+    """
+
+    _IN_RE = re.compile(r"search\.in\((\w+),\s*'((?:[^']|'')*)',\s*','\)")
+    _EQ_RE = re.compile(r"(\w+) eq '((?:[^']|'')*)'")
+
+    def __init__(self, faults: FaultInjector):
+        self.faults = faults
+        self.docs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: list[str] = []
+
+    # ---- writes ----
+    def _upload(self, documents: list[dict]):
+        with self._lock:
+            for doc in documents:
+                self.docs[doc["id"]] = dict(doc)
+            self._matrix = None
+        return [SimpleNamespace(key=doc["id"], succeeded=True) for doc in documents]
+
+    def _delete(self, documents: list[dict]):
+        with self._lock:
+            results = [SimpleNamespace(key=d["id"], succeeded=self.docs.pop(d["id"], None) is not None) for d in documents]
+            self._matrix = None
+        return results
+
+    # ---- reads ----
+    def _predicate(self, odata: Optional[str]):
+        if not odata:
+            return lambda doc: True
+        clauses = []
+        for field_name, values in self._IN_RE.findall(odata):
+            allowed = {v.replace("''", "'") for v in values.split(",")}
+            clauses.append(lambda doc, f=field_name, a=allowed: str(doc.get(f)) in a)
+        for field_name, value in self._EQ_RE.findall(odata):
+            clauses.append(lambda doc, f=field_name, v=value.replace("''", "'"): str(doc.get(f)) == v)
+        return lambda doc: all(clause(doc) for clause in clauses)
+
+    def _vectors(self) -> tuple[list[str], Optional[np.ndarray]]:
+        with self._lock:
+            if self._matrix is None and self.docs:
+                self._ids = [doc_id for doc_id, doc in self.docs.items() if doc.get("embedding")]
+                matrix = np.asarray([self.docs[doc_id]["embedding"] for doc_id in self._ids], dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                self._matrix = matrix / np.where(norms == 0, 1.0, norms)
+            return self._ids, self._matrix
+
+    def _search(self, search_text=None, vector_queries=None, filter=None, select=None, top=None, **kwargs) -> list[dict]:
+        keep = self._predicate(filter)
+        if vector_queries:
+            query = vector_queries[0]
+            ids, matrix = self._vectors()
+            if matrix is None:
+                return []
+            q = np.asarray(query["vector"], dtype=np.float32)
+            scores = matrix @ (q / (np.linalg.norm(q) or 1.0))
+            ranked = [(ids[i], float(scores[i])) for i in np.argsort(-scores)]
+            k = query.get("k_nearest_neighbors") or top or 50
+        elif search_text and search_text != "*":
+            terms = set(re.findall(r"\w+", search_text.lower()))
+            ranked = []
+            for doc_id, doc in list(self.docs.items()):
+                words = re.findall(r"\w+", str(doc.get("content_text", "")).lower())
+                score = sum(1 for word in words if word in terms)
+                if score:
+                    ranked.append((doc_id, float(score)))
+            ranked.sort(key=lambda item: -item[1])
+            k = top or 50
+        else:
+            ranked = [(doc_id, 1.0) for doc_id in list(self.docs)]
+            k = top or 50
+
+        results = []
+        for doc_id, score in ranked:
+            doc = self.docs.get(doc_id)
+            if doc is None or not keep(doc):
+                continue
+            fields = select or list(doc)
+            results.append({**{f: doc.get(f) for f in fields}, "@search.score": score})
+            if len(results) >= k:
+                break
+        return results
+
+
+class FakeSearchClient:
+    def __init__(self, index: FakeSearchIndex):
+        self._index = index
+
+    def upload_documents(self, documents):
+        self._index.faults.call()
+        return self._index._upload(documents)
+
+    def delete_documents(self, documents):
+        self._index.faults.call()
+        return self._index._delete(documents)
+
+    def search(self, **kwargs):
+        self._index.faults.call()
+        return self._index._search(**kwargs)
+
+    def close(self):
+        pass
+
+
+class AsyncFakeSearchClient(FakeSearchClient):
+    async def upload_documents(self, documents):
+        await self._index.faults.acall()
+        return self._index._upload(documents)
+
+    async def delete_documents(self, documents):
+        await self._index.faults.acall()
+        return self._index._delete(documents)
+
+    async def search(self, **kwargs):
+        await self._index.faults.acall()
+        return _AsyncResults(self._index._search(**kwargs))
+
+    async def close(self):
+        pass
+
+
+class FakeSearchIndexClient:
+    def __init__(self, fakes: "FakeAzure"):
+        self._fakes = fakes
+
+    def get_index(self, name: str):
+        if name not in self._fakes.index_schemas:
+            raise _ResourceNotFound(name)
+        return self._fakes.index_schemas[name]
+
+    def create_index(self, index):
+        self._fakes.index_schemas[index.name] = index
+        return index
+
+    def create_or_update_index(self, index):
+        return self.create_index(index)
+
+    def close(self):
+        pass
+
+
+# -------------------- Wiring --------------------
+@dataclass
+class FakeAzure:
+    blob: FakeBlobService
+    embeddings: FakeEmbeddings
+    chat_faults: FaultInjector
+    search_faults: FaultInjector
+    answer_tokens: int = 64
+    token_latency_ms: float = 0.0
+    indexes: dict = field(default_factory=dict)
+    index_schemas: dict = field(default_factory=dict)
+
+    def index(self, name: str) -> FakeSearchIndex:
+        if name not in self.indexes:
+            self.indexes[name] = FakeSearchIndex(self.search_faults)
+        return self.indexes[name]
+
+    def stats(self) -> dict:
+        injectors = {
+            "blob": self.blob.faults,
+            "openai_embeddings": self.embeddings.faults,
+            "openai_chat": self.chat_faults,
+            "azure_search": self.search_faults,
+        }
+        return {name: vars(injector.stats) for name, injector in injectors.items()}
+
+
+def install_fakes(
+    registry,
+    blob: FaultProfile = FaultProfile(),
+    embeddings: FaultProfile = FaultProfile(),
+    chat: FaultProfile = FaultProfile(),
+    search: FaultProfile = FaultProfile(),
+    embedding_dim: int = 256,
+    answer_tokens: int = 64,
+    token_latency_ms: float = 0.0,
+) -> FakeAzure:
+    """Point every client of ``registry`` (a ClientRegistry) at the in-process fakes."""
+    fakes = FakeAzure(
+        blob=FakeBlobService(blob),
+        embeddings=FakeEmbeddings(embeddings, dim=embedding_dim),
+        chat_faults=FaultInjector("openai_chat", chat),
+        search_faults=FaultInjector("azure_search", search),
+        answer_tokens=answer_tokens,
+        token_latency_ms=token_latency_ms,
+    )
+
+    # Properties return these cached clients instead of building real ones
+    registry._async_blob_service_client = fakes.blob
+    registry._openai_client = SimpleNamespace(embeddings=fakes.embeddings)
+    registry._async_openai_client = SimpleNamespace(embeddings=_AsyncFakeEmbeddings(fakes.embeddings))
+
+    # Factory methods are shadowed on the instance
+    index_client = FakeSearchIndexClient(fakes)
+    registry.search_index_client = lambda endpoint, key: index_client
+    registry.search_client = lambda endpoint, key, index_name: FakeSearchClient(fakes.index(index_name))
+    registry.async_search_client = lambda endpoint, key, index_name: AsyncFakeSearchClient(fakes.index(index_name))
+    registry.chat_model = lambda temperature, max_tokens, streaming=False: FakeChatModel(
+        fakes.chat_faults, fakes.answer_tokens, fakes.token_latency_ms, max_tokens
+    )
+    return fakes
+
+
+def estimate_tokens_offline():
+    """
+    Use the character-based token estimates instead of tiktoken, for machines
+    without the tiktoken encodings cached (tiktoken downloads them on first use).
+    Call before the services are constructed.
+    """
+    import app.utils.tokens as tokens
+
+    tokens.TIKTOKEN_AVAILABLE = False
+    tokens.get_tokenizer.cache_clear()
@@ -0,0 +1,100 @@
+# benchmarks/synthetic.py
+"""Deterministic synthetic documents (text, PDF, DOCX) and report helpers."""
+import random
+import resource
+import sys
+from pathlib import Path
+
+_VOCABULARY = [
+    "invoice", "contract", "azure", "storage", "payment", "customer", "policy", "renewal", "account",
+    "shipment", "warranty", "region", "latency", "service", "ticket", "refund", "billing", "quota",
+    "license", "tenant", "backup", "retention", "encryption", "network", "gateway", "endpoint",
+    "the", "a", "of", "for", "with", "is", "are", "and", "to", "in", "on", "by", "after", "before",
+]
+
+
+def paragraphs(count: int, seed: int = 0, min_words: int = 20, max_words: int = 80) -> list[str]:
+    """Sentence-structured paragraphs with a few numeric identifiers mixed in."""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        sentences = []
+        remaining = rng.randint(min_words, max_words)
+        while remaining > 0:
+            length = min(remaining, rng.randint(6, 18))
+            words = [rng.choice(_VOCABULARY) for _ in range(length)]
+            if rng.random() < 0.2:
+                words.append(f"AB-{rng.randint(1000, 9999)}")
+            sentences.append(" ".join(words).capitalize() + ".")
+            remaining -= length
+        result.append(" ".join(sentences))
+    return result
+
+
+def text_of_size(nbytes: int, seed: int = 0) -> str:
+    parts, size, batch = [], 0, 0
+    while size < nbytes:
+        for paragraph in paragraphs(64, seed=seed + batch):
+            parts.append(paragraph)
+            size += len(paragraph) + 2
+        batch += 1
+    return "\n\n".join(parts)[:nbytes]
+
+
+def write_txt(path: Path, pages: int, seed: int = 0) -> Path:
+    path.write_text("\n\n".join(paragraphs(pages * 6, seed=seed)), encoding="utf-8")
+    return path
+
+
+def write_pdf(path: Path, pages: int, seed: int = 0) -> Path:
+    import fitz  # PyMuPDF
+
+    with fitz.open() as pdf:
+        for number in range(pages):
+            page = pdf.new_page()
+            body = "\n\n".join(paragraphs(6, seed=seed * 100003 + number, max_words=60))
+            page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), body, fontsize=9)
+        pdf.save(str(path))
+    return path
+
+
+def write_docx(path: Path, pages: int, seed: int = 0) -> Path:
+    import docx  # python-docx
+
+    document = docx.Document()
+    for number in range(pages):
+        for paragraph in paragraphs(6, seed=seed * 100003 + number):
+            document.add_paragraph(paragraph)
+        if number < pages - 1:
+            document.add_page_break()
+    document.save(str(path))
+    return path
+
+
+WRITERS = {"txt": write_txt, "pdf": write_pdf, "docx": write_docx}
+
+
+# -------------------- Reporting --------------------
+def percentile(values: list[float], q: float) -> float:
+    """Linear-interpolated percentile (``q`` in 0..100); 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process (or its reaped children) in MiB."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux reports KiB, macOS bytes
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def print_table(title: str, rows: list[tuple]):
+    print(f"\n{title}")
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  " + "  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)))
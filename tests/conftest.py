@@ -0,0 +1,101 @@
+# tests/conftest.py
+"""
+Settings are read when ``app.config.settings`` is imported, so the test
+environment is set up here, before any test module imports the app: dummy
+Azure credentials, a throwaway SQLite database and the local vector store.
+"""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_WORKDIR = Path(tempfile.mkdtemp(prefix="rag-tests-"))
+
+for _key, _value in {
+    "AZURE_STORAGE_ACCOUNT_NAME": "test",
+    "AZURE_STORAGE_ACCOUNT_KEY": "dGVzdA==",
+    "AZURE_STORAGE_CONTAINER_NAME": "test",
+    "AZURE_OPENAI_ENDPOINT": "https://test.openai.azure.com",
+    "AZURE_OPENAI_API_KEY": "test",
+    "AZURE_OPENAI_EMBED_MODEL": "text-embedding-3-small",
+    "AZURE_OPENAI_CHAT_MODEL": "gpt-4",
+    "AZURE_SEARCH_ENDPOINT": "https://test.search.windows.net",
+    "AZURE_SEARCH_API_KEY": "test",
+    "AZURE_SEARCH_INDEX_NAME": "documents",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+os.environ.update(
+    SQLITE_PATH=f"sqlite:///{_WORKDIR / 'test.sqlite3'}",
+    VECTOR_STORE_BACKEND="local",
+    FAISS_INDEX_DIR=str(_WORKDIR / "index"),
+    EMBEDDING_CACHE_PATH="",
+    WARMUP_ENABLED="false",
+    INGEST_WORKERS="0",
+)
+
+# Token counts use the character estimate: tiktoken downloads its encodings on first use
+from benchmarks.fakes import estimate_tokens_offline  # noqa: E402
+
+estimate_tokens_offline()
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly initialised database; every table is emptied afterwards."""
+    from app.state.db import Base, SessionLocal, engine, init_db
+
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+
+@pytest.fixture
+def blobs():
+    from benchmarks.fakes import FakeBlobService, FaultProfile
+
+    return FakeBlobService(FaultProfile())
+
+
+@pytest.fixture
+def client(db, blobs):
+    """The real routes over fake Blob Storage; jobs are queued but no worker runs them."""
+    from fastapi.testclient import TestClient
+
+    from app.deps.services import get_storage, get_worker_pool
+    from app.main import app
+    from app.services.clients import ClientRegistry
+    from app.services.ingest_queue import IngestWorkerPool
+    from app.services.storage_manager import StorageManager
+    from app.state.db import async_engine
+
+    clients = ClientRegistry()
+    clients._async_blob_service_client = blobs
+    app.dependency_overrides[get_storage] = lambda: StorageManager(clients=clients)
+    app.dependency_overrides[get_worker_pool] = lambda: IngestWorkerPool(pipeline=None)
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+
+
+def run_async(coro):
+    """Run ``coro`` on a new event loop, closing the async engine's connections on it."""
+    from app.state.db import async_engine
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(main())
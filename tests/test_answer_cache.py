@@ -0,0 +1,36 @@
+# tests/test_answer_cache.py
+from app.services.answer_cache import AnswerCache
+from app.state import repos
+from app.state.db import SessionLocal
+
+
+def _manifest_chunk(key: str, text: str) -> dict:
+    return {"chunk_id": key, "content": text, "content_hash": key}
+
+
+def test_manifest_changes_bump_the_shared_index_version(db):
+    doc = repos.create_document(db, None, "a.txt")
+    assert repos.get_index_version(db) == 0
+
+    repos.apply_chunk_manifest(db, doc.id, [_manifest_chunk("a", "alpha")], [], {"a": 0})
+    repos.apply_chunk_manifest(db, doc.id, [], ["a"], {})
+
+    # Read through another connection, as another worker process would
+    other = SessionLocal()
+    try:
+        assert repos.get_index_version(other) == 2
+    finally:
+        other.close()
+
+
+def test_cache_is_dropped_when_another_worker_ingests(db):
+    doc = repos.create_document(db, None, "a.txt")
+    cache = AnswerCache(threshold=0.9)
+    version = repos.get_index_version(db)
+    cache.store([1.0, 0.0], ["alpha"], {"answer": "A"}, index_version=version)
+    assert cache.lookup([1.0, 0.0], ["alpha"], index_version=version) == {"answer": "A"}
+
+    repos.apply_chunk_manifest(db, doc.id, [_manifest_chunk("b", "beta")], [], {"b": 0})
+
+    assert cache.lookup([1.0, 0.0], ["alpha"], index_version=repos.get_index_version(db)) is None
+    assert cache.stats()["invalidations"] == 1
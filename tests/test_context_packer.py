@@ -0,0 +1,49 @@
+# tests/test_context_packer.py
+from app.services.context_packer import ContextPacker
+from app.utils.tokens import count_tokens
+
+
+def _hits(*texts: str) -> list[dict]:
+    return [{"content": text} for text in texts]
+
+
+def _tokens(chunks: list[str]) -> int:
+    return count_tokens(ContextPacker.SEPARATOR.join(chunks))
+
+
+def test_smaller_blocks_fill_the_budget_after_one_that_does_not_fit():
+    first, too_big, small = "a" * 200, "b" * 400, "c" * 80  # no sentence boundary to trim at
+
+    packed = ContextPacker(budget_tokens=100).pack(_hits(first, too_big, small))
+
+    assert packed.chunks == [first, small]
+    assert (packed.dropped, packed.trimmed) == (1, False)
+    assert _tokens(packed.chunks) <= packed.tokens <= 100
+
+
+def test_trimmed_block_is_followed_by_blocks_that_still_fit():
+    first = "a" * 200
+    sentences = " ".join(["This sentence is exactly forty chars ok."] * 10)
+    small = "Done."
+
+    packed = ContextPacker(budget_tokens=100).pack(_hits(first, sentences, "d" * 400, small))
+
+    assert packed.chunks[0] == first
+    assert packed.chunks[1].endswith("ok.") and sentences.startswith(packed.chunks[1])
+    assert packed.chunks[2] == small
+    assert (packed.dropped, packed.trimmed) == (1, True)
+    assert _tokens(packed.chunks) <= packed.tokens <= 100
+
+
+def test_adjacent_hits_are_merged_and_duplicates_counted():
+    hits = [
+        {"content": "alpha beta gamma delta epsilon zeta", "doc_id": 1, "position": 1},
+        {"content": "other document", "doc_id": 2, "position": 0},
+        {"content": "gamma delta epsilon zeta eta theta", "doc_id": 1, "position": 2},
+        {"content": "other document"},
+    ]
+
+    packed = ContextPacker(budget_tokens=100).pack(hits)
+
+    assert packed.chunks == ["alpha beta gamma delta epsilon zeta eta theta", "other document"]
+    assert (packed.merged, packed.dropped) == (2, 0)
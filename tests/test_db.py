@@ -0,0 +1,34 @@
+# tests/test_db.py
+import asyncio
+import threading
+import time
+
+from app.state.db import db_call
+from tests.conftest import run_async
+
+
+def test_db_call_runs_off_the_event_loop(db):
+    loop_thread = threading.get_ident()
+
+    def slow_repo_call(session, seconds):
+        time.sleep(seconds)
+        return threading.get_ident(), session.bind is not None
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await db_call(slow_repo_call, 0.3)
+        task.cancel()
+        return result, ticks
+
+    (thread, bound), ticks = run_async(main())
+    assert thread != loop_thread and bound
+    # The loop kept serving other tasks while the repo call ran
+    assert ticks >= 10
@@ -0,0 +1,47 @@
+# tests/test_dedup.py
+from app.state import repos
+
+
+def _upload(client, name: str, data: bytes) -> dict:
+    response = client.post("/upload/", files={"file": (name, data, "text/plain")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_duplicate_upload_reuses_the_original_blob(client, blobs):
+    original = _upload(client, "a.txt", b"same bytes")
+    duplicate = _upload(client, "copy-of-a.txt", b"same bytes")
+    other = _upload(client, "b.txt", b"other bytes")
+
+    assert original["sourceDocumentId"] is None
+    assert duplicate["sourceDocumentId"] == original["documentId"]
+    assert duplicate["blobPath"] == original["blobPath"]
+    assert duplicate["transfer"]["committed"] is False
+    assert other["sourceDocumentId"] is None
+    assert sorted(blobs.blobs) == sorted([original["blobPath"], other["blobPath"]])
+    assert blobs.staged == {}
+
+
+def test_same_file_uploaded_in_the_same_second_gets_its_own_blob(client, blobs):
+    first = _upload(client, "notes.txt", b"version 1")
+    second = _upload(client, "notes.txt", b"version 2")
+
+    assert first["blobPath"] != second["blobPath"]
+    assert blobs.blobs[first["blobPath"]] == b"version 1"
+    assert blobs.blobs[second["blobPath"]] == b"version 2"
+
+
+def test_processing_a_duplicate_reuses_the_original_job(client, db):
+    original = _upload(client, "a.txt", b"same bytes")["documentId"]
+    duplicate = _upload(client, "a2.txt", b"same bytes")["documentId"]
+
+    queued = client.post(f"/process/{original}").json()
+    assert queued["status"] == "queued"
+    # Queued under the original, so processing the duplicate does not enqueue it again
+    again = client.post(f"/process/{duplicate}").json()
+    assert (again["job_id"], again["status"]) == (queued["job_id"], "queued")
+
+    repos.update_ingest_job(db, queued["job_id"], status="succeeded")
+    done = client.post(f"/process/{duplicate}").json()
+    assert (done["job_id"], done["status"]) == (queued["job_id"], "succeeded")
+    assert repos.get_latest_ingest_job(db, duplicate) is None
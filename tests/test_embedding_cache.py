@@ -0,0 +1,68 @@
+# tests/test_embedding_cache.py
+import itertools
+import sqlite3
+
+import pytest
+
+from app.services import embedding_cache
+from app.services.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    ticks = itertools.count(1)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _disk_keys(path) -> set:
+    with sqlite3.connect(path) as conn:
+        return {h for (h,) in conn.execute("SELECT text_hash FROM embeddings")}
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = EmbeddingCache(str(path), max_memory_items=2, max_disk_items=5)
+    for key in "abcde":
+        cache.put_many("model", {key: [1.0, 2.0]})
+    cache.get_many("model", ["a"])  # a is read from disk and becomes the most recently used
+
+    cache.put_many("model", {"f": [3.0, 4.0]})
+
+    # Six rows exceed the cap: trimmed to the low-water mark (4), oldest first
+    assert _disk_keys(path) == {"a", "d", "e", "f"}
+    assert cache.stats()["disk_evictions"] == 2
+    reopened = EmbeddingCache(str(path), max_disk_items=5)
+    assert reopened.get_many("model", ["a", "b"]) == {"a": [1.0, 2.0]}
+    cache.close()
+    reopened.close()
+
+
+def test_unbounded_disk_tier_keeps_everything(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = EmbeddingCache(str(path), max_memory_items=1, max_disk_items=0)
+    cache.put_many("model", {str(i): [float(i)] for i in range(20)})
+
+    assert len(_disk_keys(path)) == 20
+    assert cache.stats()["disk_evictions"] == 0
+    cache.close()
+
+
+def test_existing_cache_file_is_upgraded(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE embeddings (deployment TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, PRIMARY KEY (deployment, text_hash))"
+        )
+        conn.executemany(
+            "INSERT INTO embeddings VALUES (?, ?, 1, ?)",
+            [("model", key, embedding_cache.np.float32(1.0).tobytes()) for key in "abc"],
+        )
+
+    cache = EmbeddingCache(str(path), max_disk_items=3)
+    cache.get_many("model", ["c"])
+    cache.put_many("model", {"d": [2.0]})
+
+    # Rows from before the upgrade count as least recently used
+    assert _disk_keys(path) == {"c", "d"}
+    cache.close()
@@ -0,0 +1,108 @@
+# tests/test_ingest_queue.py
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from app.services.ingest_queue import IngestWorkerPool
+from app.state import models, repos
+from app.state.db import db_call
+from tests.conftest import run_async
+
+
+class FakePipeline:
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = seconds
+        self.runs: list[int] = []
+
+    async def run(self, doc_id, name, blob_url, progress=None):
+        self.runs.append(doc_id)
+        await asyncio.sleep(self.seconds)
+        return {"timings": {}, "chunks": {"added": 1}}
+
+
+def _queued_job(db) -> models.IngestJob:
+    doc = repos.create_document(db, None, "a.txt", blob_url="https://blob/a.txt")
+    return repos.create_ingest_job(db, doc.id)
+
+
+def _set_updated_at(db, job_id: int, when: datetime):
+    db.query(models.IngestJob).filter(models.IngestJob.id == job_id).update(
+        {models.IngestJob.updated_at: when}, synchronize_session=False
+    )
+    db.commit()
+
+
+async def _wait_for_status(job_id: int, status: str, timeout: float = 5.0) -> models.IngestJob:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await db_call(repos.get_ingest_job, job_id)
+        if job.status == status or time.monotonic() > deadline:
+            return job
+        await asyncio.sleep(0.05)
+
+
+def test_claim_takes_oldest_job_once(db):
+    first, second = _queued_job(db), _queued_job(db)
+
+    claimed = repos.claim_next_ingest_job(db)
+    assert (claimed.id, claimed.status, claimed.attempts) == (first.id, "running", 1)
+    assert repos.claim_next_ingest_job(db).id == second.id
+    assert repos.claim_next_ingest_job(db) is None
+
+
+def test_requeue_only_touches_silent_running_jobs(db):
+    stale, fresh, queued = _queued_job(db), _queued_job(db), _queued_job(db)
+    repos.claim_next_ingest_job(db)
+    repos.claim_next_ingest_job(db)
+    _set_updated_at(db, stale.id, datetime.utcnow() - timedelta(minutes=5))
+
+    assert repos.requeue_stale_ingest_jobs(db, 60) == 1
+    db.expire_all()
+    assert [repos.get_ingest_job(db, job.id).status for job in (stale, fresh, queued)] == ["queued", "running", "queued"]
+
+
+def test_heartbeat_keeps_running_jobs_alive(db):
+    job = _queued_job(db)
+    repos.claim_next_ingest_job(db)
+    _set_updated_at(db, job.id, datetime.utcnow() - timedelta(minutes=5))
+
+    assert repos.touch_ingest_jobs(db, [job.id]) == 1
+    assert repos.requeue_stale_ingest_jobs(db, 60) == 0
+
+
+def test_job_of_crashed_worker_is_requeued_after_restart(db):
+    # A worker claimed the job and its process died moments later, before any staleness window
+    job = _queued_job(db)
+    repos.claim_next_ingest_job(db)
+
+    async def restart():
+        pipeline = FakePipeline()
+        pool = IngestWorkerPool(pipeline, concurrency=1, poll_interval=0.05, heartbeat_interval=0.1, stale_after_seconds=1)
+        await pool.start()
+        try:
+            return pipeline, await _wait_for_status(job.id, "succeeded")
+        finally:
+            await pool.stop()
+
+    pipeline, finished = run_async(restart())
+    assert finished.status == "succeeded"
+    assert finished.attempts == 2
+    assert pipeline.runs == [job.document_id]
+
+
+def test_long_job_is_not_requeued_while_its_worker_lives(db):
+    job = _queued_job(db)
+
+    async def run_pool():
+        pipeline = FakePipeline(seconds=2.5)
+        pool = IngestWorkerPool(pipeline, concurrency=2, poll_interval=0.05, heartbeat_interval=0.1, stale_after_seconds=1)
+        await pool.start()
+        try:
+            return pipeline, await _wait_for_status(job.id, "succeeded")
+        finally:
+            await pool.stop()
+
+    pipeline, finished = run_async(run_pool())
+    assert finished.status == "succeeded"
+    assert finished.attempts == 1
+    assert pipeline.runs == [job.document_id]
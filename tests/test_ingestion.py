@@ -0,0 +1,90 @@
+# tests/test_ingestion.py
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.chunker import Chunker
+from app.services.clients import ClientRegistry
+from app.services.extractor import Extractor
+from app.services.ingestion import IngestionPipeline
+from app.services.storage_manager import StorageManager
+from app.services.vector_store.local_vector_store import LocalVectorStore
+from app.state import repos
+from benchmarks.fakes import FakeEmbeddings, FaultProfile
+from tests.conftest import run_async
+
+
+class FakeEmbedder:
+    batcher = SimpleNamespace(max_items_per_batch=8, max_concurrency=1)
+
+    def __init__(self):
+        self.embeddings = FakeEmbeddings(FaultProfile(), dim=32)
+        self.embedded: list[str] = []
+
+    async def aembed_batch(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += texts
+        return [self.embeddings.vector(text) for text in texts]
+
+
+def _paragraph(topic: str) -> str:
+    return " ".join(f"{topic}{i}" for i in range(20)) + "."
+
+
+@pytest.fixture
+def pipeline(blobs, tmp_path):
+    clients = ClientRegistry()
+    clients._async_blob_service_client = blobs
+    extractor = Extractor(max_workers=1)
+    pipeline = IngestionPipeline(
+        storage=StorageManager(clients=clients),
+        extractor=extractor,
+        # One paragraph per chunk: the end snaps back to the paragraph break
+        chunker=Chunker(chunk_size=30, overlap=0, boundary="paragraph", boundary_tolerance=30),
+        embedder=FakeEmbedder(),
+        vector_store=LocalVectorStore(str(tmp_path / "index")),
+        tmp_dir=tmp_path,
+    )
+    yield pipeline
+    extractor.close()
+
+
+def _ingest(pipeline, blobs, doc_id: int, paragraphs: list[str]) -> dict:
+    blobs.blobs["doc.txt"] = "\n\n".join(paragraphs).encode()
+    pipeline.embedder.embedded.clear()
+    return run_async(pipeline.run(doc_id, "doc.txt", "doc.txt"))["chunks"]
+
+
+def test_reprocessing_only_embeds_changed_chunks(db, pipeline, blobs):
+    doc = repos.create_document(db, None, "doc.txt", blob_url="doc.txt")
+    paragraphs = [_paragraph(topic) for topic in ("alpha", "beta", "gamma", "delta")]
+
+    assert _ingest(pipeline, blobs, doc.id, paragraphs) == {"reused": 0, "added": 4, "updated": 0, "removed": 0}
+    first_keys = {chunk.chunk_key for chunk in repos.get_chunk_manifest(db, doc.id)}
+    assert len(pipeline.vector_store) == 4
+
+    # Unchanged content: nothing is embedded or written
+    assert _ingest(pipeline, blobs, doc.id, paragraphs) == {"reused": 4, "added": 0, "updated": 0, "removed": 0}
+    assert pipeline.embedder.embedded == []
+
+    # Edit one paragraph, replace another with a new one
+    edited = [paragraphs[0], _paragraph("BETA"), _paragraph("epsilon"), paragraphs[3]]
+    assert _ingest(pipeline, blobs, doc.id, edited) == {"reused": 2, "added": 2, "updated": 0, "removed": 2}
+    assert sorted(text.strip() for text in pipeline.embedder.embedded) == sorted(edited[1:3])
+
+    manifest = repos.get_chunk_manifest(db, doc.id)
+    keys = {chunk.chunk_key for chunk in manifest}
+    assert len(keys & first_keys) == 2
+    assert [chunk.text.strip() for chunk in sorted(manifest, key=lambda c: c.position)] == edited
+    assert len(pipeline.vector_store) == 4
+    assert set(pipeline.vector_store.get_vectors([f"{doc.id}_{key}" for key in keys])) == {f"{doc.id}_{key}" for key in keys}
+    assert pipeline.vector_store.get_vectors([f"{doc.id}_{key}" for key in first_keys - keys]) == {}
+
+
+def test_repeated_chunks_get_distinct_keys():
+    chunks = [{"content": "same"}, {"content": "other"}, {"content": "same"}]
+
+    IngestionPipeline._assign_keys(chunks)
+
+    assert chunks[0]["content_hash"] == chunks[2]["content_hash"]
+    assert len({chunk["chunk_id"] for chunk in chunks}) == 3
+    assert chunks[2]["chunk_id"] == f"{chunks[0]['chunk_id']}-1"
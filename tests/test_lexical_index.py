@@ -0,0 +1,56 @@
+# tests/test_lexical_index.py
+import random
+
+import pytest
+
+from app.services.lexical_index import BM25Index
+
+WORDS = "invoice refund shipping address policy total order AB-1234 v2.1 customer archive".split()
+
+
+def _corpus(document_id: int, chunks: int, rng: random.Random) -> list[tuple[str, str, int]]:
+    return [
+        (f"{document_id}_{i}", " ".join(rng.choices(WORDS, k=rng.randint(3, 12))), document_id)
+        for i in range(chunks)
+    ]
+
+
+def _scores(index: BM25Index, query: str) -> dict[str, float]:
+    return {hit["id"]: hit["score"] for hit in index.search(query, k=1000)}
+
+
+def test_updates_match_a_full_build():
+    rng = random.Random(0)
+    corpus = {document_id: _corpus(document_id, 5, rng) for document_id in range(1, 9)}
+    index = BM25Index()
+    index.build([doc for docs in corpus.values() for doc in docs], signature=1)
+
+    # Re-index some documents, empty one, add a new one
+    corpus[2] = _corpus(2, 3, rng)
+    corpus[5] = []
+    corpus[9] = _corpus(9, 4, rng)
+    index.update([2, 5, 9], corpus[2] + corpus[9], signature=2)
+    rebuilt = BM25Index()
+    rebuilt.build([doc for docs in corpus.values() for doc in docs])
+
+    assert index.signature == 2
+    assert len(index) == len(rebuilt) == 5 * 6 + 3 + 4
+    for query in ("invoice", "refund total", "AB-1234 customer", "v2.1"):
+        expected = _scores(rebuilt, query)
+        assert expected and _scores(index, query) == pytest.approx(expected)
+    assert {hit["id"].split("_")[0] for hit in index.search("invoice", k=100, doc_ids=[2])} == {"2"}
+
+
+def test_tombstones_are_compacted():
+    rng = random.Random(1)
+    index = BM25Index()
+    index.build(_corpus(1, 4, rng))
+    for _ in range(300):
+        index.update([1], _corpus(1, 4, rng))
+
+    state = index._state
+    assert len(state["ids"]) < 4 * 300
+    assert len(state["ids"]) == state["live"] + state["dead"] == len(state["documents"])
+    rebuilt = BM25Index()
+    rebuilt.build([(doc_id, text, 1) for doc_id, text in zip(state["ids"], state["texts"]) if doc_id is not None])
+    assert _scores(index, "invoice order") == pytest.approx(_scores(rebuilt, "invoice order"))
@@ -0,0 +1,126 @@
+# tests/test_local_vector_store.py
+import os
+
+import numpy as np
+import pytest
+
+from app.services.vector_store.local_vector_store import LocalVectorStore
+
+
+def _chunks(doc_id: str, count: int) -> list[dict]:
+    return [{"doc_id": doc_id, "chunk_id": str(i), "content": f"doc {doc_id} chunk {i}"} for i in range(count)]
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(12, 16)).astype(np.float32)
+
+
+@pytest.fixture
+def store(tmp_path) -> LocalVectorStore:
+    return LocalVectorStore(str(tmp_path))
+
+
+def test_add_and_search_returns_nearest_first(store, vectors):
+    store.add_embeddings(_chunks("1", 12), vectors.tolist())
+
+    hits = store.search_hits(vectors[3].tolist(), k=3)
+
+    assert len(store) == 12
+    assert hits[0]["id"] == "1_3"
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+
+
+def test_search_accepts_numpy_query(store, vectors):
+    store.add_embeddings(_chunks("1", 12), vectors.tolist())
+
+    assert store.search_hits(vectors[5], k=1)[0]["id"] == "1_5"
+    assert store.search_hits(np.empty(0, dtype=np.float32), k=1) == []
+
+
+def test_search_on_empty_index(store):
+    assert store.search_hits([0.1] * 16, k=3) == []
+    assert len(store) == 0
+
+
+def test_dimension_mismatch_is_rejected(store, vectors):
+    store.add_embeddings(_chunks("1", 12), vectors.tolist())
+
+    with pytest.raises(ValueError):
+        store.add_embeddings(_chunks("2", 1), [[0.1] * 8])
+
+
+def test_delete_tombstones_rows_until_readded(store, vectors):
+    store.add_embeddings(_chunks("1", 12), vectors.tolist())
+
+    assert store.delete_ids(["1_3", "1_4", "missing"]) == 2
+    assert store.delete_ids(["1_3"]) == 0
+    assert len(store) == 10
+    assert all(hit["id"] not in ("1_3", "1_4") for hit in store.search_hits(vectors[3].tolist(), k=12))
+    assert "1_3" not in store.get_vectors(["1_3", "1_5"])
+
+    store.add_embeddings(_chunks("1", 4)[3:], [vectors[3].tolist()])
+    assert len(store) == 11
+    assert store.search_hits(vectors[3].tolist(), k=1)[0]["id"] == "1_3"
+
+
+def test_second_instance_sees_writes(tmp_path, vectors):
+    writer = LocalVectorStore(str(tmp_path))
+    reader = LocalVectorStore(str(tmp_path))
+    writer.add_embeddings(_chunks("1", 6), vectors[:6].tolist())
+    assert len(reader) == 6
+    version = reader.version
+
+    writer.add_embeddings(_chunks("2", 6), vectors[6:].tolist())
+    writer.delete_ids(["1_0"])
+
+    assert len(reader) == 11
+    assert reader.search_hits(vectors[8].tolist(), k=1)[0]["id"] == "2_2"
+    assert reader.version != version
+
+
+def test_writes_within_one_mtime_tick_are_not_lost(tmp_path, vectors):
+    first = LocalVectorStore(str(tmp_path))
+    second = LocalVectorStore(str(tmp_path))
+    first.add_embeddings(_chunks("1", 4), vectors[:4].tolist())
+    assert len(second) == 4
+    header = tmp_path / "documents" / LocalVectorStore.HEADER_FILE
+    stat = header.stat()
+
+    # Another worker commits, and the header keeps the mtime the second store last saw
+    first.add_embeddings(_chunks("2", 4), vectors[4:8].tolist())
+    os.utime(header, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    second.add_embeddings(_chunks("3", 4), vectors[8:].tolist())
+
+    fresh = LocalVectorStore(str(tmp_path))
+    assert len(fresh) == len(first) == 12
+    for row in (5, 9):
+        expected = f"{row // 4 + 1}_{row % 4}"
+        assert fresh.search_hits(vectors[row].tolist(), k=1)[0]["id"] == expected
+
+
+def test_doc_filter_only_scores_those_documents(store, vectors):
+    store.add_embeddings(_chunks("1", 4), vectors[:4].tolist())
+    store.add_embeddings(_chunks("2", 4), vectors[4:8].tolist())
+    store.add_embeddings(_chunks("3", 4), vectors[8:].tolist())
+
+    by_doc = store.search_hits(vectors[0].tolist(), k=12, doc_ids=[2, "3"])
+
+    assert {hit["id"].split("_")[0] for hit in by_doc} == {"2", "3"}
+    assert len(by_doc) == 8
+    assert store.search_hits(vectors[0].tolist(), k=12, doc_ids=["unknown"]) == []
+    assert store.search_hits(vectors[0].tolist(), k=12, doc_ids=[]) == []
+
+
+def test_rebuild_replaces_index(tmp_path, vectors):
+    store = LocalVectorStore(str(tmp_path))
+    reader = LocalVectorStore(str(tmp_path))
+    store.add_embeddings(_chunks("1", 12), vectors.tolist())
+    assert len(reader) == 12
+
+    assert store.rebuild(_chunks("9", 3), vectors[:3]) == 3
+
+    assert len(reader) == 3
+    assert reader.search_hits(vectors[1].tolist(), k=1)[0]["id"] == "9_1"
+    assert reader.search_hits(vectors[1].tolist(), k=3, doc_ids=["1"]) == []
@@ -0,0 +1,51 @@
+# tests/test_mmr.py
+import numpy as np
+
+from app.services.mmr import mmr_select
+from app.services.retriever import HybridRetriever
+from app.services.vector_store.local_vector_store import LocalVectorStore
+from tests.conftest import run_async
+
+QUERY = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+# best match, its near-duplicate, and a less relevant but different chunk
+CANDIDATES = np.array([[0.9, 0.1, 0.0], [0.9, 0.12, 0.0], [0.6, 0.0, 0.8]], dtype=np.float32)
+
+
+def test_mmr_skips_near_duplicates():
+    assert mmr_select(QUERY, CANDIDATES, k=2, lambda_=0.5) == [0, 2]
+
+
+def test_mmr_with_lambda_one_is_relevance_order():
+    assert mmr_select(QUERY, CANDIDATES, k=3, lambda_=1.0) == [0, 1, 2]
+
+
+def test_mmr_bounds():
+    assert mmr_select(QUERY, CANDIDATES, k=0) == []
+    assert sorted(mmr_select(QUERY, CANDIDATES, k=10)) == [0, 1, 2]
+
+
+def test_retriever_mmr_returns_diverse_chunks(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    chunks = [{"doc_id": "1", "chunk_id": str(i), "content": f"chunk {i}"} for i in range(3)]
+    store.add_embeddings(chunks, CANDIDATES.tolist())
+    retriever = HybridRetriever(store, mmr_lambda=0.5, mmr_multiplier=3)
+
+    plain = run_async(retriever.aretrieve("q", QUERY.tolist(), k=2, mode="vector"))
+    diverse = run_async(retriever.aretrieve("q", QUERY.tolist(), k=2, mode="vector", mmr=True))
+
+    assert [hit["id"] for hit in plain] == ["1_0", "1_1"]
+    assert [hit["id"] for hit in diverse] == ["1_0", "1_2"]
+
+
+def test_retriever_mmr_fetches_vectors_of_lexical_hits(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    chunks = [{"doc_id": "1", "chunk_id": str(i), "content": f"chunk {i}"} for i in range(3)]
+    store.add_embeddings(chunks, CANDIDATES.tolist())
+    retriever = HybridRetriever(store, mmr_lambda=0.5)
+    # As returned by the BM25 leg: no vectors; "9_9" is not in the vector store at all
+    hits = [{"id": hit_id, "content": hit_id, "score": 1.0} for hit_id in ("1_0", "1_1", "1_2", "9_9")]
+
+    picked = run_async(retriever._mmr(QUERY.tolist(), hits, k=3))
+
+    assert [hit["id"] for hit in picked] == ["1_0", "1_2", "1_1"]
+    assert [hit["id"] for hit in run_async(retriever._mmr(QUERY.tolist(), hits, k=4))][-1] == "9_9"
@@ -0,0 +1,93 @@
+# tests/test_quantization.py
+import numpy as np
+import pytest
+
+from app.services.vector_store.local_vector_store import LocalVectorStore
+from app.services.vector_store.quantization import ProductQuantizer, ScalarQuantizer
+
+ROWS, DIM = 3000, 32
+
+
+def _clustered(rows: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = np.random.default_rng(42).normal(size=(40, DIM))
+    return (centres[rng.integers(0, 40, rows)] + 0.5 * rng.normal(size=(rows, DIM))).astype(np.float32)
+
+
+def _chunks(start: int, count: int) -> list[dict]:
+    return [{"doc_id": str(i // 100), "chunk_id": str(i), "content": f"chunk {i}"} for i in range(start, start + count)]
+
+
+def _store(path, quantization: str, **kwargs) -> LocalVectorStore:
+    return LocalVectorStore(str(path), quantization=quantization, quantize_min_rows=1000, rerank_factor=10, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def corpus() -> np.ndarray:
+    return _clustered(ROWS, seed=0)
+
+
+@pytest.mark.parametrize("kind, codes_only", [("int8", 0.9), ("pq", 0.2)])
+def test_quantized_search_recall(tmp_path, corpus, kind, codes_only):
+    store = _store(tmp_path, kind, pq_subspaces=8)
+    store.rebuild(_chunks(0, ROWS), corpus)
+
+    recall = store.measure_recall(_clustered(50, seed=1), k=10)
+
+    assert recall["quantization"] == kind
+    assert recall["recall"] >= 0.95
+    assert recall["recall_codes_only"] >= codes_only
+    assert recall["compression"] == pytest.approx(4.0 if kind == "int8" else DIM * 4 / 8)
+
+
+def test_small_index_stays_exact(tmp_path, corpus):
+    store = _store(tmp_path, "int8")
+    store.add_embeddings(_chunks(0, 500), corpus[:500].tolist())
+
+    assert store.search_hits(corpus[7], k=1)[0]["id"] == "0_7"
+    with pytest.raises(ValueError):
+        store.measure_recall(k=10)
+
+
+def test_codebook_is_trained_at_threshold_and_shared(tmp_path, corpus):
+    writer = _store(tmp_path, "int8")
+    writer.add_embeddings(_chunks(0, 600), corpus[:600].tolist())
+    writer.add_embeddings(_chunks(600, 600), corpus[600:1200].tolist())
+    # Rows appended after training are encoded with the same codebook
+    writer.add_embeddings(_chunks(1200, 300), corpus[1200:1500].tolist())
+
+    # Another worker loads the published codebook instead of training its own
+    reader = _store(tmp_path, "int8")
+    recall = reader.measure_recall(k=5, sample=50)
+    assert recall["code_bytes"] == 1500 * DIM
+    assert recall["recall"] >= 0.95
+    assert reader.search_hits(corpus[1400], k=1)[0]["id"] == "14_1400"
+
+
+def test_rebuild_retrains_the_codebook(tmp_path, corpus):
+    writer = _store(tmp_path, "pq", pq_subspaces=8)
+    reader = _store(tmp_path, "pq", pq_subspaces=8)
+    writer.rebuild(_chunks(0, 1500), corpus[:1500])
+    first = reader.measure_recall(k=5, sample=20)
+
+    writer.rebuild(_chunks(0, ROWS), corpus)
+
+    second = reader.measure_recall(k=5, sample=20)
+    assert (first["code_bytes"], second["code_bytes"]) == (1500 * 8, ROWS * 8)
+    assert reader.search_hits(corpus[2500], k=1)[0]["id"] == "25_2500"
+
+
+def test_quantizers_round_trip(corpus):
+    scalar = ScalarQuantizer.train(corpus)
+    codes = scalar.encode(corpus[:10])
+    assert codes.dtype == np.int8
+    np.testing.assert_allclose(scalar.score(codes, corpus[0]), corpus[:10] @ corpus[0], rtol=0.05, atol=0.5)
+
+    pq = ProductQuantizer.train(corpus, subspaces=8)
+    assert pq.encode(corpus[:10]).shape == (10, 8)
+    assert ProductQuantizer.subspaces_for(DIM, 6) == 4
+
+
+def test_unknown_quantization_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        LocalVectorStore(str(tmp_path), quantization="fp8")
@@ -0,0 +1,101 @@
+# tests/test_retriever.py
+import asyncio
+
+import pytest
+
+from app.services.retriever import HybridRetriever
+from app.services.vector_store.local_vector_store import LocalVectorStore
+from app.state import repos
+from tests.conftest import run_async
+
+
+def _hit(hit_id: str, score: float = 0.0) -> dict:
+    return {"id": hit_id, "content": hit_id, "score": score}
+
+
+def _index_chunks(db, texts: dict[str, str]) -> int:
+    doc = repos.create_document(db, None, "doc.txt")
+    chunks = [{"chunk_id": key, "content": text, "content_hash": key} for key, text in texts.items()]
+    repos.apply_chunk_manifest(db, doc.id, chunks, [], {key: i for i, key in enumerate(texts)})
+    return doc.id
+
+
+@pytest.fixture
+def retriever(tmp_path) -> HybridRetriever:
+    return HybridRetriever(LocalVectorStore(str(tmp_path)), lexical_refresh_interval=60)
+
+
+def test_rrf_rewards_hits_ranked_by_both_lists():
+    vector = [_hit("a"), _hit("b"), _hit("c")]
+    lexical = [_hit("c"), _hit("d"), _hit("a")]
+
+    fused = HybridRetriever.rrf([vector, lexical], k=4, rrf_k=60)
+
+    assert [hit["id"] for hit in fused] == ["a", "c", "b", "d"]
+    assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 63)
+    assert [hit["id"] for hit in HybridRetriever.rrf([vector, lexical], k=2)] == ["a", "c"]
+
+
+def test_rrf_keeps_the_first_payload_of_a_hit():
+    fused = HybridRetriever.rrf([[{**_hit("a"), "vector": [1.0]}], [_hit("a")]], k=1)
+
+    assert fused[0]["vector"] == [1.0]
+
+
+def test_lexical_index_refreshes_in_the_background(db, retriever, monkeypatch):
+    doc_id = _index_chunks(db, {"k1": "invoice number AB-1234", "k2": "shipping address"})
+    loads = []
+    list_indexed_chunks = repos.list_indexed_chunks
+
+    def recording_list_indexed_chunks(db, document_ids=None):
+        loads.append(document_ids)
+        return list_indexed_chunks(db, document_ids)
+
+    monkeypatch.setattr(repos, "list_indexed_chunks", recording_list_indexed_chunks)
+
+    async def scenario():
+        try:
+            first = await retriever.aretrieve("AB-1234", [], k=3, mode="lexical")
+            for _ in range(5):
+                await retriever.aretrieve("shipping", [], k=3, mode="lexical")
+            loads_before_ingest = len(loads)
+
+            # A new chunk lands (in any worker); requests keep using the built index until the refresh
+            new_doc_id = _index_chunks(db, {"k3": "refund policy"})
+            stale = await retriever.aretrieve("refund", [], k=3, mode="lexical")
+            retriever.notify()
+            for _ in range(100):
+                if retriever.lexical_index.signature == repos.get_index_version(db):
+                    break
+                await asyncio.sleep(0.01)
+            fresh = await retriever.aretrieve("refund", [], k=3, mode="lexical")
+            return first, loads_before_ingest, stale, fresh, new_doc_id
+        finally:
+            await retriever.aclose()
+
+    first, loads_before_ingest, stale, fresh, new_doc_id = run_async(scenario())
+
+    assert [hit["id"] for hit in first] == [f"{doc_id}_k1"]
+    assert loads_before_ingest == 1
+    assert stale == []
+    assert [hit["content"] for hit in fresh] == ["refund policy"]
+    # One full load at start-up, then only the changed document
+    assert loads == [None, [new_doc_id]]
+
+
+def test_reindexed_document_replaces_its_rows(db, retriever):
+    doc_id = _index_chunks(db, {"k1": "invoice total", "k2": "shipping address"})
+    other_id = _index_chunks(db, {"k1": "invoice archive"})
+
+    async def refresh():
+        await retriever.refresh_lexical()
+        return retriever.lexical_index.search("invoice shipping", k=5)
+
+    run_async(refresh())
+    # Re-ingest: k1 changes, k2 is removed
+    repos.apply_chunk_manifest(db, doc_id, [{"chunk_id": "k1", "content": "refund total", "content_hash": "x"}], ["k2"], {"k1": 0})
+    hits = run_async(refresh())
+
+    assert [hit["id"] for hit in hits] == [f"{other_id}_k1"]
+    assert len(retriever.lexical_index) == 2
+    assert retriever.lexical_index.search("refund", k=5)[0]["id"] == f"{doc_id}_k1"
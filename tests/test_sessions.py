@@ -0,0 +1,34 @@
+# tests/test_sessions.py
+from app.state import repos
+
+
+def _upload(client, name: str, data: bytes, session_id=None):
+    form = {"session_id": str(session_id)} if session_id is not None else {}
+    return client.post("/upload/", files={"file": (name, data, "text/plain")}, data=form)
+
+
+def test_upload_rejects_unknown_session(client, blobs):
+    response = _upload(client, "a.txt", b"bytes", session_id=999)
+
+    assert response.status_code == 404
+    assert blobs.blobs == {}
+
+
+def test_session_scope_includes_duplicates_of_other_sessions_documents(client, db):
+    first = repos.create_session(db, "alice").id
+    second = repos.create_session(db, "bob").id
+    empty = repos.create_session(db, "carol").id
+
+    shared = _upload(client, "report.txt", b"shared report", session_id=first).json()
+    own = _upload(client, "notes.txt", b"bob's notes", session_id=second).json()
+    duplicate = _upload(client, "report-copy.txt", b"shared report", session_id=second).json()
+    _upload(client, "other.txt", b"unscoped")
+
+    assert (shared["sessionId"], duplicate["sessionId"]) == (first, second)
+    assert duplicate["sourceDocumentId"] == shared["documentId"]
+    # The duplicate's chunks are indexed under the original document
+    assert repos.resolve_index_document_ids(db, session_id=first) == [shared["documentId"]]
+    assert repos.resolve_index_document_ids(db, session_id=second) == sorted([shared["documentId"], own["documentId"]])
+    assert repos.resolve_index_document_ids(db, doc_id=duplicate["documentId"]) == [shared["documentId"]]
+    # A session without documents sees none of the other sessions' uploads
+    assert repos.resolve_index_document_ids(db, session_id=empty) == []
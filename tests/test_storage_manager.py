@@ -0,0 +1,127 @@
+# tests/test_storage_manager.py
+import asyncio
+import io
+
+import pytest
+
+from app.config.settings import settings
+from app.services.clients import ClientRegistry
+from app.services.storage_manager import StorageManager
+from benchmarks.fakes import FakeBlobService, FaultProfile, _FakeBlobClient
+
+
+class SlowStream:
+    """Async ``read(n)`` stream that yields to the event loop between reads."""
+
+    def __init__(self, data: bytes):
+        self._buffer = io.BytesIO(data)
+
+    async def read(self, n: int) -> bytes:
+        await asyncio.sleep(0.001)
+        return self._buffer.read(n)
+
+
+class SeekableStream(SlowStream):
+    """Like UploadFile: an async ``seek`` as well as ``read``."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = 0
+
+    async def read(self, n: int) -> bytes:
+        self.reads += 1
+        return await super().read(n)
+
+    async def seek(self, offset: int):
+        self._buffer.seek(offset)
+
+
+@pytest.fixture
+def blobs(monkeypatch) -> FakeBlobService:
+    monkeypatch.setattr(settings, "blob_chunk_size", 4)
+    return FakeBlobService(FaultProfile())
+
+
+@pytest.fixture
+def storage(blobs) -> StorageManager:
+    clients = ClientRegistry()
+    clients._async_blob_service_client = blobs
+    return StorageManager(clients=clients)
+
+
+def test_concurrent_uploads_to_one_name_do_not_mix_blocks(storage, blobs):
+    first, second = b"a" * 40, b"b" * 40
+
+    async def upload_both():
+        return await asyncio.gather(
+            storage.aupload_stream(SlowStream(first), "same.txt"),
+            storage.aupload_stream(SlowStream(second), "same.txt"),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(upload_both())
+
+    # The first commit discards the other upload's staged blocks, so that one fails
+    # instead of committing a mix of both files
+    assert sum(isinstance(result, dict) and result["committed"] for result in results) == 1
+    assert blobs.blobs["same.txt"] in (first, second)
+
+
+def test_skipped_upload_leaves_no_blob_or_staged_blocks(storage, blobs):
+    result = asyncio.run(storage.aupload_stream(SlowStream(b"x" * 20), "dup.txt", skip_if=lambda sha256: True))
+
+    assert result["committed"] is False
+    assert "dup.txt" not in blobs.blobs
+    assert blobs.staged == {}
+
+
+def test_failed_upload_discards_staged_blocks(storage, blobs):
+    class BrokenStream(SlowStream):
+        async def read(self, n: int) -> bytes:
+            if self._buffer.tell() >= 8:
+                raise OSError("client went away")
+            return await super().read(n)
+
+    with pytest.raises(OSError):
+        asyncio.run(storage.aupload_stream(BrokenStream(b"y" * 20), "broken.txt"))
+
+    assert "broken.txt" not in blobs.blobs
+    assert blobs.staged == {}
+
+
+def test_seekable_duplicate_is_hashed_before_staging(storage, blobs, monkeypatch):
+    staged = []
+    stage_block = _FakeBlobClient.stage_block
+    monkeypatch.setattr(_FakeBlobClient, "stage_block", lambda self, **kw: staged.append(1) or stage_block(self, **kw))
+    data = b"z" * 20
+
+    async def is_known(sha256: str) -> bool:
+        return True
+
+    skipped = asyncio.run(storage.aupload_stream(SeekableStream(data), "dup.txt", skip_if=is_known))
+    uploaded = asyncio.run(storage.aupload_stream(SeekableStream(data), "new.txt", skip_if=lambda sha256: False))
+
+    assert skipped["committed"] is False and skipped["bytes"] == 20
+    assert skipped["sha256"] == uploaded["sha256"]
+    assert staged == [1] * 5  # only the second upload staged blocks
+    assert "dup.txt" not in blobs.blobs
+    assert blobs.blobs["new.txt"] == data
+
+
+def test_failed_block_stops_reading_the_stream(storage, blobs, monkeypatch):
+    stage_block = _FakeBlobClient.stage_block
+
+    async def flaky_stage_block(self, block_id: str, data: bytes, **kwargs):
+        if block_id.endswith("00000001"):
+            raise OSError("stage failed")
+        await stage_block(self, block_id=block_id, data=data, **kwargs)
+
+    monkeypatch.setattr(_FakeBlobClient, "stage_block", flaky_stage_block)
+    stream = SeekableStream(b"q" * 4000)
+
+    with pytest.raises(OSError):
+        asyncio.run(storage.aupload_stream(stream, "flaky.txt"))
+
+    assert stream.reads < 2 + settings.blob_max_concurrency * 2
+    assert "flaky.txt" not in blobs.blobs
+    assert blobs.staged == {}